@@ -0,0 +1,337 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import math
+import asyncio
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from neurons.apify.actors import get_runtime
+from neurons.apify.mapping import parse_timestamp
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+def _item_time(item: dict) -> float:
+    # Epoch seconds of a mapped item, 0 for items without a usable timestamp so they are evicted first
+    try:
+        return parse_timestamp(item["timestamp"]).timestamp()
+    except Exception:
+        return 0.0
+
+
+class FreshItems:
+    """
+    Ring of the freshest items of a keyword, newest first, without duplicate ids. Safe to merge into while
+    the ring is being saved from another thread.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.refreshed_at = 0.0
+        self._items: List[Tuple[float, dict]] = []
+        self._ids = set()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def merge(self, items: List[dict]) -> int:
+        """
+        Add the items not seen yet and drop the oldest beyond ``size``.
+
+        Returns:
+            int: The number of items added.
+        """
+        with self._lock:
+            added = [(_item_time(item), item) for item in items if item.get("id") not in self._ids]
+            added = list({item["id"]: (ts, item) for ts, item in added}.values())
+            if added:
+                self._items = sorted(self._items + added, key=lambda entry: entry[0], reverse=True)[: self.size]
+                self._ids = {item["id"] for _, item in self._items}
+            return len(added)
+
+    def latest(self, limit: int) -> List[dict]:
+        with self._lock:
+            return [item for _, item in self._items[:limit]]
+
+
+class CursorStore:
+    """
+    Newest item seen per source and keyword, its timestamp and id, and the ring of the keyword's freshest items.
+
+    The cursors and rings are saved to ``path`` at most every ``save_interval_secs`` and loaded from it on start,
+    so a restarted miner keeps searching incrementally instead of fetching every keyword from scratch.
+    IncrementalSearch saves it on a worker thread once ``save_due()``, so the event loop never waits on the file.
+    """
+
+    def __init__(self, path: str = None, save_interval_secs: int = 60):
+        """
+        Args:
+            path (str, optional): File the cursors and rings are persisted to. Defaults to keeping them in memory only.
+            save_interval_secs (int): Minimum time between saves.
+        """
+        self.path = path
+        self.save_interval_secs = save_interval_secs
+        self._cursors: Dict[Tuple[str, str], Tuple[float, str]] = {}
+        self._rings: Dict[Tuple[str, str], FreshItems] = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self.load()
+
+    def get(self, source: str, keyword: str) -> Optional[Tuple[float, str]]:
+        """
+        Returns:
+            tuple: (epoch seconds, id) of the newest item seen, or None.
+        """
+        with self._lock:
+            return self._cursors.get((source, keyword))
+
+    def ring(self, source: str, keyword: str, size: int) -> FreshItems:
+        """
+        Get the ring of the freshest items of a keyword, keeping at most ``size`` items.
+        """
+        with self._lock:
+            ring = self._rings.setdefault((source, keyword), FreshItems(size))
+            ring.size = size
+            return ring
+
+    def keywords(self, source: str) -> List[str]:
+        with self._lock:
+            return [keyword for ring_source, keyword in self._rings if ring_source == source]
+
+    def advance(self, source: str, keyword: str, items: List[dict]):
+        """
+        Move the cursor to the newest of ``items`` if it is newer than the cursor.
+        """
+        newest = max(((_item_time(item), str(item.get("id"))) for item in items), default=None)
+        if newest is None or newest[0] <= 0:
+            return
+        with self._lock:
+            cursor = self._cursors.get((source, keyword))
+            if cursor is None or newest > cursor:
+                self._cursors[(source, keyword)] = newest
+
+    def save_due(self) -> bool:
+        """
+        Returns:
+            bool: True if the store is persisted and was last saved ``save_interval_secs`` ago or longer.
+        """
+        with self._lock:
+            return bool(self.path) and time.monotonic() - self._saved_at >= self.save_interval_secs
+
+    def save(self):
+        """
+        Write the cursors and rings to ``path`` atomically. Blocks on file I/O, so coroutines run it with
+        ``asyncio.to_thread``.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            cursors = [[source, keyword, *cursor] for (source, keyword), cursor in self._cursors.items()]
+            rings = [
+                [source, keyword, ring.size, ring.refreshed_at, ring.latest(ring.size)]
+                for (source, keyword), ring in self._rings.items()
+            ]
+            self._saved_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        # Saves from the event loop's worker threads and at exit do not write the same file at once
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w") as f:
+                    json.dump({"cursors": cursors, "rings": rings}, f, default=str)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not save incremental search cursors to {self.path}: {e}")
+
+    def load(self):
+        """
+        Read the cursors and rings saved at ``path``, if any.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load incremental search cursors from {self.path}: {e}")
+            return
+        with self._lock:
+            for source, keyword, timestamp, item_id in data.get("cursors", []):
+                self._cursors[(source, keyword)] = (timestamp, item_id)
+            for source, keyword, size, refreshed_at, items in data.get("rings", []):
+                ring = self._rings[(source, keyword)] = FreshItems(size)
+                ring.merge(items)
+                ring.refreshed_at = refreshed_at
+        logger.info(f"Loaded incremental search cursors for {len(self._cursors)} keywords")
+
+
+class IncrementalSearch:
+    """
+    Keyword search that only asks for items newer than those already seen.
+
+    Wraps a query provider or provider group. The first search of a keyword fetches the latest items as usual;
+    their newest timestamp becomes the keyword's cursor and the items go into a ring of the freshest
+    ``ring_size`` items per keyword. Later searches pass the cursor, less ``overlap_secs`` for late indexing,
+    as ``since`` to providers that support it, so runs only return what is new, and merge the result into the
+    ring. Within ``refresh_secs`` of a refresh the ring is served without running anything. The answer is
+    always the newest ``limit_number`` items of the ring.
+
+    The cursor is per source rather than per actor: it marks the newest item seen on the platform, which every
+    provider of that source can search from. Cursors and rings live in ``cursors``; pass the persisted store of
+    ``get_cursor_store()`` so a restart keeps searching incrementally. Other methods are passed through to the
+    wrapped query.
+    """
+
+    def __init__(
+        self,
+        query,
+        source: str,
+        ring_size: int = 100,
+        refresh_secs: int = 300,
+        overlap_secs: int = 120,
+        cursors: CursorStore = None,
+    ):
+        """
+        Args:
+            query: The query provider or provider group to search with.
+            source (str): Name of the source the cursors are kept for, e.g. "twitter".
+            ring_size (int): Freshest items kept per keyword.
+            refresh_secs (int): Time after a refresh during which the ring is served as is.
+            overlap_secs (int): How far before the cursor incremental searches start.
+            cursors (CursorStore, optional): Store of the cursors and rings. Defaults to a new one in memory.
+        """
+        self.query = query
+        self.source = source
+        self.ring_size = ring_size
+        self.refresh_secs = refresh_secs
+        self.overlap_secs = overlap_secs
+        self.cursors = cursors or CursorStore()
+        self.full_searches = 0
+        self.incremental_searches = 0
+        self.ring_hits = 0
+        self.items_fetched = 0
+        self.items_added = 0
+
+    def __getattr__(self, name: str):
+        if name == "query":
+            raise AttributeError(name)
+        return getattr(self.query, name)
+
+    def _since(self, keyword: str, ring: FreshItems, limit_number: int) -> Optional[datetime]:
+        if len(ring) < limit_number or not getattr(self.query, "supports_since", False):
+            return None
+        cursor = self.cursors.get(self.source, keyword)
+        if cursor is None:
+            return None
+        # Whole minutes, so concurrent searches share actor runs and cache entries
+        since = math.floor((cursor[0] - self.overlap_secs) / 60) * 60
+        return datetime.fromtimestamp(since, timezone.utc)
+
+    async def execute_async(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+    ) -> list:
+        """
+        Search for the newest items of a keyword, fetching only what is new since the last search.
+        Searches for several keywords at once are passed through unchanged.
+        """
+        if len(search_queries) != 1:
+            return await self.query.execute_async(
+                search_queries, limit_number, validator_key, validator_version, miner_uid
+            )
+        keyword = search_queries[0]
+        ring = self.cursors.ring(self.source, keyword, self.ring_size)
+        if len(ring) >= limit_number and time.time() - ring.refreshed_at < self.refresh_secs:
+            self.ring_hits += 1
+            return ring.latest(limit_number)
+
+        since = self._since(keyword, ring, limit_number)
+        kwargs = {"since": since} if since else {}
+        items = await self.query.execute_async(
+            search_queries, limit_number, validator_key, validator_version, miner_uid, **kwargs
+        )
+        added = ring.merge(items)
+        ring.refreshed_at = time.time()
+        self.cursors.advance(self.source, keyword, items)
+        if self.cursors.save_due():
+            await asyncio.to_thread(self.cursors.save)
+        if since:
+            self.incremental_searches += 1
+        else:
+            self.full_searches += 1
+        self.items_fetched += len(items)
+        self.items_added += added
+        logger.debug(
+            f"Searched {self.source} for {keyword} since {since}: {len(items)} items, {added} new, "
+            f"{len(ring)} in ring"
+        )
+        return ring.latest(limit_number)
+
+    def execute(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime().run_coroutine(
+            self.execute_async(search_queries, limit_number, validator_key, validator_version, miner_uid)
+        )
+
+    def stats(self) -> dict:
+        return {
+            "keywords": len(self.cursors.keywords(self.source)),
+            "full_searches": self.full_searches,
+            "incremental_searches": self.incremental_searches,
+            "ring_hits": self.ring_hits,
+            "items_fetched": self.items_fetched,
+            "items_added": self.items_added,
+        }
+
+
+_cursor_store = None
+_cursor_store_lock = threading.Lock()
+
+
+def get_cursor_store() -> CursorStore:
+    """
+    Get the process-wide cursor store, persisted to INCREMENTAL_CURSORS_PATH.
+    """
+    global _cursor_store
+    with _cursor_store_lock:
+        if _cursor_store is None:
+            _cursor_store = CursorStore(path=os.getenv("INCREMENTAL_CURSORS_PATH", "incremental_cursors.json") or None)
+            atexit.register(_cursor_store.save)
+        return _cursor_store
@@ -0,0 +1,277 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import time
+import logging
+import threading
+import orjson
+from typing import Dict, List, Optional
+from sqlalchemy import (
+    Column,
+    Float,
+    Index,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    event,
+    text,
+)
+from sqlalchemy.dialects.sqlite import insert
+from neurons.apify.mapping import parse_timestamp
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+SOURCES = ("twitter", "reddit")
+
+
+def _epoch(item: dict) -> float:
+    try:
+        return parse_timestamp(item["timestamp"]).timestamp()
+    except Exception:
+        return 0.0
+
+
+def _phrase(keyword: str) -> str:
+    # The keyword as one FTS5 phrase, so operators and punctuation in it are matched literally
+    return '"' + keyword.replace('"', '""') + '"'
+
+
+class ItemStore:
+    """
+    Local SQLite index of the scraped items, so requests can be served without scraping.
+
+    Every source has a table of the mapped items per keyword, with the item's epoch timestamp, the time it was
+    stored and its text, indexed by id and by (keyword, timestamp), and an FTS5 index over the text kept in sync
+    by triggers. Items are served newest first from the rows stored for a keyword within ``fresh_secs``, topped
+    up with fresh items of other keywords whose text matches the keyword. Items older than ``retention_secs``
+    are evicted at most every ``evict_interval_secs``. The database runs in WAL mode, so reads are not blocked
+    by writes. Calls block on SQLite, so coroutines run them with ``asyncio.to_thread``.
+    """
+
+    def __init__(
+        self,
+        url: str = "sqlite:///items.db",
+        fresh_secs: int = 300,
+        retention_secs: int = 2 * 86400,
+        evict_interval_secs: int = 600,
+    ):
+        """
+        Args:
+            url (str): SQLAlchemy url of the SQLite database.
+            fresh_secs (int): Age after which stored items are no longer served, unless stale items are asked for.
+            retention_secs (int): Item age, by timestamp, after which items are evicted.
+            evict_interval_secs (int): Minimum time between evictions.
+        """
+        self.fresh_secs = fresh_secs
+        self.retention_secs = retention_secs
+        self.evict_interval_secs = evict_interval_secs
+        self.engine = create_engine(url, connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", self._configure_connection)
+        self.metadata = MetaData()
+        self.tables: Dict[str, Table] = {
+            source: Table(
+                f"{source}_items",
+                self.metadata,
+                Column("keyword", String, primary_key=True),
+                Column("id", String, primary_key=True),
+                Column("timestamp", Float, nullable=False),
+                Column("stored_at", Float, nullable=False),
+                Column("text", Text, nullable=False),
+                Column("item", LargeBinary, nullable=False),
+                Index(f"ix_{source}_items_keyword_timestamp", "keyword", "timestamp"),
+                Index(f"ix_{source}_items_id", "id"),
+                Index(f"ix_{source}_items_timestamp", "timestamp"),
+            )
+            for source in SOURCES
+        }
+        self._evicted_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self._create()
+
+    @staticmethod
+    def _configure_connection(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    def _create(self):
+        self.metadata.create_all(self.engine)
+        with self.engine.begin() as connection:
+            for source in SOURCES:
+                items, fts = f"{source}_items", f"{source}_fts"
+                connection.execute(
+                    text(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} "
+                        f"USING fts5(text, content='{items}', content_rowid='rowid')"
+                    )
+                )
+                connection.execute(
+                    text(
+                        f"CREATE TRIGGER IF NOT EXISTS {items}_ai AFTER INSERT ON {items} BEGIN "
+                        f"INSERT INTO {fts}(rowid, text) VALUES (new.rowid, new.text); END"
+                    )
+                )
+                connection.execute(
+                    text(
+                        f"CREATE TRIGGER IF NOT EXISTS {items}_ad AFTER DELETE ON {items} BEGIN "
+                        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.rowid, old.text); END"
+                    )
+                )
+                connection.execute(
+                    text(
+                        f"CREATE TRIGGER IF NOT EXISTS {items}_au AFTER UPDATE OF text ON {items} BEGIN "
+                        f"INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.rowid, old.text); "
+                        f"INSERT INTO {fts}(rowid, text) VALUES (new.rowid, new.text); END"
+                    )
+                )
+
+    def add(self, source: str, keyword: str, items: List[dict]) -> int:
+        """
+        Store the items scraped for a keyword, replacing earlier versions of the same items.
+
+        Returns:
+            int: The number of items stored.
+        """
+        if not items:
+            return 0
+        now = time.time()
+        rows = [
+            {
+                "keyword": keyword,
+                "id": str(item["id"]),
+                "timestamp": _epoch(item),
+                "stored_at": now,
+                "text": item.get("text") or "",
+                "item": orjson.dumps(item),
+            }
+            for item in items
+            if item.get("id") is not None
+        ]
+        if not rows:
+            return 0
+        statement = insert(self.tables[source])
+        statement = statement.on_conflict_do_update(
+            index_elements=["keyword", "id"],
+            set_={column: statement.excluded[column] for column in ("timestamp", "stored_at", "text", "item")},
+        )
+        with self.engine.begin() as connection:
+            connection.execute(statement, rows)
+        if now - self._evicted_at >= self.evict_interval_secs:
+            self.evict()
+        return len(rows)
+
+    def latest(self, source: str, keyword: str, limit: int, stale_ok: bool = False) -> Optional[List[dict]]:
+        """
+        The newest ``limit`` stored items for a keyword, or None if there are fewer. Items stored for the
+        keyword come first; items of other keywords whose text matches it fill up the rest.
+        With ``stale_ok`` items are served however long ago they were stored.
+        """
+        items_table = f"{source}_items"
+        cutoff = 0.0 if stale_ok else time.time() - self.fresh_secs
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                text(
+                    f"SELECT id, item FROM {items_table} WHERE keyword = :keyword AND stored_at >= :cutoff "
+                    f"ORDER BY timestamp DESC LIMIT :limit"
+                ),
+                {"keyword": keyword, "cutoff": cutoff, "limit": limit},
+            ).all()
+            if len(rows) < limit:
+                seen = {row.id for row in rows}
+                matches = connection.execute(
+                    text(
+                        f"SELECT i.id, i.item FROM {source}_fts f JOIN {items_table} i ON i.rowid = f.rowid "
+                        f"WHERE {source}_fts MATCH :phrase AND i.stored_at >= :cutoff "
+                        f"ORDER BY i.timestamp DESC LIMIT :limit"
+                    ),
+                    {"phrase": _phrase(keyword), "cutoff": cutoff, "limit": limit * 4},
+                ).all()
+                for row in matches:
+                    if len(rows) >= limit:
+                        break
+                    if row.id not in seen:
+                        seen.add(row.id)
+                        rows.append(row)
+        if len(rows) < limit:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [orjson.loads(row.item) for row in rows]
+
+    def evict(self) -> int:
+        """
+        Delete the items older than ``retention_secs``.
+
+        Returns:
+            int: The number of items deleted.
+        """
+        self._evicted_at = time.time()
+        cutoff = time.time() - self.retention_secs
+        deleted = 0
+        with self.engine.begin() as connection:
+            for table in self.tables.values():
+                deleted += connection.execute(table.delete().where(table.c.timestamp < cutoff)).rowcount
+        if deleted:
+            logger.info(f"Evicted {deleted} items older than {self.retention_secs}s from the item store")
+        return deleted
+
+    def stats(self) -> dict:
+        with self.engine.connect() as connection:
+            counts = {
+                source: connection.execute(text(f"SELECT count(*) FROM {source}_items")).scalar()
+                for source in SOURCES
+            }
+        lookups = self.hits + self.misses
+        return {
+            "items": counts,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_item_store = None
+_item_store_lock = threading.Lock()
+
+
+def get_item_store() -> Optional[ItemStore]:
+    """
+    Get the miner's item store, configured from ITEM_STORE_URL, ITEM_STORE_FRESH_SECS and
+    ITEM_STORE_RETENTION_SECS. None unless ITEM_STORE_URL is set.
+    """
+    global _item_store
+    with _item_store_lock:
+        if _item_store is None:
+            url = os.getenv("ITEM_STORE_URL", "")
+            if not url:
+                return None
+            _item_store = ItemStore(
+                url,
+                fresh_secs=int(os.getenv("ITEM_STORE_FRESH_SECS", 300)),
+                retention_secs=int(os.getenv("ITEM_STORE_RETENTION_SECS", 2 * 86400)),
+            )
+        return _item_store
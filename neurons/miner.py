@@ -31,10 +31,12 @@ import scraping
 from typing import Tuple
 import random
 import torch
-from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.queries import get_query_group, QueryType, QueryProvider
 from neurons.plugins.twitter import TwitterSource
 from neurons.plugins.reddit import RedditSource
 from neurons.structures.priority_queue import AsyncPriorityQueue
+from neurons.prefetch import start_prefetcher
+from neurons.incremental import IncrementalSearch, get_cursor_store
 
 # TODO: Check if all the necessary libraries are installed and up-to-date
 
@@ -53,6 +55,30 @@ async def get_config():
         default=True,
         help='Set to "no" to disable auto update.',
     )
+    parser.add_argument(
+        "--prefetch.cu_per_hour",
+        type=float,
+        default=0.0,
+        help="Apify compute unit budget per hour for prefetching keyword results. 0 disables prefetching.",
+    )
+    parser.add_argument(
+        "--prefetch.refresh_secs",
+        type=int,
+        default=600,
+        help="Age in seconds after which prefetched keyword results are refreshed.",
+    )
+    parser.add_argument(
+        "--incremental.ring_size",
+        type=int,
+        default=100,
+        help="Freshest items kept per keyword, topped up by searching only for items newer than the last ones seen.",
+    )
+    parser.add_argument(
+        "--incremental.refresh_secs",
+        type=int,
+        default=300,
+        help="Age in seconds after which the freshest items of a keyword are topped up.",
+    )
     # Adds subtensor specific arguments i.e. --subtensor.chain_endpoint ... --subtensor.network ...
     bt.subtensor.add_args(parser)
     # Adds logging specific arguments i.e. --logging.debug ..., --logging.trace .. or --logging.logging_dir ...
@@ -113,8 +139,38 @@ class Miner:
         self.config = config
         
     async def execute(self):
-        twitter_query = get_query(QueryType.TWITTER, QueryProvider.TWEET_FLASH)
-        reddit_query = get_query(QueryType.REDDIT, QueryProvider.REDDIT_SCRAPER_LITE)
+        # Requests are backed up by a second provider when the first one is slow or fails
+        twitter_query = get_query_group(
+            QueryType.TWITTER,
+            [QueryProvider.TWEET_FLASH, QueryProvider.MICROWORLDS_TWITTER_SCRAPER],
+        )
+        reddit_query = get_query_group(
+            QueryType.REDDIT,
+            [QueryProvider.REDDIT_SCRAPER_LITE, QueryProvider.REDDIT_SCRAPER],
+        )
+        # Repeated searches for a keyword only ask the providers for items newer than those already seen
+        twitter_query = IncrementalSearch(
+            twitter_query,
+            "twitter",
+            ring_size=self.config.incremental.ring_size,
+            refresh_secs=self.config.incremental.refresh_secs,
+            cursors=get_cursor_store(),
+        )
+        reddit_query = IncrementalSearch(
+            reddit_query,
+            "reddit",
+            ring_size=self.config.incremental.ring_size,
+            refresh_secs=self.config.incremental.refresh_secs,
+            cursors=get_cursor_store(),
+        )
+        # Keep results for the validator keywords ready instead of scraping on every request.
+        # Prefetching is not latency bound, so it only uses the preferred providers
+        if self.config.prefetch.cu_per_hour > 0:
+            start_prefetcher(
+                {QueryType.TWITTER: twitter_query.primary, QueryType.REDDIT: reddit_query.primary},
+                cu_per_hour=self.config.prefetch.cu_per_hour,
+                refresh_secs=self.config.prefetch.refresh_secs,
+            )
         # Activating Bittensor's logging with the set configurations.
         bt.logging(config=self.config, logging_dir=self.config.full_path)
         bt.logging.info(
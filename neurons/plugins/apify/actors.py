@@ -18,8 +18,23 @@ DEALINGS IN THE SOFTWARE.
 """
 
 import os
+import time
+import atexit
+import asyncio
 import logging
+import contextvars
+import threading
+import contextlib
+import httpx
+from collections import deque
 from apify_client import ApifyClient, ApifyClientAsync
+from neurons.apify.cache import cache_key, get_result_cache
+from neurons.apify.cancellation import RunCancelled, cancel_requested
+from neurons.apify.limiter import RunLimiter, RunSlot
+from neurons.apify.replay import get_replay
+from neurons.apify.runs import TERMINAL_RUN_STATUSES, RunTracker
+from neurons.apify.singleflight import single_flight
+from neurons.apify.usage import CACHE_ONLY, get_usage_ledger
 
 # Set up logger for the script
 logger = logging.getLogger(__name__)
@@ -46,12 +61,438 @@ class ActorConfig:
         self.actor_id = actor_id  # Actor ID
         self.timeout_secs = 30
         self.memory_mbytes = None
+        # Search results are cached for cache_ttl_secs, and served stale while refreshing for cache_stale_secs more
+        self.cache_ttl_secs = 0
+        self.cache_stale_secs = 0
+        # Overrides of the runtime's per-actor concurrent run limit and run start rate
+        self.max_concurrent_runs = None
+        self.run_starts_per_sec = None
+        # Bounds for tuning timeout_secs from the observed latency. Default to half and twice the configured timeout
+        self.min_timeout_secs = None
+        self.max_timeout_secs = None
+        # Top-level dataset fields the provider maps; only these are downloaded. None downloads whole items
+        self.dataset_fields = None
+        # Top-level dataset fields never downloaded, for providers that map items of varying shape
+        self.dataset_omit = None
+
+
+# How long to wait on the run tracker between checks for cancellation
+RUN_POLL_INTERVAL_SECS = 2
+
+
+def dataset_options(actor_config: ActorConfig) -> dict:
+    """
+    Projection options for reading the datasets of the actor's runs, so that only the mapped fields are
+    transferred. Hidden fields are always skipped; empty items are kept so that item offsets stay stable
+    while a run is streamed.
+    """
+    options = {"skip_hidden": True}
+    if actor_config.dataset_fields:
+        options["fields"] = list(actor_config.dataset_fields)
+    if actor_config.dataset_omit:
+        options["omit"] = list(actor_config.dataset_omit)
+    return options
+
+
+# Counter of the items that failed to map in the stream runs made for the current call
+_mapping_failures = contextvars.ContextVar("apify_mapping_failures", default=None)
+
+
+def add_mapping_failures(count: int):
+    """
+    Add to the mapping failure counter of the current call, if it is being counted.
+    """
+    counter = _mapping_failures.get()
+    if counter is not None:
+        counter[0] += count
+
+
+async def count_mapping_failures_async(coro_fn, *args, **kwargs):
+    """
+    Await ``coro_fn`` and count the dataset items that failed to map in the actor runs it streamed.
+
+    Returns:
+        tuple: The result of ``coro_fn`` and the number of mapping failures.
+    """
+    counter = [0]
+    token = _mapping_failures.set(counter)
+    try:
+        return await coro_fn(*args, **kwargs), counter[0]
+    finally:
+        _mapping_failures.reset(token)
+
+
+# How long the usage of an aborted run is waited for. Its stats are only final once it has finished aborting
+ABORTED_RUN_USAGE_WAIT_SECS = 120
+
+# Background tasks recording the usage of aborted runs
+_usage_tasks = set()
+
+
+async def _record_usage_when_finished(runtime: "ActorRuntime", actor_id: str, run: dict, items: int):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ABORTED_RUN_USAGE_WAIT_SECS
+    while run["status"] not in TERMINAL_RUN_STATUSES:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            logger.warning(f"Actor run {run['id']} did not finish aborting, recording its usage so far")
+            break
+        run = await runtime.runs.wait(run, remaining) or run
+    get_usage_ledger().record(actor_id, run, items)
+
+
+async def _abort_run_async(runtime: "ActorRuntime", actor_id: str, run: dict, items: int = 0):
+    """
+    Abort an in-flight run. Its usage is recorded in the background once the run tracker reports it finished,
+    as the run object the abort returns does not have the final stats yet.
+    """
+    try:
+        await runtime.async_client.run(run["id"]).abort()
+    except Exception as e:
+        logger.warning(f"Could not abort actor run {run['id']}: {e}")
+    task = asyncio.get_running_loop().create_task(_record_usage_when_finished(runtime, actor_id, run, items))
+    _usage_tasks.add(task)
+    task.add_done_callback(_usage_tasks.discard)
+
+
+async def _abort_if_cancelled_async(runtime: "ActorRuntime", actor_id: str, run: dict):
+    """
+    Abort the run and raise RunCancelled if its result is no longer wanted.
+    """
+    if not cancel_requested():
+        return
+    await _abort_run_async(runtime, actor_id, run)
+    raise RunCancelled(f"Actor run {run['id']} was cancelled")
+
+
+async def _wait_for_run_async(
+    runtime: "ActorRuntime", actor_id: str, run: dict, wait_secs: float = None
+) -> dict:
+    """
+    Wait on the runtime's run tracker until the run has finished, or for at most ``wait_secs``, and return the
+    latest run object. Aborts the run and raises RunCancelled if its result is no longer wanted.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = None if wait_secs is None else loop.time() + wait_secs
+    while run["status"] not in TERMINAL_RUN_STATUSES:
+        await _abort_if_cancelled_async(runtime, actor_id, run)
+        timeout = RUN_POLL_INTERVAL_SECS
+        if deadline is not None:
+            timeout = min(timeout, deadline - loop.time())
+            if timeout <= 0:
+                break
+        run = await runtime.runs.wait(run, timeout) or run
+    return run
+
+
+class ActorRuntime:
+    """
+    Process-wide owner of the Apify clients.
+
+    Holds one sync and one async client with keep-alive connection pools, so actor runs do not pay connection
+    setup on every request. Async work runs on a dedicated event loop thread that owns the async client, which
+    lets sync callers run async code without creating a new event loop per call. Every actor run holds a slot
+    of the runtime's run limiter while it is in flight, and is waited for through the runtime's run tracker,
+    so in-flight runs cost no status requests of their own.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry_secs: float = 30.0,
+        limiter: RunLimiter = None,
+        dataset_page_size: int = 1000,
+        dataset_prefetch_pages: int = 4,
+        api_url: str = None,
+        run_poll_interval_secs: float = 2.0,
+        webhook_url: str = None,
+        webhook_port: int = 8099,
+        webhook_poll_interval_secs: float = 30.0,
+    ):
+        """
+        Args:
+            api_key (str): The Apify API key.
+            max_connections (int): Maximum concurrent connections per client.
+            max_keepalive_connections (int): Maximum idle connections kept open per client.
+            keepalive_expiry_secs (float): How long idle connections are kept open.
+            limiter (RunLimiter, optional): Bounds the concurrent actor runs. Defaults to RunLimiter's defaults.
+            dataset_page_size (int): Items per request when downloading a finished run's dataset.
+            dataset_prefetch_pages (int): Dataset pages downloaded concurrently ahead of the page being consumed.
+            api_url (str, optional): Base url of the Apify API, e.g. a local stand-in. Defaults to the real API.
+            run_poll_interval_secs (float): Time between status checks of the in-flight runs without webhooks.
+            webhook_url (str, optional): Public base url of the webhook receiver. Defaults to polling only.
+            webhook_port (int): Port the webhook receiver listens on.
+            webhook_poll_interval_secs (float): Time between status checks while webhooks are received.
+        """
+        self.api_key = api_key
+        self.limiter = limiter or RunLimiter()
+        self.dataset_page_size = dataset_page_size
+        self.dataset_prefetch_pages = max(1, dataset_prefetch_pages)
+        self.api_url = api_url
+        self.runs = RunTracker(
+            lambda: self.async_client,
+            poll_interval_secs=run_poll_interval_secs,
+            webhook_url=webhook_url,
+            webhook_port=webhook_port,
+            webhook_poll_interval_secs=webhook_poll_interval_secs,
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry_secs,
+        )
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._loop = None
+        self._thread = None
+
+    def _pooled_http_client(self, http_client, use_async: bool):
+        # apify_client builds both a sync and an async httpx client without connection limits;
+        # keep only the one we use, rebuilt with our pool limits. These are private attributes of apify_client
+        # 1.6, so other versions keep their own clients
+        old_sync = getattr(http_client, "httpx_client", None)
+        if old_sync is None or not hasattr(http_client, "httpx_async_client"):
+            logger.warning(
+                "apify_client does not expose its httpx clients, keeping its default connection pool"
+            )
+            return
+        options = dict(
+            headers=old_sync.headers,
+            follow_redirects=True,
+            timeout=old_sync.timeout,
+            limits=self.limits,
+        )
+        old_sync.close()
+        if use_async:
+            http_client.httpx_async_client = httpx.AsyncClient(**options)
+        else:
+            http_client.httpx_client = httpx.Client(**options)
+
+    @property
+    def client(self) -> ApifyClient:
+        with self._lock:
+            if self._client is None:
+                self._client = ApifyClient(self.api_key, api_url=self.api_url)
+                self._pooled_http_client(self._client.http_client, use_async=False)
+            return self._client
+
+    @property
+    def async_client(self) -> ApifyClientAsync:
+        """
+        The async client. Only use it from coroutines running on ``loop``.
+        """
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = ApifyClientAsync(self.api_key, api_url=self.api_url)
+                self._pooled_http_client(self._async_client.http_client, use_async=True)
+            return self._async_client
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="apify-actor-runtime", daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run_coroutine(self, coro, timeout: float = None):
+        """
+        Run a coroutine on the runtime loop and block until it finishes.
+        Safe to call from any thread other than the runtime loop thread, including threads running their own loop.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_coroutine must not be called from the actor runtime loop")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def run_async(self, coro):
+        """
+        Await a coroutine on the runtime loop from any event loop.
+        """
+        loop = self.loop
+        if asyncio.get_running_loop() is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    async def _acquire_slot(self, actor_config: ActorConfig) -> RunSlot:
+        # No run is started once the compute unit budget is used up
+        get_usage_ledger().check()
+        return await self.limiter.acquire(
+            actor_config.actor_id,
+            memory_mbytes=actor_config.memory_mbytes,
+            max_concurrent_runs=actor_config.max_concurrent_runs,
+            run_starts_per_sec=actor_config.run_starts_per_sec,
+        )
+
+    @contextlib.asynccontextmanager
+    async def run_slot_async(self, actor_config: ActorConfig):
+        """
+        Hold a run limiter slot for the actor. Only use it from coroutines running on ``loop``.
+        """
+        slot = await self._acquire_slot(actor_config)
+        try:
+            yield slot
+        finally:
+            self.limiter.release(slot)
+
+    async def iter_dataset_pages_async(self, dataset_id: str, options: dict = None):
+        """
+        Yield the pages of a finished run's dataset in order.
+
+        Pages are requested by offset from the dataset's item count, keeping up to ``dataset_prefetch_pages``
+        requests in flight on the pooled async client, so it must be iterated on the runtime loop. Items
+        written after the item count was last updated are read sequentially at the end.
+        """
+        dataset = self.async_client.dataset(dataset_id)
+        options = options or {}
+        page_size = self.dataset_page_size
+        info = await dataset.get()
+        item_count = (info or {}).get("itemCount") or 0
+        offsets = iter(range(0, item_count, page_size))
+        pending = deque()
+
+        def prefetch():
+            for offset in offsets:
+                pending.append(
+                    asyncio.ensure_future(dataset.list_items(offset=offset, limit=page_size, **options))
+                )
+                return
+
+        try:
+            for _ in range(self.dataset_prefetch_pages):
+                prefetch()
+            read = 0
+            last_page_full = True
+            while pending:
+                page = await pending.popleft()
+                prefetch()
+                read += len(page.items)
+                last_page_full = len(page.items) == page_size
+                if page.items:
+                    yield page.items
+            while last_page_full:
+                page = await dataset.list_items(offset=read, limit=page_size, **options)
+                read += len(page.items)
+                last_page_full = len(page.items) == page_size
+                if page.items:
+                    yield page.items
+        finally:
+            for request in pending:
+                request.cancel()
+
+    async def download_dataset_async(self, dataset_id: str, options: dict = None) -> list:
+        """
+        Download all items of a finished run's dataset in order. Must be awaited on the runtime loop.
+        """
+        items = []
+        async for page in self.iter_dataset_pages_async(dataset_id, options):
+            items.extend(page)
+        return items
+
+    def shutdown(self):
+        """
+        Close the pooled connections and stop the runtime loop.
+        """
+        with self._lock:
+            client, async_client, loop, thread = self._client, self._async_client, self._loop, self._thread
+            self._client = self._async_client = self._loop = self._thread = None
+
+        # Without the private httpx clients (see _pooled_http_client) the connections close with the process
+        httpx_client = getattr(getattr(client, "http_client", None), "httpx_client", None)
+        httpx_async_client = getattr(getattr(async_client, "http_client", None), "httpx_async_client", None)
+        if httpx_client is not None:
+            httpx_client.close()
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.runs.close(), loop).result(5)
+            if httpx_async_client is not None:
+                asyncio.run_coroutine_threadsafe(httpx_async_client.aclose(), loop).result(5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+        elif httpx_async_client is not None:
+            asyncio.run(httpx_async_client.aclose())
+        logger.info("Actor runtime shut down")
+
+
+_runtimes = {}
+_runtimes_lock = threading.Lock()
+
+
+def get_runtime(api_key: str = None) -> ActorRuntime:
+    """
+    Get the shared actor runtime for an API key, creating it on first use.
+
+    Connection pool sizes come from APIFY_MAX_CONNECTIONS, APIFY_MAX_KEEPALIVE_CONNECTIONS
+    and APIFY_KEEPALIVE_EXPIRY_SECS. Run limits come from APIFY_MEMORY_BUDGET_MBYTES, APIFY_DEFAULT_RUN_MEMORY_MBYTES,
+    APIFY_MAX_CONCURRENT_RUNS and APIFY_RUN_STARTS_PER_SEC. Dataset downloads are paged by APIFY_DATASET_PAGE_SIZE
+    with APIFY_DATASET_PREFETCH_PAGES pages in flight. Runs are reported finished to the webhook receiver at
+    APIFY_WEBHOOK_URL, listening on APIFY_WEBHOOK_PORT, and polled every APIFY_RUN_POLL_SECS, or
+    APIFY_WEBHOOK_POLL_SECS while webhooks are received. APIFY_API_URL points the clients at another Apify API.
+    """
+    if api_key is None:
+        api_key = os.getenv("APIFY_API_KEY")
+    with _runtimes_lock:
+        if api_key not in _runtimes:
+            _runtimes[api_key] = ActorRuntime(
+                api_key,
+                max_connections=int(os.getenv("APIFY_MAX_CONNECTIONS", 20)),
+                max_keepalive_connections=int(os.getenv("APIFY_MAX_KEEPALIVE_CONNECTIONS", 10)),
+                keepalive_expiry_secs=float(os.getenv("APIFY_KEEPALIVE_EXPIRY_SECS", 30)),
+                limiter=RunLimiter(
+                    memory_budget_mbytes=int(os.getenv("APIFY_MEMORY_BUDGET_MBYTES", 8192)),
+                    default_memory_mbytes=int(os.getenv("APIFY_DEFAULT_RUN_MEMORY_MBYTES", 1024)),
+                    max_concurrent_runs=int(os.getenv("APIFY_MAX_CONCURRENT_RUNS", 4)),
+                    run_starts_per_sec=float(os.getenv("APIFY_RUN_STARTS_PER_SEC", 1)),
+                ),
+                dataset_page_size=int(os.getenv("APIFY_DATASET_PAGE_SIZE", 1000)),
+                dataset_prefetch_pages=int(os.getenv("APIFY_DATASET_PREFETCH_PAGES", 4)),
+                api_url=os.getenv("APIFY_API_URL") or None,
+                run_poll_interval_secs=float(os.getenv("APIFY_RUN_POLL_SECS", 2)),
+                webhook_url=os.getenv("APIFY_WEBHOOK_URL") or None,
+                webhook_port=int(os.getenv("APIFY_WEBHOOK_PORT", 8099)),
+                webhook_poll_interval_secs=float(os.getenv("APIFY_WEBHOOK_POLL_SECS", 30)),
+            )
+        return _runtimes[api_key]
+
+
+@atexit.register
+def shutdown_runtimes():
+    """
+    Shut down every actor runtime; registered to run at interpreter exit.
+    """
+    with _runtimes_lock:
+        runtimes = list(_runtimes.values())
+        _runtimes.clear()
+    for runtime in runtimes:
+        try:
+            runtime.shutdown()
+        except Exception as e:
+            logger.error(f"Error shutting down actor runtime: {e}")
 
 
 def run_actor(
     actor_config: ActorConfig,
     run_input: dict,
     default_dataset_id: str = "defaultDatasetId",
+):
+    """
+    Blocking wrapper of ``run_actor_async``, for callers without an event loop.
+    """
+    return get_runtime(actor_config.api_key).run_coroutine(
+        run_actor_async(actor_config, run_input, default_dataset_id)
+    )
+
+
+async def run_actor_async(
+    actor_config: ActorConfig,
+    run_input: dict,
+    default_dataset_id: str = "defaultDatasetId",
 ):
     """
     Run an actor in Apify and fetch the resulting data.
@@ -64,61 +505,229 @@ def run_actor(
     Returns:
         list[dict]: List of items fetched from the dataset.
     """
-    # Initialize the Apify client with the API key
-    client = ApifyClient(actor_config.api_key)
-    logger.info(f"Running actor: {actor_config.actor_id}")
-
-    # Start the actor run
-    run = client.actor(actor_config.actor_id).call(
-        run_input=run_input,
-        timeout_secs=actor_config.timeout_secs,
-        memory_mbytes=actor_config.memory_mbytes,
+    runtime = get_runtime(actor_config.api_key)
+    # Identical concurrent runs share one actor run. The pooled async client lives on the runtime loop,
+    # so the run is executed there
+    return await single_flight.do_async(
+        cache_key(actor_config.actor_id, run_input, "run", default_dataset_id),
+        lambda: runtime.run_async(
+            _run_actor_async(runtime, actor_config, run_input, default_dataset_id)
+        ),
     )
+
+
+async def _run_actor_async(
+    runtime: ActorRuntime,
+    actor_config: ActorConfig,
+    run_input: dict,
+    default_dataset_id: str,
+):
+    replay = get_replay()
+    if replay and replay.replaying:
+        return await replay.replay_async(actor_config.actor_id, run_input)
+
+    started = time.monotonic()
+    client = runtime.async_client
+    async with runtime.run_slot_async(actor_config):
+        logger.info(f"Running actor: {actor_config.actor_id}")
+        run = await client.actor(actor_config.actor_id).start(
+            run_input=run_input,
+            timeout_secs=actor_config.timeout_secs,
+            memory_mbytes=actor_config.memory_mbytes,
+            webhooks=runtime.runs.webhooks,
+        )  # Start the actor run
+        run = await _wait_for_run_async(runtime, actor_config.actor_id, run)
     logger.info(f"Actor run: {run}")
 
-    # Fetch data items from the specified dataset
-    data_set = [
-        item for item in client.dataset(run[default_dataset_id]).iterate_items()
-    ]
+    # Fetch data items from the specified dataset, several pages at a time
+    fetched_items = await runtime.download_dataset_async(
+        run[default_dataset_id], dataset_options(actor_config)
+    )
 
-    logger.info(f"Fetched {len(data_set)} items from dataset")
-    return data_set
+    logger.info(f"Fetched {len(fetched_items)} items from dataset")
+    get_usage_ledger().record(actor_config.actor_id, run, len(fetched_items))
+    if replay and replay.recording:
+        replay.record(actor_config.actor_id, run_input, fetched_items, time.monotonic() - started)
+    return fetched_items
 
 
-async def run_actor_async(
+class _StreamState:
+    """
+    Incremental mapping state of a streamed actor run.
+    """
+
+    def __init__(self, actor_id: str, run_input: dict, map_item, limit: int):
+        self.actor_id = actor_id
+        self.run_input = run_input
+        self.map_item = map_item
+        self.limit = limit
+        self.results = []
+        self.offset = 0
+        self.mapping_failures = 0
+        self.started = time.monotonic()
+        # Raw dataset items, kept only while recording fixtures
+        self.replay = get_replay()
+        self.raw_items = [] if self.replay and self.replay.recording else None
+
+    def add_page(self, items: list) -> bool:
+        """
+        Map a page of dataset items.
+
+        Returns:
+            bool: True once ``limit`` valid items have been produced.
+        """
+        self.offset += len(items)
+        if self.raw_items is not None:
+            self.raw_items.extend(items)
+        for item in items:
+            try:
+                mapped = self.map_item(item) if self.map_item else item
+            except Exception:
+                self.mapping_failures += 1
+                continue
+            if mapped is None:
+                continue
+            self.results.append(mapped)
+            if self.limit and len(self.results) >= self.limit:
+                return True
+        return False
+
+    def finish(self, reason: str) -> list:
+        """
+        Log the outcome, record the dataset read so far when recording fixtures, and return the results.
+        """
+        if self.raw_items is not None:
+            self.replay.record(self.actor_id, self.run_input, self.raw_items, time.monotonic() - self.started)
+        if self.mapping_failures:
+            logger.warning(f"Failed to map {self.mapping_failures} items from actor {self.actor_id}")
+            add_mapping_failures(self.mapping_failures)
+        logger.info(
+            f"Streamed {len(self.results)} items from actor {self.actor_id} after reading {self.offset} ({reason})"
+        )
+        return self.results
+
+
+def stream_actor(
     actor_config: ActorConfig,
     run_input: dict,
+    map_item=None,
+    limit: int = None,
+    poll_interval_secs: int = 2,
+    page_size: int = 1000,
     default_dataset_id: str = "defaultDatasetId",
 ):
     """
-    Run an actor in Apify and fetch the resulting data.
+    Blocking wrapper of ``stream_actor_async``, for callers without an event loop.
+    """
+    return get_runtime(actor_config.api_key).run_coroutine(
+        stream_actor_async(
+            actor_config, run_input, map_item, limit, poll_interval_secs, page_size, default_dataset_id
+        )
+    )
+
+
+async def stream_actor_async(
+    actor_config: ActorConfig,
+    run_input: dict,
+    map_item=None,
+    limit: int = None,
+    poll_interval_secs: int = 2,
+    page_size: int = 1000,
+    default_dataset_id: str = "defaultDatasetId",
+):
+    """
+    Run an actor and map its dataset items while the run is still in progress.
+
+    Items are read from the dataset as they appear and passed through ``map_item``; items that raise or map
+    to None are skipped. Once ``limit`` valid items have been produced the run is aborted and the results are
+    returned without waiting for the actor to finish. Once the compute unit budget is used up, a cached result
+    is served however old it is; without one BudgetExhausted is raised.
 
     Args:
         actor_config (ActorConfig): The configuration to use for running the actor.
         run_input (dict): The input parameters for the actor run.
-        default_dataset_id (str, optional): ID of the dataset to fetch data from. Defaults to "defaultDatasetId".
+        map_item (callable, optional): Maps one dataset item, returning None for invalid items.
+        limit (int, optional): Stop after this many valid items. Defaults to reading the whole dataset.
+        poll_interval_secs (int, optional): How long to wait for the run to finish between dataset reads.
+        page_size (int, optional): Maximum number of items to read per dataset request.
+        default_dataset_id (str, optional): Key of the run's dataset ID. Defaults to "defaultDatasetId".
 
     Returns:
-        list[dict]: List of items fetched from the dataset.
+        list: The mapped items, at most ``limit`` of them.
     """
-    # Initialize the Apify client with the API key
-    client = ApifyClientAsync(actor_config.api_key)
-    logger.info(f"Running actor: {actor_config.actor_id}")
-    run = await client.actor(actor_config.actor_id).call(
-        run_input=run_input,
-        timeout_secs=actor_config.timeout_secs,
-        memory_mbytes=actor_config.memory_mbytes,
-    )  # Start the actor run
-    logger.info(f"Actor run: {run}")
+    runtime = get_runtime(actor_config.api_key)
+    key = cache_key(actor_config.actor_id, run_input, limit)
 
-    # Fetch data items from the specified dataset
-    dataset = client.dataset(run[default_dataset_id])
-    items = dataset.iterate_items()
+    def fetch():
+        # Identical concurrent searches, including background cache refreshes, share one actor run. The pooled
+        # async client lives on the runtime loop, so the run is executed there
+        return single_flight.do_async(
+            key,
+            lambda: runtime.run_async(
+                _stream_actor_async(
+                    runtime, actor_config, run_input, map_item, limit, poll_interval_secs, page_size, default_dataset_id
+                )
+            ),
+        )
 
-    fetched_items = []
+    if not actor_config.cache_ttl_secs:
+        return await fetch()
+    if get_usage_ledger().level() == CACHE_ONLY:
+        # Out of budget: serve the cached result however old it is, runs are refused below
+        cached = get_result_cache().peek(key)
+        if cached is not None:
+            return cached
+    return await get_result_cache().get_or_fetch_async(
+        key,
+        fetch,
+        actor_config.cache_ttl_secs,
+        actor_config.cache_stale_secs,
+    )
 
-    async for item in items:
-        fetched_items.append(item)
 
-    logger.info(f"Fetched {len(fetched_items)} items from dataset")
-    return fetched_items
+async def _stream_actor_async(
+    runtime: ActorRuntime,
+    actor_config: ActorConfig,
+    run_input: dict,
+    map_item,
+    limit: int,
+    poll_interval_secs: int,
+    page_size: int,
+    default_dataset_id: str,
+):
+    replay = get_replay()
+    if replay and replay.replaying:
+        state = _StreamState(actor_config.actor_id, run_input, map_item, limit)
+        state.add_page(await replay.replay_async(actor_config.actor_id, run_input))
+        return state.finish("replayed")
+
+    client = runtime.async_client
+    async with runtime.run_slot_async(actor_config):
+        logger.info(f"Starting actor: {actor_config.actor_id}")
+        run = await client.actor(actor_config.actor_id).start(
+            run_input=run_input,
+            timeout_secs=actor_config.timeout_secs,
+            memory_mbytes=actor_config.memory_mbytes,
+            webhooks=runtime.runs.webhooks,
+        )
+        dataset = client.dataset(run[default_dataset_id])
+        options = dataset_options(actor_config)
+        state = _StreamState(actor_config.actor_id, run_input, map_item, limit)
+
+        finished = run["status"] in TERMINAL_RUN_STATUSES
+        while True:
+            # Drain everything available so far; the status is checked before reading so no late items are missed
+            while True:
+                page = await dataset.list_items(
+                    offset=state.offset, limit=page_size, **options
+                )
+                if state.add_page(page.items):
+                    await _abort_run_async(runtime, actor_config.actor_id, run, state.offset)
+                    return state.finish("limit reached")
+                if len(page.items) < page_size:
+                    break
+            if finished:
+                get_usage_ledger().record(actor_config.actor_id, run, state.offset)
+                return state.finish(f"run {run['status']}")
+            run = await _wait_for_run_async(runtime, actor_config.actor_id, run, poll_interval_secs)
+            finished = run["status"] in TERMINAL_RUN_STATUSES
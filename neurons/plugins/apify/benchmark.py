@@ -0,0 +1,120 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import argparse
+import tracemalloc
+from neurons.apify.replay import FixtureStore
+
+
+def _mapper(query):
+    """
+    Function mapping one raw dataset item with the provider's mapping, returning None for invalid items.
+    """
+    if hasattr(query, "map_item"):
+        return query.map_item
+
+    def map_one(item):
+        mapped = query.map([item])
+        return mapped[0] if mapped else None
+
+    return map_one
+
+
+def benchmark_mapping(query, items: list, repeat: int = 3) -> dict:
+    """
+    Measure how fast and how well a provider maps recorded dataset items.
+
+    Returns:
+        dict: Item count, mapped item count, yield, best mapping time over ``repeat`` runs, items per second
+        and peak memory allocated while mapping.
+    """
+    map_item = _mapper(query)
+    best_secs = None
+    mapped = 0
+    peak_bytes = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        results = []
+        for item in items:
+            try:
+                result = map_item(item)
+            except Exception:
+                continue
+            if result is not None:
+                results.append(result)
+        elapsed = time.perf_counter() - started
+        peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        mapped = len(results)
+        best_secs = elapsed if best_secs is None else min(best_secs, elapsed)
+    return {
+        "items": len(items),
+        "mapped": mapped,
+        "yield": mapped / len(items) if items else 0.0,
+        "map_secs": best_secs or 0.0,
+        "items_per_sec": len(items) / best_secs if best_secs else 0.0,
+        "peak_kbytes": peak_bytes / 1024,
+    }
+
+
+def main():
+    # Imported here so the providers are only loaded when benchmarking
+    from neurons.queries import QUERY_MAP, QueryProvider
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the mapping of recorded Apify datasets per query provider, without running actors."
+    )
+    parser.add_argument("--fixtures", default="fixtures/apify", help="Directory of recorded fixtures.")
+    parser.add_argument("--repeat", type=int, default=3, help="Mapping runs per provider; the fastest is reported.")
+    parser.add_argument(
+        "--provider",
+        action="append",
+        choices=[provider.value for provider in QueryProvider],
+        help="Only benchmark these providers. Defaults to every provider with fixtures.",
+    )
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    print(
+        f"{'provider':<32} {'fixtures':>8} {'items':>8} {'mapped':>8} {'yield':>7} "
+        f"{'map ms':>9} {'items/s':>10} {'peak KB':>9}"
+    )
+    for (_, query_provider), query_class in QUERY_MAP.items():
+        if args.provider and query_provider.value not in args.provider:
+            continue
+        query = query_class()
+        actor_config = getattr(query, "actor_config", None)
+        if actor_config is None:
+            continue
+        fixtures = list(store.iter_fixtures(actor_config.actor_id))
+        if not fixtures:
+            continue
+        items = [item for fixture in fixtures for item in fixture["items"]]
+        result = benchmark_mapping(query, items, args.repeat)
+        print(
+            f"{query_provider.value:<32} {len(fixtures):>8} {result['items']:>8} {result['mapped']:>8} "
+            f"{result['yield']:>7.1%} {result['map_secs'] * 1000:>9.2f} {result['items_per_sec']:>10.0f} "
+            f"{result['peak_kbytes']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import time
+import atexit
+import pickle
+import asyncio
+import logging
+import threading
+import orjson
+from hashlib import sha1
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+def cache_key(actor_id: str, run_input: dict, *extra) -> str:
+    """
+    Build a cache key from the actor id and a canonical form of the run input, so equivalent inputs
+    with differently ordered keys share an entry.
+    """
+    canonical = orjson.dumps([actor_id, run_input, extra], option=orjson.OPT_SORT_KEYS)
+    return f"{actor_id}:{sha1(canonical).hexdigest()}"
+
+
+def source_ttl(source: str, default: int) -> int:
+    """
+    Freshness TTL in seconds for a source, overridable with APIFY_CACHE_TTL_<SOURCE>.
+    A TTL of 0 disables caching for that source.
+    """
+    return int(os.getenv(f"APIFY_CACHE_TTL_{source.upper()}", default))
+
+
+class ResultCache:
+    """
+    Size-bounded LRU cache of mapped actor results with per-entry TTLs and stale-while-revalidate.
+
+    A fresh entry is returned directly. An entry past its TTL but within its stale window is also returned
+    directly, while a single background refresh replaces it. Older entries are refetched in the foreground.
+    Empty results are not cached, so a transient empty run is retried on the next call. With a ``path`` the
+    cache is saved on a background thread at most every ``save_interval_secs``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        path: str = None,
+        refresh_workers: int = 2,
+        save_interval_secs: int = 60,
+    ):
+        """
+        Args:
+            max_entries (int): Maximum number of cached results; the least recently used are evicted first.
+            path (str, optional): File to persist the cache to, so it survives restarts.
+            refresh_workers (int): Threads used for background refreshes of sync fetches.
+            save_interval_secs (int): Minimum time between saves.
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.save_interval_secs = save_interval_secs
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        # Background refreshes of async fetches, kept referenced until they are done
+        self._refresh_tasks = set()
+        self._executor = ThreadPoolExecutor(refresh_workers, thread_name_prefix="apify-cache-refresh")
+        # One thread, so saves never overlap
+        self._save_executor = ThreadPoolExecutor(1, thread_name_prefix="apify-cache-save")
+        self._saved_at = time.monotonic()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as f:
+                self._entries = pickle.load(f)
+        except Exception as e:
+            logger.error(f"Could not load result cache from {self.path}: {e}")
+
+    def save(self):
+        """
+        Write the cache to ``path`` atomically.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = pickle.dumps(self._entries, protocol=pickle.HIGHEST_PROTOCOL)
+            self._saved_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save result cache to {self.path}: {e}")
+
+    def _lookup(self, key: str, ttl_secs: int, stale_secs: int):
+        """
+        Returns:
+            tuple: (value, state) where state is "fresh", "stale" or "miss".
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, "miss"
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < ttl_secs:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, "fresh"
+            if age < ttl_secs + stale_secs:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                return value, "stale"
+            del self._entries[key]
+            self.misses += 1
+            return None, "miss"
+
+    def peek(self, key: str):
+        """
+        Return the cached result for a key however old it is, or None, without refreshing it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self.stale_hits += 1
+            return list(entry[0])
+
+    def put(self, key: str, value):
+        """
+        Cache a result, unless it is empty. A stale entry is kept when its refresh comes back empty.
+        """
+        if not value:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            save = self.path and time.monotonic() - self._saved_at >= self.save_interval_secs
+            if save:
+                self._saved_at = time.monotonic()
+        if save:
+            self._save_executor.submit(self.save)
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _refresh(self, key: str, fetch):
+        try:
+            self.put(key, fetch())
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key: str, fetch):
+        try:
+            self.put(key, await fetch())
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, key: str, fetch, ttl_secs: int, stale_secs: int = 0):
+        """
+        Return the cached result for a key, fetching it with ``fetch()`` when missing or expired.
+        """
+        value, state = self._lookup(key, ttl_secs, stale_secs)
+        if state == "stale" and self._claim_refresh(key):
+            self._executor.submit(self._refresh, key, fetch)
+        if state != "miss":
+            return list(value)
+        value = fetch()
+        self.put(key, value)
+        return list(value)
+
+    async def get_or_fetch_async(self, key: str, fetch, ttl_secs: int, stale_secs: int = 0):
+        """
+        Async variant of ``get_or_fetch``; ``fetch`` is a coroutine function.
+        """
+        value, state = self._lookup(key, ttl_secs, stale_secs)
+        if state == "stale" and self._claim_refresh(key):
+            task = asyncio.get_running_loop().create_task(self._refresh_async(key, fetch))
+            self._refresh_tasks.add(task)
+            task.add_done_callback(self._refresh_tasks.discard)
+        if state != "miss":
+            return list(value)
+        value = await fetch()
+        self.put(key, value)
+        return list(value)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+        }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    """
+    Get the shared result cache, sized by APIFY_CACHE_MAX_ENTRIES and persisted to APIFY_CACHE_PATH if set,
+    at most once a minute and at exit.
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ResultCache(
+                max_entries=int(os.getenv("APIFY_CACHE_MAX_ENTRIES", 1024)),
+                path=os.getenv("APIFY_CACHE_PATH"),
+            )
+            atexit.register(_result_cache.save)
+        return _result_cache
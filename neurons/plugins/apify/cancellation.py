@@ -0,0 +1,52 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import threading
+import contextvars
+
+# Cancel event of the call the current code runs for. Event loop callbacks and tasks copy the context, so the
+# event also reaches coroutines scheduled on the actor runtime loop from the call.
+_cancel_event = contextvars.ContextVar("apify_cancel_event", default=None)
+
+
+class RunCancelled(Exception):
+    """
+    Raised in an actor run whose result is no longer wanted.
+    """
+
+
+async def call_cancellable_async(cancel_event: threading.Event, coro_fn, *args, **kwargs):
+    """
+    Await ``coro_fn`` so that the actor runs it starts abort once ``cancel_event`` is set.
+    Must run in its own task, so the cancel event does not leak into the caller's context.
+    """
+    token = _cancel_event.set(cancel_event)
+    try:
+        return await coro_fn(*args, **kwargs)
+    finally:
+        _cancel_event.reset(token)
+
+
+def cancel_requested() -> bool:
+    """
+    Returns:
+        bool: True if the call the current code runs for has been cancelled.
+    """
+    cancel_event = _cancel_event.get()
+    return cancel_event is not None and cancel_event.is_set()
@@ -0,0 +1,201 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque, defaultdict
+from neurons.structures.token_bucket import AsyncTokenBucket
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Runs that wait longer than this to start are logged
+SLOW_START_SECS = 1.0
+
+
+class RunSlot:
+    """
+    Admission to start one actor run, returned by ``RunLimiter.acquire`` and given back to ``RunLimiter.release``.
+    """
+
+    __slots__ = ("actor_id", "memory_mbytes", "wait_secs")
+
+    def __init__(self, actor_id: str, memory_mbytes: int, wait_secs: float = 0.0):
+        self.actor_id = actor_id
+        self.memory_mbytes = memory_mbytes
+        self.wait_secs = wait_secs
+
+
+class _Waiter:
+    __slots__ = ("slot", "max_runs", "future")
+
+    def __init__(self, slot: RunSlot, max_runs: int, future: asyncio.Future):
+        self.slot = slot
+        self.max_runs = max_runs
+        self.future = future
+
+
+class RunLimiter:
+    """
+    Bounds the actor runs a process has in flight.
+
+    A run needs a free slot of its actor (at most ``max_concurrent_runs`` runs per actor id), its memory from
+    the shared memory budget, and a token from its actor's run start bucket. Waiters are admitted in arrival
+    order: a waiter blocked only by its own actor's limit is skipped so other actors keep going, but once a
+    waiter is blocked by the memory budget no later waiter may take memory, so large runs are not starved.
+
+    All methods must be called from one event loop, the actor runtime loop.
+    """
+
+    def __init__(
+        self,
+        memory_budget_mbytes: int = 8192,
+        default_memory_mbytes: int = 1024,
+        max_concurrent_runs: int = 4,
+        run_starts_per_sec: float = 1.0,
+    ):
+        """
+        Args:
+            memory_budget_mbytes (int): Memory all concurrent runs may use together.
+            default_memory_mbytes (int): Memory assumed for actors without a memory limit.
+            max_concurrent_runs (int): Default number of concurrent runs per actor id.
+            run_starts_per_sec (float): Default run start rate per actor id. 0 disables rate limiting.
+        """
+        self.memory_budget_mbytes = memory_budget_mbytes
+        self.default_memory_mbytes = default_memory_mbytes
+        self.max_concurrent_runs = max_concurrent_runs
+        self.run_starts_per_sec = run_starts_per_sec
+        self.memory_in_use = 0
+        self._waiters = deque()
+        self._running = defaultdict(int)
+        self._buckets = {}
+        self._metrics = defaultdict(lambda: {"started": 0, "wait_secs_total": 0.0, "wait_secs_max": 0.0})
+
+    def _bucket(self, actor_id: str, rate: float) -> AsyncTokenBucket:
+        bucket = self._buckets.get(actor_id)
+        if bucket is None or bucket.rate != rate:
+            bucket = self._buckets[actor_id] = AsyncTokenBucket(rate)
+        return bucket
+
+    def _admit(self):
+        memory_blocked = False
+        remaining = deque()
+        for waiter in self._waiters:
+            slot = waiter.slot
+            if waiter.future.done():
+                # Cancelled while waiting
+                continue
+            if self._running[slot.actor_id] >= waiter.max_runs:
+                remaining.append(waiter)
+                continue
+            if memory_blocked or self.memory_in_use + slot.memory_mbytes > self.memory_budget_mbytes:
+                memory_blocked = True
+                remaining.append(waiter)
+                continue
+            self._running[slot.actor_id] += 1
+            self.memory_in_use += slot.memory_mbytes
+            waiter.future.set_result(None)
+        self._waiters = remaining
+
+    async def acquire(
+        self,
+        actor_id: str,
+        memory_mbytes: int = None,
+        max_concurrent_runs: int = None,
+        run_starts_per_sec: float = None,
+    ) -> RunSlot:
+        """
+        Wait until a run of the actor may start.
+
+        Args:
+            actor_id (str): The ID of the actor.
+            memory_mbytes (int, optional): Memory of the run. Defaults to ``default_memory_mbytes``.
+            max_concurrent_runs (int, optional): Override of the actor's concurrent run limit.
+            run_starts_per_sec (float, optional): Override of the actor's run start rate.
+
+        Returns:
+            RunSlot: The admission, to be released once the run has finished.
+        """
+        started = time.monotonic()
+        # A run larger than the whole budget may still start, alone
+        memory = min(memory_mbytes or self.default_memory_mbytes, self.memory_budget_mbytes)
+        slot = RunSlot(actor_id, memory)
+        waiter = _Waiter(
+            slot,
+            max_concurrent_runs or self.max_concurrent_runs,
+            asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        self._admit()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted just before being cancelled
+                self.release(slot)
+            raise
+
+        rate = self.run_starts_per_sec if run_starts_per_sec is None else run_starts_per_sec
+        try:
+            await self._bucket(actor_id, rate).acquire()
+        except asyncio.CancelledError:
+            self.release(slot)
+            raise
+
+        slot.wait_secs = time.monotonic() - started
+        metrics = self._metrics[actor_id]
+        metrics["started"] += 1
+        metrics["wait_secs_total"] += slot.wait_secs
+        metrics["wait_secs_max"] = max(metrics["wait_secs_max"], slot.wait_secs)
+        if slot.wait_secs >= SLOW_START_SECS:
+            logger.info(f"Waited {slot.wait_secs:.2f}s to start actor {actor_id}, {self.stats()['totals']}")
+        return slot
+
+    def release(self, slot: RunSlot):
+        """
+        Give back the slot of a finished run and admit waiting runs.
+        """
+        self._running[slot.actor_id] -= 1
+        self.memory_in_use -= slot.memory_mbytes
+        self._admit()
+
+    def stats(self) -> dict:
+        waiting = defaultdict(int)
+        for waiter in self._waiters:
+            waiting[waiter.slot.actor_id] += 1
+        actors = {}
+        for actor_id in set(self._metrics) | set(self._running) | set(waiting):
+            metrics = self._metrics[actor_id]
+            actors[actor_id] = {
+                "running": self._running[actor_id],
+                "waiting": waiting[actor_id],
+                "started": metrics["started"],
+                "wait_secs_avg": metrics["wait_secs_total"] / metrics["started"] if metrics["started"] else 0.0,
+                "wait_secs_max": metrics["wait_secs_max"],
+            }
+        return {
+            "totals": {
+                "running": sum(self._running.values()),
+                "waiting": len(self._waiters),
+                "memory_in_use_mbytes": self.memory_in_use,
+                "memory_budget_mbytes": self.memory_budget_mbytes,
+            },
+            "actors": actors,
+        }
@@ -0,0 +1,250 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import re
+import abc
+import asyncio
+import logging
+from typing import Callable, Dict, List
+from neurons.apify.actors import get_runtime
+from neurons.apify.cancellation import RunCancelled
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+TWEET_URL_PATTERN = re.compile(r"(?:twitter\.com|x\.com)/\w+/status/(\d+)")
+REDDIT_URL_PATTERN = re.compile(r"/comments/([a-z0-9]+)(?:/[^/?#]*/([a-z0-9]+))?", re.IGNORECASE)
+
+
+class _NotFound:
+    """
+    Marker for looked up ids the provider has no item for.
+    """
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return "NOT_FOUND"
+
+
+NOT_FOUND = _NotFound()
+
+
+def tweet_id(url: str) -> str:
+    """
+    Returns:
+        str: The id of the tweet a status url points to, or None for other urls.
+    """
+    match = TWEET_URL_PATTERN.search(url or "")
+    return match.group(1) if match else None
+
+
+def reddit_id(url: str) -> str:
+    """
+    Returns:
+        str: The full name of the post (t3_) or comment (t1_) a reddit url points to, or None for other urls.
+    """
+    match = REDDIT_URL_PATTERN.search(url or "")
+    if not match:
+        return None
+    post, comment = match.groups()
+    return f"t1_{comment}" if comment else f"t3_{post}"
+
+
+def has_comment_urls(urls: List[str]) -> bool:
+    """
+    Returns:
+        bool: Whether any of the reddit urls points to a comment rather than a post.
+    """
+    return any((reddit_id(url) or "").startswith("t1_") for url in urls)
+
+
+def found_items(lookup: Dict[str, object]) -> list:
+    """
+    Returns:
+        list: The items of a lookup result, without the ids that were not found.
+    """
+    return [item for item in lookup.values() if item is not NOT_FOUND]
+
+
+async def batched_lookup(
+    requests: List[str],
+    fetch_batch: Callable,
+    batch_size: int,
+    request_key: Callable[[str], str],
+    item_key: Callable[[dict], str],
+    chunk: Callable[[List[str]], List[List[str]]] = None,
+    recheck_missing: bool = False,
+) -> Dict[str, object]:
+    """
+    Look up many urls or ids with one fetch per batch, running the batches concurrently.
+
+    Args:
+        requests (list): The urls or ids to look up.
+        fetch_batch (callable): Coroutine function fetching the items of one batch of requests.
+        batch_size (int): Maximum number of requests per fetch.
+        request_key (callable): The id a request looks up, or None if it cannot be looked up.
+        item_key (callable): The id of a fetched item.
+        chunk (callable, optional): Splits the requests into batches, instead of by ``batch_size``.
+        recheck_missing (bool): Fetch the ids a batch of several came back without again on their own before
+            reporting them NOT_FOUND, for fetches whose item cap applies to the whole batch, where extra items
+            for some requests can crowd out the items of others.
+
+    Returns:
+        dict: The found item or NOT_FOUND for every requested id. Requests without an id are keyed by
+        themselves and NOT_FOUND. Ids of batches whose fetch failed are left out, as their state is unknown.
+    """
+    results = {}
+    batch_requests = {}
+    for request in requests:
+        key = request_key(request)
+        if key is None:
+            results[request] = NOT_FOUND
+        else:
+            batch_requests.setdefault(key, request)
+
+    keys = list(batch_requests)
+    if chunk:
+        key_of = {request: key for key, request in batch_requests.items()}
+        batches = [
+            [key_of[request] for request in batch]
+            for batch in chunk([batch_requests[key] for key in keys])
+        ]
+    else:
+        batches = [keys[i : i + batch_size] for i in range(0, len(keys), batch_size)]
+    fetched = await asyncio.gather(
+        *(fetch_batch([batch_requests[key] for key in batch]) for batch in batches),
+        return_exceptions=True,
+    )
+    for batch, items in zip(batches, fetched):
+        if isinstance(items, RunCancelled):
+            raise items
+        if isinstance(items, BaseException):
+            logger.warning(f"Lookup of {len(batch)} items failed: {items}")
+            continue
+        found = {}
+        for item in items:
+            try:
+                found.setdefault(item_key(item), item)
+            except (KeyError, TypeError):
+                continue
+        for key in batch:
+            results[key] = found.get(key, NOT_FOUND)
+
+    if recheck_missing:
+        missing = [key for batch in batches if len(batch) > 1 for key in batch if results.get(key) is NOT_FOUND]
+        if missing:
+            logger.info(f"Looking up {len(missing)} items missing from their batches on their own")
+            rechecked = await batched_lookup(
+                [batch_requests[key] for key in missing], fetch_batch, 1, request_key, item_key
+            )
+            for key in missing:
+                if key in rechecked:
+                    results[key] = rechecked[key]
+                else:
+                    results.pop(key)
+    return results
+
+
+class UrlLookup(abc.ABC):
+    """
+    Batched url lookups for providers that implement ``search_by_url_async``.
+
+    Subclasses set ``lookup_batch_size`` to the number of urls their actor handles well in one run and
+    implement ``lookup_key`` and ``item_key``. Urls missing from the result of a run for several urls are
+    looked up again on their own before they are reported not found, as actors cap the items of a whole run.
+    """
+
+    lookup_batch_size = 20
+
+    @staticmethod
+    @abc.abstractmethod
+    def lookup_key(url: str) -> str:
+        """
+        Returns:
+            str: The id a url looks up, or None if it cannot be looked up.
+        """
+
+    @staticmethod
+    @abc.abstractmethod
+    def item_key(item: dict) -> str:
+        """
+        Returns:
+            str: The id of a fetched item.
+        """
+
+    @abc.abstractmethod
+    async def search_by_url_async(self, urls: list) -> list:
+        """
+        Returns:
+            list: The mapped items found for the urls.
+        """
+
+    async def lookup_by_url_async(self, urls: list) -> Dict[str, object]:
+        """
+        Look up items by url, one actor run per batch of urls.
+
+        Returns:
+            dict: The found item or NOT_FOUND per id, see ``batched_lookup``.
+        """
+        return await batched_lookup(
+            urls,
+            self.search_by_url_async,
+            self.lookup_batch_size,
+            self.lookup_key,
+            self.item_key,
+            recheck_missing=True,
+        )
+
+    def lookupByUrl(self, urls: list) -> Dict[str, object]:
+        """
+        Blocking wrapper of ``lookup_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.lookup_by_url_async(urls)
+        )
+
+
+class TweetUrlLookup(UrlLookup):
+    """
+    Batched lookups of tweets by status url, keyed by tweet id.
+    """
+
+    @staticmethod
+    def lookup_key(url: str) -> str:
+        return tweet_id(url)
+
+    @staticmethod
+    def item_key(item: dict) -> str:
+        return tweet_id(item.get("url")) or str(item["id"])
+
+
+class RedditUrlLookup(UrlLookup):
+    """
+    Batched lookups of reddit posts and comments by url, keyed by their full name.
+    """
+
+    @staticmethod
+    def lookup_key(url: str) -> str:
+        return reddit_id(url)
+
+    @staticmethod
+    def item_key(item: dict) -> str:
+        return reddit_id(item["url"]) or item["id"]
@@ -0,0 +1,334 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+from collections import namedtuple
+from operator import itemgetter
+from typing import Callable, List, Tuple
+from neurons.apify.actors import add_mapping_failures
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+MONTHS = {
+    name: number
+    for number, name in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], start=1
+    )
+}
+
+
+def _parse_twitter_date(value: str) -> datetime:
+    # "Wed Oct 10 20:19:24 +0000 2018", parsed by hand as strptime is slow
+    _, month, day, clock, offset, year = value.split()
+    hour, minute, second = clock.split(":")
+    parsed = datetime(
+        int(year), MONTHS[month], int(day), int(hour), int(minute), int(second), tzinfo=timezone.utc
+    )
+    offset_minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+    if offset[0] == "-":
+        offset_minutes = -offset_minutes
+    return parsed - timedelta(minutes=offset_minutes)
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Parse the timestamp formats of the actors: epoch seconds, ISO 8601 with or without a "Z" suffix, and the
+    Twitter API date format.
+
+    Returns:
+        datetime: The timestamp in UTC. Naive timestamps are taken to be UTC.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, timezone.utc)
+    else:
+        value = value.strip()
+        if value[:1].isdigit():
+            if value.endswith("Z"):
+                value = value[:-1] + "+00:00"
+            parsed = datetime.fromisoformat(value)
+        else:
+            return _parse_twitter_date(value)
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def same_timestamp(a, b) -> bool:
+    """
+    Whether two timestamps in any of the actor formats denote the same second, so items mapped by different
+    providers, or by miners running earlier versions, compare equal whatever their precision and format.
+    """
+    try:
+        return parse_timestamp(a).replace(microsecond=0) == parse_timestamp(b).replace(microsecond=0)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return False
+
+
+def tweet_timestamp(value) -> str:
+    """
+    Returns:
+        str: The timestamp in the sn3 tweet format, for example "2023-11-20 12:34:56+00:00".
+    """
+    return parse_timestamp(value).isoformat(sep=" ", timespec="seconds")
+
+
+def reddit_timestamp(value) -> str:
+    """
+    Returns:
+        str: The timestamp in the sn3 reddit format, for example "2023-11-20T12:34:56.000Z".
+    """
+    return parse_timestamp(value).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class Record:
+    """
+    Read access by key for the tuple-backed records, so they can stand in for the dicts they replace.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, field: str, default=None):
+        return getattr(self, field, default) if field in self._fields else default
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._fields, self))
+
+
+class Tweet(
+    Record,
+    namedtuple("Tweet", ["id", "url", "text", "likes", "images", "username", "hashtags", "timestamp"]),
+):
+    """
+    Mapped tweet. Fields a provider does not map are None.
+    """
+
+    __slots__ = ()
+
+
+class RedditItem(
+    Record,
+    namedtuple(
+        "RedditItem",
+        ["id", "url", "title", "text", "likes", "dataType", "community", "username", "parent", "timestamp"],
+    ),
+):
+    """
+    Mapped reddit post or comment. Fields a provider does not map are None.
+    """
+
+    __slots__ = ()
+
+
+# Marks a field without a default, whose absence fails the item
+REQUIRED = object()
+
+
+class Field:
+    """
+    Declares where a record field comes from in a dataset item.
+
+    Args:
+        source: A key, a dotted path into nested objects, a tuple of those of which the first non-empty value
+            is used, or a callable taking the item.
+        convert (callable, optional): Applied to the value, for example to normalize timestamps.
+        default: Used when the source is missing. Without a default a missing source fails the item.
+    """
+
+    def __init__(self, source, convert: Callable = None, default=REQUIRED):
+        self.source = source
+        self.convert = convert
+        self.default = default
+
+
+def _compile_source(source, default) -> Callable:
+    if callable(source):
+        return source
+    if isinstance(source, tuple):
+        getters = [_compile_source(alternative, None) for alternative in source]
+
+        def first(item):
+            for getter in getters:
+                value = getter(item)
+                if value:
+                    return value
+            if default is REQUIRED:
+                raise KeyError(source)
+            return default
+
+        return first
+    keys = source.split(".")
+    if default is not REQUIRED:
+        if len(keys) == 1:
+            return lambda item: item.get(source, default)
+
+        def get_path(item):
+            for key in keys:
+                if not isinstance(item, dict) or key not in item:
+                    return default
+                item = item[key]
+            return item
+
+        return get_path
+    if len(keys) == 1:
+        return itemgetter(source)
+
+    def get_required_path(item):
+        for key in keys:
+            item = item[key]
+        return item
+
+    return get_required_path
+
+
+def _compile_field(field) -> Callable:
+    if not isinstance(field, Field):
+        field = Field(field)
+    getter = _compile_source(field.source, field.default)
+    convert = field.convert
+    if convert is None:
+        return getter
+    return lambda item: convert(getter(item))
+
+
+class Mapper:
+    """
+    Maps dataset items to records with getters compiled once from a declarative field spec.
+
+    Items that fail to map are counted per batch instead of being logged one by one.
+    """
+
+    def __init__(self, name: str, record_type: type, **spec):
+        """
+        Args:
+            name (str): Name used when logging mapping failures.
+            record_type (type): The Record subclass to produce.
+            **spec: Per record field, its key, dotted path, tuple of alternatives, callable or ``Field``.
+        """
+        unknown = set(spec) - set(record_type._fields)
+        if unknown:
+            raise ValueError(f"{record_type.__name__} has no fields {sorted(unknown)}")
+        self.name = name
+        self.record_type = record_type
+        # The sn3 dicts only carry the fields the provider maps
+        self.fields = tuple(field for field in record_type._fields if field in spec)
+        self._getters = [
+            _compile_field(spec[field]) if field in spec else (lambda item: None)
+            for field in record_type._fields
+        ]
+        self._make = record_type._make
+        indices = [record_type._fields.index(field) for field in self.fields]
+        self._values = itemgetter(*indices) if len(indices) > 1 else lambda record: (record[indices[0]],)
+
+    def map_record(self, item: dict) -> Record:
+        """
+        Map one dataset item, raising if it lacks a required field or a value cannot be converted.
+        """
+        return self._make([getter(item) for getter in self._getters])
+
+    def map_records(self, items: List[dict]) -> Tuple[List[Record], int]:
+        """
+        Map a batch of dataset items, skipping the ones that fail.
+
+        Returns:
+            tuple: The records and the number of items that failed to map.
+        """
+        records = []
+        failures = 0
+        first_error = None
+        map_record = self.map_record
+        for item in items:
+            try:
+                records.append(map_record(item))
+            except Exception as e:
+                failures += 1
+                if first_error is None:
+                    first_error = e
+        if failures:
+            logger.warning(
+                f"Failed to map {failures}/{len(items)} items from {self.name}, first error: {first_error!r}"
+            )
+            add_mapping_failures(failures)
+        return records, failures
+
+    def to_dict(self, record: Record) -> dict:
+        """
+        Returns:
+            dict: The record in the sn3 format, with the fields this mapper maps.
+        """
+        return dict(zip(self.fields, self._values(record)))
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map one dataset item to the sn3 format, raising if it cannot be mapped.
+        """
+        return self.to_dict(self.map_record(item))
+
+    def map(self, items: List[dict]) -> List[dict]:
+        """
+        Map a batch of dataset items to the sn3 format, skipping the ones that fail.
+        """
+        records, _ = self.map_records(items)
+        return [self.to_dict(record) for record in records]
+
+
+def hashtags(entities_key: str = "entities") -> Callable:
+    """
+    Returns:
+        callable: Getter of the "#"-prefixed hashtags of a tweet from its Twitter API entities.
+    """
+
+    def get_hashtags(item):
+        entities = item.get(entities_key) or {}
+        return ["#" + tag["text"] for tag in entities.get("hashtags", [])]
+
+    return get_hashtags
+
+
+def media_images(extended_entities_key: str, entities_key: str = "entities") -> Callable:
+    """
+    Returns:
+        callable: Getter of the image urls of a tweet from its Twitter API entities.
+    """
+
+    def get_images(item):
+        media = (item.get(entities_key) or {}).get("media")
+        if not media:
+            return []
+        # Only tweets with media pay for the media url lookup
+        extended_entities = item.get(extended_entities_key) or {}
+        media_urls = {
+            m["media_key"]: m["media_url_https"]
+            for m in extended_entities.get("media", [])
+            if m.get("media_url_https")
+        }
+        return [media_urls[m["media_key"]] for m in media if m.get("media_key") in media_urls]
+
+    return get_images
@@ -1,12 +1,31 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
-from datetime import datetime
+from neurons.apify.actors import (
+    run_actor_async,
+    stream_actor_async,
+    ActorConfig,
+    get_runtime,
+)
+from neurons.apify.cache import source_ttl
+from neurons.apify.lookup import RedditUrlLookup, has_comment_urls
+from neurons.apify.mapping import Mapper, Field, RedditItem, reddit_timestamp
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
+EPCTEX_MAPPER = Mapper(
+    "epctex reddit scraper",
+    RedditItem,
+    id="id",
+    url="url",
+    title=Field("title", default=None),
+    text="text",
+    likes="score",
+    dataType="type",
+    timestamp=Field("createdAt", reddit_timestamp),
+)
 
-class EpctexRedditScraper:
+
+class EpctexRedditScraper(RedditUrlLookup):
     """
     A class designed to scrap reddit posts based on specific search queries using the Apify platform.
 
@@ -14,27 +33,38 @@ class EpctexRedditScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    lookup_batch_size = 10
+
     def __init__(self):
         """
         Initialize the EpctexRedditScraper.
         """
         self.actor_config = ActorConfig("jwR5FKaWaGSmkeq2b")
+        self.actor_config.dataset_fields = [
+            "id", "url", "title", "text", "score", "type", "createdAt", "comments"
+        ]
+        self.actor_config.cache_ttl_secs = source_ttl("reddit", 600)
+        self.actor_config.cache_stale_secs = self.actor_config.cache_ttl_secs
 
-    def searchByUrl(
+    async def search_by_url_async(
         self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
     ):
+        """
+        Search for reddit posts and comments by url.
+        """
         run_input = {
             "customMapFunction": "(object) => { return {...object} }",
             "endPage": 1,
             "extendOutputFunction": "($) => { return {} }",
-            "includeComments": True,
+            # Whole comment trees are only worth scraping when a comment is looked up
+            "includeComments": has_comment_urls(urls),
             "proxy": {"useApifyProxy": True},
             "startUrls": urls,
             "sort": "relevance",
             "time": "all",
         }
 
-        posts = run_actor(self.actor_config, run_input)
+        posts = await run_actor_async(self.actor_config, run_input)
 
         # Flatten list, un-nesting comments
         def flatten_comments(comments, flat_list):
@@ -55,7 +85,7 @@ class EpctexRedditScraper:
         all_items = []
 
         for post in posts:
-            flatten_comments(post["comments"], all_items)
+            flatten_comments(post.get("comments") or [], all_items)
             all_items.append(
                 {
                     "id": post["id"],
@@ -69,7 +99,17 @@ class EpctexRedditScraper:
 
         return self.map(all_items)
 
-    def execute(
+    def searchByUrl(
+        self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
+    ):
+        """
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls)
+        )
+
+    async def execute_async(
         self, search_queries: list = ["bittensor"], limit_number: int = 15
     ) -> list:
         """
@@ -94,35 +134,38 @@ class EpctexRedditScraper:
             "time": "all",
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
+        # Map items as they are scraped and stop the run as soon as enough are available
+        return await stream_actor_async(
+            self.actor_config, run_input, map_item=self.map_item, limit=limit_number
+        )
+
+    def execute(
+        self, search_queries: list = ["bittensor"], limit_number: int = 15
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(search_queries, limit_number)
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return EPCTEX_MAPPER.map_item(item)
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [
-            {
-                "id": item["id"],
-                "url": item["url"],
-                "title": item.get("title"),
-                "text": item["text"],
-                "likes": item["score"],
-                "dataType": item["type"],
-                "timestamp": datetime.utcfromtimestamp(item["createdAt"]).strftime(
-                    "%Y-%m-%dT%H:%M:%S.%f"
-                )[:-3]
-                + "Z",
-            }
-            for item in input
-        ]
-        return filtered_input
+        return EPCTEX_MAPPER.map(input)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,31 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
+from datetime import datetime
+from neurons.apify.actors import (
+    run_actor_async,
+    stream_actor_async,
+    ActorConfig,
+    get_runtime,
+)
+from neurons.apify.cache import source_ttl
+from neurons.apify.lookup import RedditUrlLookup, has_comment_urls
+from neurons.apify.mapping import Mapper, Field, RedditItem, reddit_timestamp
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
+REDDIT_SCRAPER_MAPPER = Mapper(
+    "reddit scraper",
+    RedditItem,
+    id="id",
+    url="url",
+    text="body",
+    likes="upVotes",
+    dataType="dataType",
+    timestamp=Field("createdAt", reddit_timestamp),
+)
 
-class RedditScraper:
+
+class RedditScraper(RedditUrlLookup):
     """
     A class designed to scrap reddit posts based on specific search queries using the Apify platform.
 
@@ -13,24 +33,35 @@ class RedditScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    lookup_batch_size = 25
+    # execute only searches for items posted after ``since`` when it is given
+    supports_since = True
+
     def __init__(self):
         """
         Initialize the RedditScraper
         """
         self.actor_config = ActorConfig("FgJtjDwJCLhRH9saM")
+        self.actor_config.dataset_fields = [
+            "id", "url", "body", "upVotes", "dataType", "createdAt"
+        ]
+        self.actor_config.cache_ttl_secs = source_ttl("reddit", 600)
+        self.actor_config.cache_stale_secs = self.actor_config.cache_ttl_secs
 
-    def searchByUrl(
+    async def search_by_url_async(
         self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
     ):
         """
         Search for reddit posts by url.
         """
+        # Comments only need scraping when a comment is looked up, along with its post
+        with_comments = has_comment_urls(urls)
         run_input = {
             "debugMode": False,
             "maxComments": 1,
             "maxCommunitiesCount": 1,
-            "maxItems": 1,
-            "maxPostCount": 1,
+            "maxItems": len(urls) * (2 if with_comments else 1),
+            "maxPostCount": len(urls),
             "maxUserCount": 1,
             "proxy": {"useApifyProxy": True},
             "scrollTimeout": 40,
@@ -38,19 +69,36 @@ class RedditScraper:
             "searchCommunities": False,
             "searchPosts": True,
             "searchUsers": False,
-            "skipComments": False,
-            "startUrls": [{"url": urls[0]}],
+            "skipComments": not with_comments,
+            "startUrls": [{"url": url} for url in urls],
         }
-        return self.map(run_actor(self.actor_config, run_input))
+        return self.map(await run_actor_async(self.actor_config, run_input))
 
-    def execute(
-        self, search_queries: list = ["bittensor"], limit_number: int = 15
+    def searchByUrl(
+        self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
+    ):
+        """
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls)
+        )
+
+    async def execute_async(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+        since: datetime = None,
     ) -> list:
         """
         Execute the reddit post query process using the specified search queries.
 
         Args:
             search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+            since (datetime, optional): Only search for items posted after this time.
 
         Returns:
             list: A list of reddit posts.
@@ -71,32 +119,56 @@ class RedditScraper:
             "searches": search_queries,
             "skipComments": False,
         }
+        if since is not None:
+            # Newest posts first, and none older than the date limit
+            run_input["sort"] = "new"
+            run_input["postDateLimit"] = since.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-        return self.map(run_actor(self.actor_config, run_input))
+        # Map items as they are scraped and stop the run as soon as enough are available
+        return await stream_actor_async(
+            self.actor_config, run_input, map_item=self.map_item, limit=limit_number
+        )
+
+    def execute(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+        since: datetime = None,
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(
+                search_queries,
+                limit_number,
+                validator_key,
+                validator_version,
+                miner_uid,
+                since,
+            )
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return REDDIT_SCRAPER_MAPPER.map_item(item)
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [
-            {
-                "id": item["id"],
-                "url": item["url"],
-                "text": item["body"],
-                "likes": item["upVotes"],
-                "dataType": item["dataType"],
-                "timestamp": item["createdAt"],
-            }
-            for item in input
-        ]
-        return filtered_input
+        return REDDIT_SCRAPER_MAPPER.map(input)
 
 
 if __name__ == "__main__":
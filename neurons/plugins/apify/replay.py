@@ -0,0 +1,209 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import gzip
+import time
+import random
+import asyncio
+import logging
+import threading
+import orjson
+from neurons.apify.cache import cache_key
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class FixtureNotFound(KeyError):
+    """
+    Raised when replaying an actor run that was never recorded.
+    """
+
+
+class FixtureStore:
+    """
+    Recorded actor datasets, one gzip JSON lines file per actor and run input.
+
+    The first line of a fixture holds the actor id, the run input and the latency of the recorded run;
+    every following line is one raw dataset item.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def path_for(self, actor_id: str, run_input: dict) -> str:
+        key = cache_key(actor_id, run_input).split(":", 1)[1]
+        return os.path.join(self.directory, actor_id, f"{key}.jsonl.gz")
+
+    def save(self, actor_id: str, run_input: dict, items: list, latency_secs: float):
+        path = self.path_for(actor_id, run_input)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        header = {
+            "actor_id": actor_id,
+            "run_input": run_input,
+            "latency_secs": latency_secs,
+            "item_count": len(items),
+            "recorded_at": time.time(),
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(header) + b"\n")
+            for item in items:
+                f.write(orjson.dumps(item) + b"\n")
+        os.replace(tmp_path, path)
+        logger.info(f"Recorded {len(items)} items of actor {actor_id} to {path}")
+
+    def _read(self, path: str):
+        with gzip.open(path, "rb") as f:
+            header = orjson.loads(f.readline())
+            header["items"] = [orjson.loads(line) for line in f if line.strip()]
+        return header
+
+    def load(self, actor_id: str, run_input: dict) -> dict:
+        """
+        Returns:
+            dict: The fixture header with its dataset under "items".
+
+        Raises:
+            FixtureNotFound: If the run was not recorded.
+        """
+        path = self.path_for(actor_id, run_input)
+        if not os.path.exists(path):
+            raise FixtureNotFound(f"No fixture for actor {actor_id} at {path}")
+        return self._read(path)
+
+    def iter_fixtures(self, actor_id: str = None):
+        """
+        Yield every recorded fixture, optionally only those of one actor.
+        """
+        if not os.path.isdir(self.directory):
+            return
+        actor_ids = [actor_id] if actor_id else sorted(os.listdir(self.directory))
+        for actor_id in actor_ids:
+            actor_dir = os.path.join(self.directory, actor_id)
+            if not os.path.isdir(actor_dir):
+                continue
+            for name in sorted(os.listdir(actor_dir)):
+                if name.endswith(".jsonl.gz"):
+                    yield self._read(os.path.join(actor_dir, name))
+
+
+class ActorReplay:
+    """
+    Records actor datasets to fixtures or serves actor runs from them instead of Apify.
+
+    In "record" mode runs go to Apify as usual and their raw datasets are saved. In "replay" mode runs are
+    answered from the fixtures after a simulated latency, the recorded latency times ``latency_scale`` unless
+    ``latency_secs`` is set, and fail with probability ``failure_rate``.
+    """
+
+    def __init__(
+        self,
+        mode: str,
+        store: FixtureStore,
+        latency_scale: float = 1.0,
+        latency_secs: float = None,
+        failure_rate: float = 0.0,
+        seed: int = None,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        self.mode = mode
+        self.store = store
+        self.latency_scale = latency_scale
+        self.latency_secs = latency_secs
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def record(self, actor_id: str, run_input: dict, items: list, latency_secs: float):
+        try:
+            self.store.save(actor_id, run_input, items, latency_secs)
+        except OSError as e:
+            logger.warning(f"Could not record fixture of actor {actor_id}: {e}")
+
+    def _simulate(self, actor_id: str, run_input: dict):
+        fixture = self.store.load(actor_id, run_input)
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        latency = self.latency_secs if self.latency_secs is not None else fixture["latency_secs"] * self.latency_scale
+        return fixture, failed, latency
+
+    def replay(self, actor_id: str, run_input: dict) -> list:
+        """
+        Serve a recorded run, blocking for the simulated latency.
+        """
+        fixture, failed, latency = self._simulate(actor_id, run_input)
+        time.sleep(latency)
+        if failed:
+            raise RuntimeError(f"Simulated failure of actor {actor_id}")
+        return fixture["items"]
+
+    async def replay_async(self, actor_id: str, run_input: dict) -> list:
+        """
+        Serve a recorded run after the simulated latency.
+        """
+        fixture, failed, latency = self._simulate(actor_id, run_input)
+        await asyncio.sleep(latency)
+        if failed:
+            raise RuntimeError(f"Simulated failure of actor {actor_id}")
+        return fixture["items"]
+
+
+_replay = None
+_replay_configured = False
+_replay_lock = threading.Lock()
+
+
+def configure_replay(mode: str = None, directory: str = "fixtures/apify", **kwargs) -> ActorReplay:
+    """
+    Set the process-wide record/replay mode. A mode of None or "" turns recording and replaying off.
+    """
+    global _replay, _replay_configured
+    with _replay_lock:
+        _replay = ActorReplay(mode, FixtureStore(directory), **kwargs) if mode else None
+        _replay_configured = True
+    if mode:
+        logger.info(f"Actor runs are {'recorded to' if mode == 'record' else 'replayed from'} {directory}")
+    return _replay
+
+
+def get_replay() -> ActorReplay:
+    """
+    Get the process-wide record/replay layer, or None when actor runs go to Apify unrecorded.
+    Configured on first use from APIFY_REPLAY_MODE (record or replay), APIFY_FIXTURES_DIR,
+    APIFY_REPLAY_LATENCY_SCALE and APIFY_REPLAY_FAILURE_RATE.
+    """
+    if not _replay_configured:
+        configure_replay(
+            os.getenv("APIFY_REPLAY_MODE"),
+            os.getenv("APIFY_FIXTURES_DIR", "fixtures/apify"),
+            latency_scale=float(os.getenv("APIFY_REPLAY_LATENCY_SCALE", 1.0)),
+            failure_rate=float(os.getenv("APIFY_REPLAY_FAILURE_RATE", 0.0)),
+        )
+    return _replay
@@ -0,0 +1,212 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Optional
+from aiohttp import web
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Run statuses after which no more dataset items will appear
+TERMINAL_RUN_STATUSES = {"SUCCEEDED", "FAILED", "TIMED-OUT", "ABORTED"}
+
+# Events of a run reaching one of the terminal statuses
+WEBHOOK_EVENT_TYPES = ["ACTOR.RUN.SUCCEEDED", "ACTOR.RUN.FAILED", "ACTOR.RUN.TIMED_OUT", "ACTOR.RUN.ABORTED"]
+
+WEBHOOK_PATH = "/apify/webhook"
+
+
+class RunTracker:
+    """
+    Tracks the in-flight actor runs of a runtime from one coordinator task on the runtime loop.
+
+    Runs are started without waiting for them; callers then wait on a future per run that is resolved with the
+    finished run object. Finished runs are reported by Apify webhooks to an embedded HTTP receiver when
+    ``webhook_url`` is set. As a fallback the coordinator checks all unfinished runs with a single run list
+    request every ``poll_interval_secs``, or every ``webhook_poll_interval_secs`` while the receiver is up, and
+    only looks up runs one by one when they have finished or are missing from the listed page.
+    """
+
+    def __init__(
+        self,
+        get_client,
+        poll_interval_secs: float = 2.0,
+        webhook_url: str = None,
+        webhook_host: str = "0.0.0.0",
+        webhook_port: int = 8099,
+        webhook_poll_interval_secs: float = 30.0,
+        max_finished: int = 1024,
+    ):
+        """
+        Args:
+            get_client (callable): Returns the async Apify client to poll with.
+            poll_interval_secs (float): Time between status checks without webhooks.
+            webhook_url (str, optional): Public base url Apify reaches the receiver at. Defaults to polling only.
+            webhook_host (str): Interface the receiver listens on.
+            webhook_port (int): Port the receiver listens on.
+            webhook_poll_interval_secs (float): Time between status checks while webhooks are received.
+            max_finished (int): Finished runs remembered for callers that wait on them late.
+        """
+        self.get_client = get_client
+        self.poll_interval_secs = poll_interval_secs
+        self.webhook_url = webhook_url
+        self.webhook_host = webhook_host
+        self.webhook_port = webhook_port
+        self.webhook_poll_interval_secs = webhook_poll_interval_secs
+        self.max_finished = max_finished
+        self._token = secrets.token_urlsafe(16)
+        self._pending = {}
+        self._finished = OrderedDict()
+        self._coordinator = None
+        self._runner = None
+        self.webhook_events = 0
+        self.polls = 0
+        self.lookups = 0
+
+    @property
+    def webhooks(self) -> Optional[list]:
+        """
+        Ad-hoc webhooks to pass when starting a run, or None when completion is only polled.
+        """
+        if not self.webhook_url:
+            return None
+        request_url = f"{self.webhook_url.rstrip('/')}{WEBHOOK_PATH}?token={self._token}"
+        return [{"event_types": WEBHOOK_EVENT_TYPES, "request_url": request_url}]
+
+    def _resolve(self, run: dict):
+        if run.get("status") not in TERMINAL_RUN_STATUSES:
+            return
+        future = self._pending.pop(run.get("id"), None)
+        if future is None:
+            return
+        if not future.done():
+            future.set_result(run)
+        self._finished[run["id"]] = run
+        while len(self._finished) > self.max_finished:
+            self._finished.popitem(last=False)
+
+    async def wait(self, run: dict, timeout: float = None) -> Optional[dict]:
+        """
+        Wait for a run to finish. Only use it from coroutines running on the runtime loop.
+
+        Returns:
+            dict: The finished run object, or None if the run is still in progress after ``timeout``.
+        """
+        if run["status"] in TERMINAL_RUN_STATUSES:
+            return run
+        if run["id"] in self._finished:
+            return self._finished[run["id"]]
+        future = self._pending.get(run["id"])
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[run["id"]] = loop.create_future()
+            if self._coordinator is None or self._coordinator.done():
+                self._coordinator = loop.create_task(self._coordinate())
+        try:
+            # Shielded, so a caller that stops waiting does not cancel the future of the next one
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _coordinate(self):
+        if self.webhook_url and self._runner is None:
+            await self._start_receiver()
+        while self._pending:
+            await asyncio.sleep(self.webhook_poll_interval_secs if self._runner else self.poll_interval_secs)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning(f"Checking the status of {len(self._pending)} actor runs failed: {e}")
+
+    async def poll(self):
+        """
+        Check the status of every unfinished run.
+        """
+        if not self._pending:
+            return
+        client = self.get_client()
+        self.polls += 1
+        page = await client.runs().list(limit=min(1000, max(100, 2 * len(self._pending))), desc=True)
+        listed = {item["id"]: item["status"] for item in page.items}
+        # Finished runs are fetched in full for their stats
+        lookups = [
+            run_id
+            for run_id in self._pending
+            if run_id not in listed or listed[run_id] in TERMINAL_RUN_STATUSES
+        ]
+        self.lookups += len(lookups)
+        runs = await asyncio.gather(*(client.run(run_id).get() for run_id in lookups), return_exceptions=True)
+        for run_id, run in zip(lookups, runs):
+            if isinstance(run, Exception):
+                logger.warning(f"Could not get actor run {run_id}: {run}")
+            elif run is not None:
+                self._resolve(run)
+
+    async def _start_receiver(self):
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, self._handle_webhook)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.webhook_host, self.webhook_port).start()
+        except OSError as e:
+            logger.error(f"Could not start the Apify webhook receiver on port {self.webhook_port}, polling only: {e}")
+            await runner.cleanup()
+            self.webhook_url = None
+            return
+        self._runner = runner
+        logger.info(f"Receiving Apify webhooks on port {self.webhook_port} for {self.webhook_url}")
+
+    async def _handle_webhook(self, request: web.Request) -> web.Response:
+        if not secrets.compare_digest(request.query.get("token", ""), self._token):
+            return web.Response(status=403)
+        try:
+            payload = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        self.webhook_events += 1
+        # The resource of a run event is the run object at the time of the event
+        self._resolve(payload.get("resource") or {})
+        return web.Response(text="ok")
+
+    async def close(self):
+        """
+        Stop the coordinator and the webhook receiver.
+        """
+        if self._coordinator is not None:
+            self._coordinator.cancel()
+            self._coordinator = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._pending),
+            "webhook_events": self.webhook_events,
+            "polls": self.polls,
+            "lookups": self.lookups,
+        }
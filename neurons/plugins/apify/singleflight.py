@@ -0,0 +1,119 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from neurons.apify.cancellation import RunCancelled
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one execution.
+
+    The first caller for a key runs the call; callers arriving with the same key while it is in flight wait
+    for and share its result (or exception). Works for sync callers on any thread and for async callers on any
+    event loop, including a mix of both. If the caller that runs the call cancels it, the callers waiting for
+    it run the call again instead of sharing the cancellation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0
+        self.executions = 0
+
+    def _join(self, key: str):
+        """
+        Returns:
+            tuple: (future, leader) where leader is True if the caller must execute the call.
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._flights.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._flights[key] = future
+            self.executions += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future, result=None, error: BaseException = None):
+        with self._lock:
+            self._flights.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn):
+        """
+        Run ``fn()`` for the key, or wait for the in-flight run with the same key.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Joined in-flight actor run {key}, {self.stats()}")
+            try:
+                return list(future.result())
+            except RunCancelled:
+                return self.do(key, fn)
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return list(result)
+
+    async def do_async(self, key: str, coro_fn):
+        """
+        Await ``coro_fn()`` for the key, or the in-flight run with the same key.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.info(f"Joined in-flight actor run {key}, {self.stats()}")
+            try:
+                return list(await asyncio.wrap_future(future))
+            except RunCancelled:
+                return await self.do_async(key, coro_fn)
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return list(result)
+
+    def stats(self) -> dict:
+        coalesced = self.calls - self.executions
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": coalesced,
+            "coalescing_ratio": coalesced / self.calls if self.calls else 0.0,
+            "in_flight": len(self._flights),
+        }
+
+
+# Shared by every actor run in the process
+single_flight = SingleFlight()
@@ -1,14 +1,33 @@
 import logging
-from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
-from datetime import datetime, timezone
-import asyncio
-import bittensor as bt
+from neurons.apify.actors import run_actor_async, ActorConfig, get_runtime
+from neurons.apify.lookup import TweetUrlLookup
+from neurons.apify.mapping import (
+    Mapper,
+    Field,
+    Tweet,
+    hashtags,
+    media_images,
+    tweet_timestamp,
+)
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
-
-class ApiDojoTweetScraper:
+APIDOJO_MAPPER = Mapper(
+    "apidojo tweet scraper",
+    Tweet,
+    id="id",
+    url="twitterUrl",
+    text=Field("text", default=None),
+    likes="likeCount",
+    images=media_images("extendedEntities"),
+    username="author.userName",
+    hashtags=hashtags(),
+    timestamp=Field("createdAt", tweet_timestamp),
+)
+
+
+class ApiDojoTweetScraper(TweetUrlLookup):
     """
     A class designed to query tweets based using the apidojo/tweet-scraper actor on the Apify platform.
 
@@ -16,11 +35,23 @@ class ApiDojoTweetScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    lookup_batch_size = 20
+
     def __init__(self):
         """
         Initialize the ApiDojoTweetScraper.
         """
         self.actor_config = ActorConfig("61RPP7dywgiy0JPD0")
+        self.actor_config.dataset_fields = [
+            "id",
+            "twitterUrl",
+            "text",
+            "likeCount",
+            "author",
+            "entities",
+            "extendedEntities",
+            "createdAt",
+        ]
         self.actor_config.timeout_secs = 120
 
     async def searchBatch(self, urls: list):
@@ -37,74 +68,38 @@ class ApiDojoTweetScraper:
         results = await run_actor_async(self.actor_config, run_input)
         return results
 
-    def searchByUrl(self, urls: list, max_tweets_per_url: int = 1):
+    async def search_by_url_async(self, urls: list, max_tweets_per_url: int = 1):
         """
         Search for tweets by url.
         """
-
-        results = asyncio.run(self.searchBatch(urls))
+        results = await self.searchBatch(urls)
         return self.map(results)
 
-    def format_date(self, date: datetime):
-        date = date.replace(tzinfo=timezone.utc)
-        return date.isoformat(sep=" ", timespec="seconds")
-
-    def map_item(self, item) -> dict:
-        try:
-            hashtags = [
-                "#" + x["text"] for x in item.get("entities", {}).get("hashtags", [])
-            ]
-
-            images = []
-
-            extended_entities = item.get("extendedEntities")
-            if extended_entities:
-                media_urls = {
-                    m["media_key"]: m["media_url_https"]
-                    for m in extended_entities["media"]
-                    if m.get("media_url_https")
-                }
-
-            for media in item.get("entities", {}).get("media", []):
-                media_key = media.get("media_key")
-                if media_key:
-                    images.append(media_urls[media_key])
-
-            date_format = "%a %b %d %H:%M:%S %z %Y"
-            parsed_date = datetime.strptime(item["createdAt"], date_format)
-
-            return {
-                "id": item["id"],
-                "url": item["twitterUrl"],
-                "text": item.get("text"),
-                "likes": item["likeCount"],
-                "images": images,
-                "username": item["author"]["userName"],
-                "hashtags": hashtags,
-                "timestamp": self.format_date(parsed_date),
-            }
-        except Exception as e:
-            bt.logging.error(
-                f"❌ Error while converting tweet to sn3 model: {e}, tweet = {item}"
-            )
+    def searchByUrl(self, urls: list, max_tweets_per_url: int = 1):
+        """
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls, max_tweets_per_url)
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return APIDOJO_MAPPER.map_item(item)
 
     def map(self, input: list) -> list:
         """
-        Map the input data to the expected sn3 format.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = []
-        for item in input:
-            sn3_item = self.map_item(item)
-            if sn3_item:
-                filtered_input.append(sn3_item)
-
-        return filtered_input
+        return APIDOJO_MAPPER.map(input)
 
 
 if __name__ == "__main__":
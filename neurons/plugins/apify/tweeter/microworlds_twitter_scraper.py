@@ -1,13 +1,41 @@
-import logging
-from neurons.apify.actors import run_actor, run_actor_async, ActorConfig
-from datetime import datetime, timezone
 import asyncio
+import logging
+from datetime import datetime
+from neurons.apify.actors import (
+    run_actor_async,
+    stream_actor_async,
+    ActorConfig,
+    get_runtime,
+)
+from neurons.apify.cache import source_ttl
+from neurons.apify.lookup import TweetUrlLookup
+from neurons.apify.mapping import (
+    Mapper,
+    Field,
+    Tweet,
+    hashtags,
+    media_images,
+    tweet_timestamp,
+)
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
-
-class MicroworldsTwitterScraper:
+MICROWORLDS_MAPPER = Mapper(
+    "microworlds twitter scraper",
+    Tweet,
+    id="id_str",
+    url="url",
+    text=("truncated_full_text", "full_text"),
+    likes="favorite_count",
+    images=media_images("extended_entities"),
+    username="user.screen_name",
+    hashtags=hashtags(),
+    timestamp=Field("created_at", tweet_timestamp),
+)
+
+
+class MicroworldsTwitterScraper(TweetUrlLookup):
     """
     A class designed to query tweets based using the microworlds/twitter-scraper actor on the Apify platform.
 
@@ -15,53 +43,82 @@ class MicroworldsTwitterScraper:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    # maxTweets caps a whole run, so every url is looked up in a run of its own
+    lookup_batch_size = 1
+    # execute only searches for items posted after ``since`` when it is given
+    supports_since = True
+
     def __init__(self):
         """
         Initialize the MicroworldsTwitterScraper.
         """
         self.actor_config = ActorConfig("heLL6fUofdPgRXZie")
+        self.actor_config.dataset_fields = [
+            "id_str",
+            "url",
+            "truncated_full_text",
+            "full_text",
+            "favorite_count",
+            "user",
+            "entities",
+            "extended_entities",
+            "created_at",
+        ]
         # self.actor_config.memory_mbytes = 256
         # self.actor_config.timeout_secs = 30
+        self.actor_config.cache_ttl_secs = source_ttl("twitter", 300)
+        self.actor_config.cache_stale_secs = self.actor_config.cache_ttl_secs
 
-    async def searchSingleUrl(self, url: str, max_tweets: int):
+    async def search_by_url_async(self, urls: list, max_tweets_per_url: int = 1):
+        """
+        Search for tweets by url, with one actor run per url so that every url gets ``max_tweets_per_url``.
+        """
+        results = await asyncio.gather(
+            *(self._search_single_url_async(url, max_tweets_per_url) for url in urls)
+        )
+        return [tweet for tweets in results for tweet in tweets]
+
+    async def _search_single_url_async(self, url: str, max_tweets: int):
         run_input = {
             "maxRequestRetries": 3,
             "searchMode": "live",
             "urls": [url],
             "maxTweets": max_tweets,
         }
-        return await run_actor_async(self.actor_config, run_input)
-
-    async def distributedSearchByUrl(self, urls: list, max_tweets_per_url: int = 1):
-        return await asyncio.gather(
-            *(self.searchSingleUrl(url, max_tweets=max_tweets_per_url) for url in urls)
-        )
+        return self.map(await run_actor_async(self.actor_config, run_input))
 
     def searchByUrl(self, urls: list, max_tweets_per_url: int = 1):
         """
-        Search for tweets by url.
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
         """
-        results = asyncio.run(self.distributedSearchByUrl(urls, max_tweets_per_url))
-        flattened_results = [item for sublist in results for item in sublist]
-        return self.map(flattened_results)
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls, max_tweets_per_url)
+        )
 
-    def execute(
+    async def execute_async(
         self,
         search_queries: list = ["bittensor"],
         limit_number: int = 15,
         validator_key: str = "None",
         validator_version: str = None,
         miner_uid: int = 0,
+        since: datetime = None,
     ) -> list:
         """
         Search for tweets using search terms.
 
         Args:
             search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+            since (datetime, optional): Only search for items posted after this time.
 
         Returns:
             list: A list of tweets.
         """
+        if since is not None:
+            # Twitter search operator for tweets posted after an epoch time
+            search_queries = [
+                f"{query} since_time:{int(since.timestamp())}" for query in search_queries
+            ]
         run_input = {
             "maxRequestRetries": 3,
             "searchMode": "live",
@@ -70,58 +127,51 @@ class MicroworldsTwitterScraper:
             "maxTweets": limit_number,
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
-
-    def format_date(self, date: datetime):
-        date = date.replace(tzinfo=timezone.utc)
-        return date.isoformat(sep=" ", timespec="seconds")
+        # Map items as they are scraped and stop the run as soon as enough are available
+        return await stream_actor_async(
+            self.actor_config, run_input, map_item=self.map_item, limit=limit_number
+        )
 
-    def map_item(self, item) -> dict:
-        hashtags = [
-            "#" + x["text"] for x in item.get("entities", {}).get("hashtags", [])
-        ]
+    def execute(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+        since: datetime = None,
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(
+                search_queries,
+                limit_number,
+                validator_key,
+                validator_version,
+                miner_uid,
+                since,
+            )
+        )
 
-        images = []
-
-        extended_entities = item.get("extended_entities")
-        if extended_entities:
-            media_urls = {
-                m["media_key"]: m["media_url_https"]
-                for m in extended_entities["media"]
-                if m.get("media_url_https")
-            }
-
-        for media in item.get("entities", {}).get("media", []):
-            media_key = media.get("media_key")
-            if media.get("media_key"):
-                images.append(media_urls[media_key])
-
-        date_format = "%a %b %d %H:%M:%S %z %Y"
-        parsed_date = datetime.strptime(item["created_at"], date_format)
-
-        return {
-            "id": item["id_str"],
-            "url": item["url"],
-            "text": item.get("truncated_full_text") or item["full_text"],
-            "likes": item["favorite_count"],
-            "images": images,
-            "username": item["user"]["screen_name"],
-            "hashtags": hashtags,
-            "timestamp": self.format_date(parsed_date),
-        }
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return MICROWORLDS_MAPPER.map_item(item)
 
     def map(self, input: list) -> list:
         """
-        Map the input data to the expected sn3 format.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [self.map_item(item) for item in input]
-        return filtered_input
+        return MICROWORLDS_MAPPER.map(input)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,33 @@
 import logging
-from neurons.apify.actors import run_actor, ActorConfig
+from datetime import datetime
+from neurons.apify.actors import (
+    run_actor_async,
+    stream_actor_async,
+    ActorConfig,
+    get_runtime,
+)
+from neurons.apify.cache import source_ttl
+from neurons.apify.lookup import TweetUrlLookup
+from neurons.apify.mapping import Mapper, Field, Tweet, tweet_timestamp
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
-
-class TweetFlashQuery:
+TWEET_FLASH_MAPPER = Mapper(
+    "tweet flash",
+    Tweet,
+    id="tweet_id",
+    url="url",
+    text="text",
+    likes="likes",
+    images="images",
+    username="username",
+    hashtags="tweet_hashtags",
+    timestamp=Field("timestamp", tweet_timestamp),
+)
+
+
+class TweetFlashQuery(TweetUrlLookup):
     """
     A class designed to query tweets based using the Tweet Flash actor on the Apify platform.
 
@@ -13,15 +35,31 @@ class TweetFlashQuery:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    lookup_batch_size = 50
+    # execute only searches for items posted after ``since`` when it is given
+    supports_since = True
+
     def __init__(self):
         """
         Initialize the TweetFlashQuery.
         """
         self.actor_config = ActorConfig("wHMoznVs94gOcxcZl")
+        self.actor_config.dataset_fields = [
+            "tweet_id",
+            "url",
+            "text",
+            "likes",
+            "images",
+            "username",
+            "tweet_hashtags",
+            "timestamp",
+        ]
         self.actor_config.memory_mbytes = 256
         self.actor_config.timeout_secs = 30
+        self.actor_config.cache_ttl_secs = source_ttl("twitter", 300)
+        self.actor_config.cache_stale_secs = self.actor_config.cache_ttl_secs
 
-    def searchByUrl(
+    async def search_by_url_async(
         self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
     ):
         """
@@ -43,31 +81,49 @@ class TweetFlashQuery:
             "only_tweets": False,
             "tweet_urls": urls,
             "use_experimental_scraper": False,
-            "max_tweets": 1,
+            # Caps the whole run; urls crowded out by extra tweets are looked up again on their own
+            "max_tweets": len(urls),
             "num_threads": 5,
             "language": "any",
             "user_info": "only user info",
             "max_attempts": 5,
         }
-        return self.map(run_actor(self.actor_config, run_input))
+        return self.map(await run_actor_async(self.actor_config, run_input))
 
-    def execute(
+    def searchByUrl(
+        self, urls: list = ["https://twitter.com/elonmusk/status/1384874438472844800"]
+    ):
+        """
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls)
+        )
+
+    async def execute_async(
         self,
         search_queries: list = ["bittensor"],
         limit_number: int = 15,
         validator_key: str = "None",
         validator_version: str = None,
         miner_uid: int = 0,
+        since: datetime = None,
     ) -> list:
         """
         Search for tweets using search terms.
 
         Args:
             search_queries (list, optional): A list of search terms to be queried. Defaults to ["bittensor"].
+            since (datetime, optional): Only search for items posted after this time.
 
         Returns:
             list: A list of tweets.
         """
+        if since is not None:
+            # Twitter search operator for tweets posted after an epoch time
+            search_queries = [
+                f"{query} since_time:{int(since.timestamp())}" for query in search_queries
+            ]
         run_input = {
             "collect_user_info": False,
             "detect_language": False,
@@ -93,33 +149,51 @@ class TweetFlashQuery:
             "max_attempts": 5,
         }
 
-        return self.map(run_actor(self.actor_config, run_input))
+        # Map items as they are scraped and stop the run as soon as enough are available
+        return await stream_actor_async(
+            self.actor_config, run_input, map_item=self.map_item, limit=limit_number
+        )
+
+    def execute(
+        self,
+        search_queries: list = ["bittensor"],
+        limit_number: int = 15,
+        validator_key: str = "None",
+        validator_version: str = None,
+        miner_uid: int = 0,
+        since: datetime = None,
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(
+                search_queries,
+                limit_number,
+                validator_key,
+                validator_version,
+                miner_uid,
+                since,
+            )
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return TWEET_FLASH_MAPPER.map_item(item)
 
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [
-            {
-                "id": item["tweet_id"],
-                "url": item["url"],
-                "text": item["text"],
-                "likes": item["likes"],
-                "images": item["images"],
-                "username": item["username"],
-                "hashtags": item["tweet_hashtags"],
-                "timestamp": item["timestamp"],
-            }
-            for item in input
-        ]
-        return filtered_input
+        return TWEET_FLASH_MAPPER.map(input)
 
 
 if __name__ == "__main__":
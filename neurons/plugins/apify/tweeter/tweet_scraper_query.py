@@ -1,4 +1,16 @@
-from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.actors import run_actor_async, ActorConfig, get_runtime
+from neurons.apify.mapping import Mapper, Field, Tweet, tweet_timestamp
+
+TWEET_SCRAPER_MAPPER = Mapper(
+    "tweet scraper",
+    Tweet,
+    id="tweet_id",
+    url="url",
+    text="text",
+    likes="likes",
+    images="images",
+    timestamp=Field("timestamp", tweet_timestamp),
+)
 
 
 class TweetScraperQuery:
@@ -14,8 +26,11 @@ class TweetScraperQuery:
         Initialize the TweetScraperQuery.
         """
         self.actor_config = ActorConfig("2s3kSMq7tpuC3bI6M")
+        self.actor_config.dataset_fields = [
+            "tweet_id", "url", "text", "likes", "images", "timestamp"
+        ]
 
-    def execute(
+    async def execute_async(
         self, search_queries: list = ["bittensor"], limit_number: int = 15
     ) -> list:
         """
@@ -59,31 +74,35 @@ class TweetScraperQuery:
             "verified": False,
             "videos": False,
         }
-        return self.map(run_actor(self.actor_config, run_input))
+        return self.map(await run_actor_async(self.actor_config, run_input))
 
-    def map(self, input_data: list) -> list:
+    def execute(
+        self, search_queries: list = ["bittensor"], limit_number: int = 15
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(search_queries, limit_number)
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return TWEET_SCRAPER_MAPPER.map_item(item)
+
+    def map(self, input: list) -> list:
+        """
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input_data (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [
-            {
-                "id": item["tweet_id"],
-                "url": item["url"],
-                "text": item["text"],
-                "likes": item["likes"],
-                "images": item["images"],
-                "timestamp": item["timestamp"],
-            }
-            for item in input_data
-        ]
-        return filtered_input
+        return TWEET_SCRAPER_MAPPER.map(input)
 
 
 if __name__ == "__main__":
@@ -1,12 +1,23 @@
 import logging
-from datetime import datetime
-from neurons.apify.actors import run_actor, ActorConfig
+from neurons.apify.actors import run_actor_async, ActorConfig, get_runtime
+from neurons.apify.lookup import TweetUrlLookup
+from neurons.apify.mapping import Mapper, Field, Tweet, tweet_timestamp
 
 # Setting up logger for debugging and information purposes
 logger = logging.getLogger(__name__)
 
+WEB_HARVESTER_MAPPER = Mapper(
+    "web harvester",
+    Tweet,
+    id="id",
+    url="url",
+    text="text",
+    likes="likes",
+    timestamp=Field("timestamp", tweet_timestamp),
+)
 
-class WebHarvesterTwitterScraperQuery:
+
+class WebHarvesterTwitterScraperQuery(TweetUrlLookup):
     """
     A class designed to query tweets based on specific search queries using the Apify platform.
 
@@ -14,13 +25,16 @@ class WebHarvesterTwitterScraperQuery:
         actor_config (ActorConfig): Configuration settings specific to the Apify actor.
     """
 
+    lookup_batch_size = 10
+
     def __init__(self):
         """
         Initialize the WebHarvesterTwitterScraperQuery.
         """
         self.actor_config = ActorConfig("VsTreSuczsXhhRIqa")
+        self.actor_config.dataset_fields = ["id", "url", "text", "likes", "timestamp"]
 
-    def searchByUrl(
+    async def search_by_url_async(
         self,
         urls: list = [
             "https://twitter.com/const_reborn/status/1725967725762134121",
@@ -28,7 +42,7 @@ class WebHarvesterTwitterScraperQuery:
         ],
     ):
         """
-        Execute the tweet query process using the specified search queries.
+        Search for tweets by url.
         """
         run_input = {
             "includeUserInfo": False,
@@ -37,9 +51,23 @@ class WebHarvesterTwitterScraperQuery:
             "tweetsDesired": 1,
             "withReplies": True,
         }
-        return self.map(run_actor(self.actor_config, run_input))
+        return self.map(await run_actor_async(self.actor_config, run_input))
 
-    def execute(
+    def searchByUrl(
+        self,
+        urls: list = [
+            "https://twitter.com/const_reborn/status/1725967725762134121",
+            "https://twitter.com/opentensor/status/1713958073226649948",
+        ],
+    ):
+        """
+        Blocking wrapper of ``search_by_url_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.search_by_url_async(urls)
+        )
+
+    async def execute_async(
         self, search_queries: list = ["bittensor"], limit_number: int = 15
     ) -> list:
         """
@@ -53,30 +81,33 @@ class WebHarvesterTwitterScraperQuery:
         """
         raise Exception("This actor does not support general search queries")
 
+    def execute(
+        self, search_queries: list = ["bittensor"], limit_number: int = 15
+    ) -> list:
+        """
+        Blocking wrapper of ``execute_async``, for callers without an event loop.
+        """
+        return get_runtime(self.actor_config.api_key).run_coroutine(
+            self.execute_async(search_queries, limit_number)
+        )
+
+    def map_item(self, item: dict) -> dict:
+        """
+        Map a single dataset item to the sn3 format.
+        """
+        return WEB_HARVESTER_MAPPER.map_item(item)
+
     def map(self, input: list) -> list:
         """
-        Potentially map the input data as needed. As of now, this method serves as a placeholder and simply returns the
-        input data directly.
+        Map the input data to the expected sn3 format, skipping the items that cannot be mapped.
 
         Args:
-            input (list): The data to potentially map or transform.
+            input (list): The data to map.
 
         Returns:
-            list: The mapped or transformed data.
+            list: The mapped data.
         """
-        filtered_input = [
-            {
-                "id": item["id"],
-                "url": item["url"],
-                "text": item["text"],
-                "likes": item["likes"],
-                "timestamp": str(
-                    datetime.fromisoformat(item["timestamp"].replace("Z", "+00:00"))
-                ),
-            }
-            for item in input
-        ]
-        return filtered_input
+        return WEB_HARVESTER_MAPPER.map(input)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,315 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import math
+import time
+import atexit
+import logging
+import threading
+import contextlib
+import contextvars
+from typing import Optional
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Budget levels, from least to most restricted
+NORMAL = "normal"
+REDUCED = "reduced"
+CACHE_ONLY = "cache_only"
+
+# Totals kept per bucket, in this order
+FIELDS = ("runs", "compute_units", "usd", "run_secs", "items")
+
+# Keyword and validator hotkey the current code runs for. Like the cancel event, it is copied into the tasks
+# scheduled on the actor runtime loop, so the runs they start are attributed to the request.
+_usage_labels = contextvars.ContextVar("apify_usage_labels", default={})
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised instead of starting an actor run once the compute unit budget is used up.
+    """
+
+
+@contextlib.contextmanager
+def usage_context(keyword: str = None, hotkey: str = None):
+    """
+    Attribute the actor runs started inside the block to a keyword and a validator hotkey.
+    """
+    labels = dict(_usage_labels.get())
+    if keyword:
+        labels["keyword"] = keyword
+    if hotkey:
+        labels["hotkey"] = hotkey
+    token = _usage_labels.set(labels)
+    try:
+        yield
+    finally:
+        _usage_labels.reset(token)
+
+
+def run_usage(run: dict) -> tuple:
+    """
+    Compute units, cost in USD and run time in seconds reported on an Apify run object.
+    """
+    stats = run.get("stats") or {}
+    run_secs = stats.get("runTimeSecs")
+    if run_secs is None:
+        run_secs = (stats.get("durationMillis") or 0) / 1000
+    return stats.get("computeUnits") or 0.0, run.get("usageTotalUsd") or 0.0, run_secs
+
+
+def _add(totals: list, usage: tuple):
+    for i, value in enumerate(usage):
+        totals[i] += value
+
+
+class UsageLedger:
+    """
+    Local record of what the actor runs cost, and the budget level derived from it.
+
+    Every finished or aborted run adds its compute units, cost, run time and dataset size to an hourly bucket,
+    in total and per actor, keyword and validator hotkey. The compute units spent in the current clock hour and
+    UTC day are compared with the hourly and daily budgets: from ``reduce_at`` of either budget the level is
+    REDUCED, at the full budget it is CACHE_ONLY and no further runs are started. Buckets older than
+    ``retention_days`` are dropped. The ledger is saved to ``path`` at most every ``save_interval_secs``.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        hourly_budget_cu: float = 0,
+        daily_budget_cu: float = 0,
+        reduce_at: float = 0.8,
+        reduced_limit_fraction: float = 0.5,
+        retention_days: int = 7,
+        save_interval_secs: int = 60,
+    ):
+        """
+        Args:
+            path (str, optional): File the ledger is persisted to. Defaults to keeping it in memory only.
+            hourly_budget_cu (float): Compute units per clock hour, 0 for no limit.
+            daily_budget_cu (float): Compute units per UTC day, 0 for no limit.
+            reduce_at (float): Fraction of a budget from which usage is reduced.
+            reduced_limit_fraction (float): Fraction of the requested items fetched while usage is reduced.
+            retention_days (int): Age after which hourly buckets are dropped.
+            save_interval_secs (int): Minimum time between saves.
+        """
+        self.path = path
+        self.hourly_budget_cu = hourly_budget_cu
+        self.daily_budget_cu = daily_budget_cu
+        self.reduce_at = reduce_at
+        self.reduced_limit_fraction = reduced_limit_fraction
+        self.retention_days = retention_days
+        self.save_interval_secs = save_interval_secs
+        # Hour start -> {"total": totals, "actor": {actor_id: totals}, "keyword": {...}, "hotkey": {...}}
+        self._hours = {}
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self._level = NORMAL
+        self.load()
+
+    def _bucket(self, hour: int) -> dict:
+        bucket = self._hours.get(hour)
+        if bucket is None:
+            bucket = self._hours[hour] = {"total": [0] * len(FIELDS), "actor": {}, "keyword": {}, "hotkey": {}}
+            cutoff = hour - self.retention_days * 86400
+            for old in [old for old in self._hours if old < cutoff]:
+                del self._hours[old]
+        return bucket
+
+    def record(self, actor_id: str, run: dict, items: int = 0):
+        """
+        Record the usage of an actor run, attributed to the keyword and hotkey of the current usage context.
+        """
+        usage = (1, *run_usage(run), items)
+        labels = _usage_labels.get()
+        now = time.time()
+        with self._lock:
+            bucket = self._bucket(int(now - now % 3600))
+            _add(bucket["total"], usage)
+            _add(bucket["actor"].setdefault(actor_id, [0] * len(FIELDS)), usage)
+            for dimension, label in labels.items():
+                _add(bucket[dimension].setdefault(label, [0] * len(FIELDS)), usage)
+            save = self.path and time.monotonic() - self._saved_at >= self.save_interval_secs
+        logger.debug(f"Actor {actor_id} run {run.get('id')} used {usage[1]:.4f} CU for {items} items")
+        self.level()
+        if save:
+            self.save()
+
+    def spent(self, since: float) -> float:
+        """
+        Compute units recorded in the hourly buckets starting at or after ``since``.
+        """
+        with self._lock:
+            return sum(bucket["total"][1] for hour, bucket in self._hours.items() if hour >= since)
+
+    def spent_this_hour(self) -> float:
+        now = time.time()
+        return self.spent(now - now % 3600)
+
+    def spent_today(self) -> float:
+        now = time.time()
+        return self.spent(now - now % 86400)
+
+    def budget_fraction(self) -> float:
+        """
+        Largest fraction used of the hourly and daily budgets, 0 without budgets.
+        """
+        fractions = [0.0]
+        if self.hourly_budget_cu:
+            fractions.append(self.spent_this_hour() / self.hourly_budget_cu)
+        if self.daily_budget_cu:
+            fractions.append(self.spent_today() / self.daily_budget_cu)
+        return max(fractions)
+
+    def level(self) -> str:
+        """
+        The current budget level: NORMAL, REDUCED or CACHE_ONLY.
+        """
+        fraction = self.budget_fraction()
+        level = CACHE_ONLY if fraction >= 1 else REDUCED if fraction >= self.reduce_at else NORMAL
+        if level != self._level:
+            logger.warning(f"Apify usage at {fraction:.0%} of budget, switching from {self._level} to {level}")
+            self._level = level
+        return level
+
+    def check(self):
+        """
+        Raise BudgetExhausted if no more actor runs may be started.
+        """
+        if self.level() == CACHE_ONLY:
+            raise BudgetExhausted(
+                f"Apify compute unit budget used up ({self.spent_this_hour():.2f} CU this hour, "
+                f"{self.spent_today():.2f} CU today)"
+            )
+
+    def limit_for(self, limit: int) -> int:
+        """
+        Number of items to fetch when ``limit`` are requested, fewer while usage is reduced.
+        """
+        if self.level() == NORMAL:
+            return limit
+        return max(1, math.ceil(limit * self.reduced_limit_fraction))
+
+    def average_cu(self, actor_id: str, hours: int = 24) -> Optional[float]:
+        """
+        Average compute units per run of an actor over the last ``hours``, None if it has not run.
+        """
+        cutoff = time.time() - hours * 3600
+        runs = compute_units = 0
+        with self._lock:
+            for hour, bucket in self._hours.items():
+                totals = bucket["actor"].get(actor_id)
+                if totals and hour >= cutoff - 3600:
+                    runs += totals[0]
+                    compute_units += totals[1]
+        return compute_units / runs if runs else None
+
+    def report(self, dimension: str = "actor", hours: int = 24) -> dict:
+        """
+        Usage over the last ``hours`` per actor, keyword or hotkey, or in total.
+
+        Returns:
+            dict: Label to a dict of FIELDS; a single dict of FIELDS for the "total" dimension.
+        """
+        cutoff = time.time() - hours * 3600 - 3600
+        totals = {}
+        with self._lock:
+            for hour, bucket in self._hours.items():
+                if hour < cutoff:
+                    continue
+                entries = {None: bucket["total"]} if dimension == "total" else bucket[dimension]
+                for label, usage in entries.items():
+                    _add(totals.setdefault(label, [0] * len(FIELDS)), usage)
+        report = {label: dict(zip(FIELDS, usage)) for label, usage in totals.items()}
+        if dimension == "total":
+            return report.get(None, dict.fromkeys(FIELDS, 0))
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "level": self.level(),
+            "cu_this_hour": self.spent_this_hour(),
+            "cu_today": self.spent_today(),
+            "hourly_budget_cu": self.hourly_budget_cu,
+            "daily_budget_cu": self.daily_budget_cu,
+        }
+
+    def save(self):
+        """
+        Write the ledger to ``path`` atomically.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps({"fields": FIELDS, "hours": {str(hour): bucket for hour, bucket in self._hours.items()}})
+            self._saved_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save Apify usage to {self.path}: {e}")
+
+    def load(self):
+        """
+        Read the ledger saved at ``path``, if any.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load Apify usage from {self.path}: {e}")
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            for hour, bucket in data.get("hours", {}).items():
+                if int(hour) >= cutoff:
+                    self._hours[int(hour)] = bucket
+        logger.info(f"Loaded {len(self._hours)} hours of Apify usage, {self.spent_today():.2f} CU today")
+
+
+_usage_ledger = None
+_usage_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """
+    Get the process-wide usage ledger, configured from APIFY_USAGE_PATH, APIFY_CU_BUDGET_HOURLY,
+    APIFY_CU_BUDGET_DAILY, APIFY_BUDGET_REDUCE_AT and APIFY_USAGE_RETENTION_DAYS.
+    """
+    global _usage_ledger
+    with _usage_ledger_lock:
+        if _usage_ledger is None:
+            _usage_ledger = UsageLedger(
+                path=os.getenv("APIFY_USAGE_PATH", "apify_usage.json") or None,
+                hourly_budget_cu=float(os.getenv("APIFY_CU_BUDGET_HOURLY", 0)),
+                daily_budget_cu=float(os.getenv("APIFY_CU_BUDGET_DAILY", 0)),
+                reduce_at=float(os.getenv("APIFY_BUDGET_REDUCE_AT", 0.8)),
+                retention_days=int(os.getenv("APIFY_USAGE_RETENTION_DAYS", 7)),
+            )
+            atexit.register(_usage_ledger.save)
+        return _usage_ledger
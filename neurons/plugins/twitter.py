@@ -1,5 +1,9 @@
 import asyncio
 from neurons.abstract import ScrapingPlugin
+from neurons.apify.usage import CACHE_ONLY, BudgetExhausted, get_usage_ledger, usage_context
+from neurons.item_store import get_item_store
+from neurons.prefetch import get_prefetcher
+from neurons.queries import QueryType
 
 
 class TwitterSource(ScrapingPlugin):
@@ -42,13 +46,33 @@ class TwitterSource(ScrapingPlugin):
             search_key = [random_line()]
             bt.logging.info(f"picking random keyword: {search_key} \n")
 
-        tweets = twitter_query.execute(
-            search_key,
-            15,
-            synapse.dendrite.hotkey,
-            validator_version_str,
-            my_subnet_uid,
-        )
+        # Serve prefetched results when fresh ones exist for this keyword, or however old once the Apify
+        # budget is used up
+        usage = get_usage_ledger()
+        cache_only = usage.level() == CACHE_ONLY
+        prefetcher = get_prefetcher()
+        tweets = prefetcher.get(QueryType.TWITTER, search_key[0], stale_ok=cache_only) if prefetcher else None
+        # Then items recently scraped for this keyword, or matching it, from the local item store, if enabled.
+        # SQLite calls block, so they run on a worker thread. See "Caching on miners" in the README
+        item_store = get_item_store()
+        if tweets is None and item_store is not None:
+            tweets = await asyncio.to_thread(item_store.latest, "twitter", search_key[0], 15, stale_ok=cache_only)
+        if tweets is None:
+            try:
+                # Runs are accounted to the keyword and the validator asking, and fetch fewer items over budget
+                with usage_context(keyword=search_key[0], hotkey=synapse.dendrite.hotkey):
+                    tweets = await twitter_query.execute_async(
+                        search_key,
+                        usage.limit_for(15),
+                        synapse.dendrite.hotkey,
+                        validator_version_str,
+                        my_subnet_uid,
+                    )
+                if item_store is not None:
+                    await asyncio.to_thread(item_store.add, "twitter", search_key[0], tweets)
+            except BudgetExhausted as e:
+                bt.logging.warning(f"Not scraping {search_key}: {e}")
+                tweets = []
         synapse.version = scraping.utils.get_my_version()
         synapse.scrap_output = tweets
         bt.logging.info(f"✅ success: returning {len(synapse.scrap_output)} tweets\n")
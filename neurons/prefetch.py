@@ -0,0 +1,248 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import math
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from neurons.apify.usage import NORMAL, get_usage_ledger, usage_context
+from neurons.queries import QueryType
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+def estimate_compute_units(query) -> float:
+    """
+    Compute units one run of the query's actor uses: the recent average from the usage ledger, or until the
+    actor has run, the upper bound of memory in GB times run time in hours. Actors without a memory limit are
+    assumed to use 1 GB.
+    """
+    actor_config = query.actor_config
+    average_cu = get_usage_ledger().average_cu(actor_config.actor_id)
+    if average_cu is not None:
+        return average_cu
+    memory_gb = (actor_config.memory_mbytes or 1024) / 1024
+    return memory_gb * actor_config.timeout_secs / 3600
+
+
+def load_keywords(a_file: str = "keywords.txt") -> List[str]:
+    with open(a_file) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+class KeywordPrefetcher:
+    """
+    Background prefetcher that keeps fresh search results for every validator keyword.
+
+    Keywords are refreshed per source in priority order: keywords that were requested recently and keywords
+    about to go stale come first. Runs are only started while the compute units spent in the last hour stay
+    within the budget, and are paused while the Apify usage ledger reports usage above the normal level. Results are kept in memory so request handlers can answer without scraping.
+    """
+
+    def __init__(
+        self,
+        queries: Dict[QueryType, object],
+        keywords: List[str],
+        cu_per_hour: float,
+        refresh_secs: int = 600,
+        limit_number: int = 15,
+        request_half_life_secs: int = 3600,
+    ):
+        """
+        Args:
+            queries: The query provider instance to run for each source.
+            keywords: The keyword universe, normally keywords.txt.
+            cu_per_hour: Compute unit budget for prefetching per rolling hour.
+            refresh_secs: Age after which prefetched results are considered stale.
+            limit_number: Number of items to fetch per keyword.
+            request_half_life_secs: Half-life of the request counts used for prioritization.
+        """
+        self.queries = queries
+        self.keywords = keywords
+        self.cu_per_hour = cu_per_hour
+        self.refresh_secs = refresh_secs
+        self.limit_number = limit_number
+        self.request_half_life_secs = request_half_life_secs
+        self._lock = threading.Lock()
+        # (query_type, keyword) -> (results, fetched_at)
+        self._index: Dict[Tuple[QueryType, str], Tuple[list, float]] = {}
+        # (query_type, keyword) -> (decayed request count, updated_at)
+        self._requests: Dict[Tuple[QueryType, str], Tuple[float, float]] = {}
+        self._failures: Dict[Tuple[QueryType, str], float] = {}
+        self._spent = deque()
+        self._stop = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+
+    def _decayed_requests(self, key, now: float) -> float:
+        count, updated_at = self._requests.get(key, (0.0, now))
+        return count * math.pow(0.5, (now - updated_at) / self.request_half_life_secs)
+
+    def get(self, query_type: QueryType, keyword: str, stale_ok: bool = False) -> Optional[list]:
+        """
+        Return fresh prefetched results for a keyword, or None. Every call counts as a request for prioritization.
+        With ``stale_ok`` results are returned however old they are. Empty results are never returned, so the
+        caller scrapes instead of answering without items.
+        """
+        key = (query_type, keyword)
+        now = time.time()
+        with self._lock:
+            self._requests[key] = (self._decayed_requests(key, now) + 1, now)
+            entry = self._index.get(key)
+            if entry is None or not entry[0] or (not stale_ok and now - entry[1] >= self.refresh_secs):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return list(entry[0])
+
+    def freshness(self) -> Dict[Tuple[QueryType, str], float]:
+        """
+        Age in seconds of the prefetched results of every keyword.
+        """
+        now = time.time()
+        with self._lock:
+            return {key: now - fetched_at for key, (_, fetched_at) in self._index.items()}
+
+    def spent_last_hour(self) -> float:
+        cutoff = time.time() - 3600
+        with self._lock:
+            while self._spent and self._spent[0][0] < cutoff:
+                self._spent.popleft()
+            return sum(cu for _, cu in self._spent)
+
+    def _next_candidate(self):
+        """
+        Pick the (query_type, keyword) most worth refreshing now, or None if nothing is due.
+        """
+        now = time.time()
+        best, best_priority = None, 0.0
+        with self._lock:
+            for query_type in self.queries:
+                for keyword in self.keywords:
+                    key = (query_type, keyword)
+                    if now < self._failures.get(key, 0):
+                        continue
+                    entry = self._index.get(key)
+                    # Start refreshing a bit before results go stale
+                    age = now - entry[1] if entry else self.refresh_secs * 2
+                    if age < self.refresh_secs * 0.8:
+                        continue
+                    priority = (1 + self._decayed_requests(key, now)) * age / self.refresh_secs
+                    if priority > best_priority:
+                        best, best_priority = key, priority
+        return best
+
+    def run_once(self) -> bool:
+        """
+        Refresh the highest priority keyword if the budget allows.
+
+        Returns:
+            bool: True if a keyword was refreshed.
+        """
+        candidate = self._next_candidate()
+        if candidate is None:
+            return False
+        query_type, keyword = candidate
+        if get_usage_ledger().level() != NORMAL:
+            return False
+        query = self.queries[query_type]
+        cost = estimate_compute_units(query)
+        if self.spent_last_hour() + cost > self.cu_per_hour:
+            return False
+
+        with self._lock:
+            self._spent.append((time.time(), cost))
+        try:
+            with usage_context(keyword=keyword):
+                results = query.execute([keyword], self.limit_number)
+        except Exception as e:
+            logger.warning(f"Prefetching {query_type.name} results for {keyword} failed: {e}")
+            with self._lock:
+                self._failures[candidate] = time.time() + self.refresh_secs / 4
+            return False
+
+        if not results:
+            # Likely a transient empty run; keep the previous results and retry like after a failure
+            logger.warning(f"Prefetching {query_type.name} results for {keyword} returned nothing")
+            with self._lock:
+                self._failures[candidate] = time.time() + self.refresh_secs / 4
+            return False
+
+        with self._lock:
+            self._index[candidate] = (results, time.time())
+            self._failures.pop(candidate, None)
+        logger.info(f"Prefetched {len(results)} {query_type.name} results for {keyword}")
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                refreshed = self.run_once()
+            except Exception as e:
+                logger.error(f"Prefetcher error: {e}")
+                refreshed = False
+            if not refreshed:
+                self._stop.wait(1)
+
+    def start(self) -> "KeywordPrefetcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="keyword-prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "keywords": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "cu_last_hour": self.spent_last_hour(),
+        }
+
+
+_prefetcher: Optional[KeywordPrefetcher] = None
+
+
+def get_prefetcher() -> Optional[KeywordPrefetcher]:
+    """
+    The running prefetcher, if the miner started one.
+    """
+    return _prefetcher
+
+
+def start_prefetcher(
+    queries: Dict[QueryType, object], keywords_file: str = "keywords.txt", **kwargs
+) -> KeywordPrefetcher:
+    global _prefetcher
+    if _prefetcher is not None:
+        _prefetcher.stop()
+    _prefetcher = KeywordPrefetcher(queries, load_keywords(keywords_file), **kwargs).start()
+    logger.info(f"Started keyword prefetcher for {len(_prefetcher.keywords)} keywords")
+    return _prefetcher
@@ -0,0 +1,340 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Callable, List
+from neurons.apify.actors import count_mapping_failures_async, get_runtime
+from neurons.apify.cancellation import RunCancelled, call_cancellable_async
+from neurons.apify.lookup import found_items
+from neurons.apify.usage import NORMAL, BudgetExhausted, UsageLedger, get_usage_ledger
+from neurons.provider_health import ProviderHealth
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Latency samples needed before the hedge delay follows the observed latency percentile
+MIN_LATENCY_SAMPLES = 5
+
+# Async method of the providers behind each query method
+ASYNC_METHODS = {
+    "execute": "execute_async",
+    "searchByUrl": "search_by_url_async",
+    "lookup": "lookup_async",
+    "lookupByUrl": "lookup_by_url_async",
+    "lookupById": "lookup_by_id_async",
+}
+
+
+def count_results(result) -> int:
+    if isinstance(result, dict):
+        # Batched lookups map every requested id to its item or NOT_FOUND
+        return len(found_items(result))
+    return len(result) if isinstance(result, list) else 0
+
+
+def has_results(result) -> bool:
+    if isinstance(result, dict):
+        return bool(found_items(result))
+    return bool(result)
+
+
+class ProviderGroup:
+    """
+    Runs a query method on interchangeable providers to keep tail latency low.
+
+    Providers are asked in the order given, unless their recorded health shows another provider is clearly
+    cheaper to get a usable result from. The first provider is asked first. If it has not answered within the hedge delay, the recent latency
+    percentile of that provider, the next provider is asked too; if it fails or returns an invalid result,
+    the next provider is asked at once. The first valid result wins and the runs of the other providers are
+    aborted. If no provider returns a valid result, the first completed result is returned, or the last error
+    is raised.
+
+    Every call is recorded in the provider health tracker, which also tunes the ``timeout_secs`` of the Apify
+    providers to their observed latency, within the bounds of their ActorConfig. Calls that lost or were
+    cancelled are recorded as censored at the time they had run.
+
+    While the Apify usage ledger reports usage above the normal level, calls are not hedged and providers are
+    asked in order of the compute units their runs have used on average.
+
+    The group exposes ``execute``, ``searchByUrl``, ``lookup``, ``lookupByUrl`` and ``lookupById`` and their
+    async variants with the signatures of its providers, so it can be used wherever a single provider is.
+    Provider calls run concurrently on the caller's event loop; the sync methods run them on the actor
+    runtime loop.
+    """
+
+    def __init__(
+        self,
+        providers: List[object],
+        names: List[str] = None,
+        hedge_percentile: float = 0.9,
+        min_hedge_delay_secs: float = 5.0,
+        max_hedge_delay_secs: float = 30.0,
+        is_valid: Callable[[object], bool] = has_results,
+        health: ProviderHealth = None,
+        usage: UsageLedger = None,
+    ):
+        """
+        Args:
+            providers (list): Query provider instances, in order of preference.
+            names (list, optional): Names of the providers for logging. Defaults to their class names.
+            hedge_percentile (float): Latency percentile of a provider after which the next one is asked too.
+            min_hedge_delay_secs (float): Lower bound of the hedge delay.
+            max_hedge_delay_secs (float): Upper bound of the hedge delay, also used until enough latencies are known.
+            is_valid (callable): Decides whether a result can be returned, by default when it is not empty.
+            health (ProviderHealth, optional): Tracker the calls are recorded in. Defaults to an in-memory one.
+            usage (UsageLedger, optional): Ledger of the Apify usage. Defaults to the process-wide one.
+        """
+        self.providers = providers
+        self.names = names or [type(provider).__name__ for provider in providers]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError(f"Provider names must be unique: {self.names}")
+        self.hedge_percentile = hedge_percentile
+        self.min_hedge_delay_secs = min_hedge_delay_secs
+        self.max_hedge_delay_secs = max_hedge_delay_secs
+        self.is_valid = is_valid
+        self.health = health or ProviderHealth()
+        self.usage = usage or get_usage_ledger()
+        # Bounds for tuning the timeouts of the Apify providers, from the timeouts they were configured with
+        self._timeout_bounds = {}
+        for name, provider in zip(self.names, providers):
+            actor_config = getattr(provider, "actor_config", None)
+            if actor_config is not None:
+                self._timeout_bounds[name] = (
+                    actor_config.min_timeout_secs or actor_config.timeout_secs / 2,
+                    actor_config.max_timeout_secs or actor_config.timeout_secs * 2,
+                )
+        # Calls of providers that lost, kept referenced until their runs have been aborted
+        self._abandoned = set()
+        self.calls = 0
+        self.hedges = 0
+        self.fallbacks = 0
+        self.wins = defaultdict(int)
+
+    @property
+    def primary(self):
+        return self.providers[0]
+
+    @property
+    def supports_since(self) -> bool:
+        # ``since`` is only passed on to the providers that support it
+        return any(getattr(provider, "supports_since", False) for provider in self.providers)
+
+    def hedge_delay(self, name: str, method: str) -> float:
+        """
+        Seconds to wait for the provider before asking the next one too.
+        """
+        latency = self.health.latency_percentile(name, method, self.hedge_percentile, MIN_LATENCY_SAMPLES)
+        if latency is None:
+            return self.max_hedge_delay_secs
+        return min(max(latency, self.min_hedge_delay_secs), self.max_hedge_delay_secs)
+
+    def _record(
+        self,
+        name: str,
+        provider,
+        method: str,
+        latency: float,
+        result=None,
+        mapping_failures: int = 0,
+        error: bool = False,
+        censored: bool = False,
+    ):
+        self.health.record(
+            name,
+            method,
+            latency,
+            items=count_results(result),
+            mapping_failures=mapping_failures,
+            error=error,
+            censored=censored,
+        )
+        if name not in self._timeout_bounds:
+            return
+        timeout_secs = self.health.tune_timeout(name, method, *self._timeout_bounds[name])
+        actor_config = provider.actor_config
+        if timeout_secs is not None and abs(timeout_secs - actor_config.timeout_secs) >= 1:
+            logger.info(f"Tuning timeout of {name} from {actor_config.timeout_secs}s to {int(timeout_secs)}s")
+            actor_config.timeout_secs = int(timeout_secs)
+
+    def _run_cost(self, provider) -> float:
+        # Average compute units of the provider's actor runs; providers that do not run actors cost none
+        actor_config = getattr(provider, "actor_config", None)
+        if actor_config is None:
+            return 0.0
+        compute_units = self.usage.average_cu(actor_config.actor_id)
+        return float("inf") if compute_units is None else compute_units
+
+    def _abandon(self, task: asyncio.Task):
+        # The losing call aborts its run and raises RunCancelled; nothing is waiting for it anymore
+        self._abandoned.add(task)
+        task.add_done_callback(self._abandoned.discard)
+        task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def call_async(self, method: str, *args, **kwargs):
+        """
+        Call ``method`` with the given arguments on the providers that have it, hedging and falling back.
+        """
+        async_method = ASYNC_METHODS[method]
+        providers = {
+            name: provider
+            for name, provider in zip(self.names, self.providers)
+            if hasattr(provider, async_method)
+        }
+        if not providers:
+            raise AttributeError(f"No provider in the group has {method}")
+        candidates = [(name, providers[name]) for name in self.health.rank(list(providers), method)]
+        if candidates[0][0] != next(iter(providers)):
+            logger.debug(f"Preferring {candidates[0][0]} on {method} based on provider health")
+        # Over budget, only fall back and try the cheapest providers first
+        hedge = self.usage.level() == NORMAL
+        if not hedge:
+            candidates.sort(key=lambda candidate: self._run_cost(candidate[1]))
+        self.calls += 1
+
+        pending = {}
+        launched = []
+
+        def launch():
+            name, provider = candidates[len(launched)]
+            call_kwargs = kwargs
+            if "since" in kwargs and not getattr(provider, "supports_since", False):
+                call_kwargs = {key: value for key, value in kwargs.items() if key != "since"}
+            cancel_event = threading.Event()
+            task = asyncio.ensure_future(
+                call_cancellable_async(
+                    cancel_event, count_mapping_failures_async, getattr(provider, async_method), *args, **call_kwargs
+                )
+            )
+            started = time.monotonic()
+            pending[task] = (name, provider, cancel_event, started)
+            launched.append((name, started))
+
+        fallback_result = None
+        has_fallback_result = False
+        last_error = None
+        launch()
+        try:
+            while pending:
+                # The most recently asked provider is backed up by the next one after its hedge delay
+                timeout = None
+                if hedge and len(launched) < len(candidates):
+                    name, started = launched[-1]
+                    timeout = max(0.0, started + self.hedge_delay(name, method) - time.monotonic())
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self.hedges += 1
+                    logger.info(f"{name} is slow on {method}, hedging with {candidates[len(launched)][0]}")
+                    launch()
+                    continue
+
+                failed = False
+                for task in done:
+                    name, provider, _, started = pending.pop(task)
+                    try:
+                        result, mapping_failures = task.result()
+                    except RunCancelled as e:
+                        # Cancelled before it finished, so it only says the provider took at least this long
+                        self._record(name, provider, method, time.monotonic() - started, censored=True)
+                        last_error = e
+                        failed = True
+                        continue
+                    except BudgetExhausted as e:
+                        # Refused before a run started, which says nothing about the provider
+                        last_error = e
+                        failed = True
+                        continue
+                    except Exception as e:
+                        logger.warning(f"{name} failed on {method}: {e}")
+                        self._record(name, provider, method, time.monotonic() - started, error=True)
+                        last_error = e
+                        failed = True
+                        continue
+                    self._record(name, provider, method, time.monotonic() - started, result, mapping_failures)
+                    if self.is_valid(result):
+                        self.wins[name] += 1
+                        return result
+                    logger.info(f"{name} returned no valid result on {method}")
+                    if not has_fallback_result:
+                        fallback_result, has_fallback_result = result, True
+                    failed = True
+
+                if failed and len(launched) < len(candidates):
+                    self.fallbacks += 1
+                    logger.info(f"Falling back to {candidates[len(launched)][0]} on {method}")
+                    launch()
+        finally:
+            # Abort the runs of the providers whose results are no longer needed. They are recorded as censored
+            # at the time they had run, so a provider that keeps being hedged away is still seen to be slow
+            now = time.monotonic()
+            for task, (name, provider, cancel_event, started) in pending.items():
+                cancel_event.set()
+                self._abandon(task)
+                self._record(name, provider, method, now - started, censored=True)
+
+        if has_fallback_result:
+            return fallback_result
+        raise last_error
+
+    def call(self, method: str, *args, **kwargs):
+        """
+        Blocking wrapper of ``call_async``, for callers without an event loop.
+        """
+        return get_runtime().run_coroutine(self.call_async(method, *args, **kwargs))
+
+    async def execute_async(self, *args, **kwargs):
+        return await self.call_async("execute", *args, **kwargs)
+
+    async def search_by_url_async(self, *args, **kwargs):
+        return await self.call_async("searchByUrl", *args, **kwargs)
+
+    async def lookup_async(self, *args, **kwargs):
+        return await self.call_async("lookup", *args, **kwargs)
+
+    async def lookup_by_url_async(self, *args, **kwargs):
+        return await self.call_async("lookupByUrl", *args, **kwargs)
+
+    async def lookup_by_id_async(self, *args, **kwargs):
+        return await self.call_async("lookupById", *args, **kwargs)
+
+    def execute(self, *args, **kwargs):
+        return self.call("execute", *args, **kwargs)
+
+    def searchByUrl(self, *args, **kwargs):
+        return self.call("searchByUrl", *args, **kwargs)
+
+    def lookup(self, *args, **kwargs):
+        return self.call("lookup", *args, **kwargs)
+
+    def lookupByUrl(self, *args, **kwargs):
+        return self.call("lookupByUrl", *args, **kwargs)
+
+    def lookupById(self, *args, **kwargs):
+        return self.call("lookupById", *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "fallbacks": self.fallbacks,
+            "wins": dict(self.wins),
+        }
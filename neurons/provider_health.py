@@ -0,0 +1,247 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import json
+import atexit
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Samples a provider needs before its health is used to reorder providers or tune its timeout
+MIN_SAMPLES = 10
+
+
+def _percentile(values: list, percentile: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(percentile * len(values)))]
+
+
+class ProviderHealth:
+    """
+    Rolling record of how each query provider performs, per method.
+
+    Every call records its latency, the number of items it returned, the items that failed to map and whether
+    it raised. Samples older than ``window_secs`` are dropped. The record is saved to ``path`` at most every
+    ``save_interval_secs`` and loaded from it on start, so provider choice survives restarts.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        window_secs: int = 3600,
+        max_samples: int = 500,
+        save_interval_secs: int = 60,
+    ):
+        """
+        Args:
+            path (str, optional): File the samples are persisted to. Defaults to keeping them in memory only.
+            window_secs (int): Age after which samples are dropped.
+            max_samples (int): Maximum number of samples kept per provider and method.
+            save_interval_secs (int): Minimum time between saves.
+        """
+        self.path = path
+        self.window_secs = window_secs
+        self.max_samples = max_samples
+        self.save_interval_secs = save_interval_secs
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._lock = threading.Lock()
+        self._saved_at = time.monotonic()
+        self.load()
+
+    def _key(self, name: str, method: str) -> str:
+        return f"{name}.{method}"
+
+    def _window(self, name: str, method: str) -> deque:
+        samples = self._samples[self._key(name, method)]
+        cutoff = time.time() - self.window_secs
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return samples
+
+    def record(
+        self,
+        name: str,
+        method: str,
+        latency: float,
+        items: int = 0,
+        mapping_failures: int = 0,
+        error: bool = False,
+        censored: bool = False,
+    ):
+        """
+        Record the outcome of one provider call. Calls abandoned before they finished, e.g. because another
+        provider answered first, are ``censored``: their latency is only the time they had run so far.
+        """
+        with self._lock:
+            self._window(name, method).append((time.time(), latency, items, mapping_failures, error, censored))
+            save = self.path and time.monotonic() - self._saved_at >= self.save_interval_secs
+        if save:
+            self.save()
+
+    def summary(self, name: str, method: str) -> dict:
+        """
+        Returns:
+            dict: Sample count, error and censored rates, latency percentiles, average item yield and mapping
+            failure rate of the provider method. Latencies include censored calls at the time they had run,
+            as they took at least that long. Latencies and yield are None without such calls.
+        """
+        with self._lock:
+            samples = list(self._window(name, method))
+        successes = [sample for sample in samples if not sample[4] and not sample[5]]
+        censored = sum(1 for sample in samples if sample[5])
+        latencies = [sample[1] for sample in samples if not sample[4]]
+        items = sum(sample[2] for sample in successes)
+        mapping_failures = sum(sample[3] for sample in successes)
+        return {
+            "samples": len(samples),
+            "error_rate": (len(samples) - len(successes) - censored) / len(samples) if samples else 0.0,
+            "censored_rate": censored / len(samples) if samples else 0.0,
+            "latency_p50": _percentile(latencies, 0.5) if latencies else None,
+            "latency_p90": _percentile(latencies, 0.9) if latencies else None,
+            "latency_p99": _percentile(latencies, 0.99) if latencies else None,
+            "yield": items / len(successes) if successes else None,
+            "empty_rate": sum(1 for sample in successes if not sample[2]) / len(successes) if successes else 0.0,
+            "mapping_failure_rate": mapping_failures / (items + mapping_failures) if items + mapping_failures else 0.0,
+        }
+
+    def latency_percentile(self, name: str, method: str, percentile: float, min_samples: int = 1) -> float:
+        """
+        Returns:
+            float: The latency percentile of calls that did not fail, counting censored calls at the time they
+            had run, or None with fewer than ``min_samples`` of them.
+        """
+        with self._lock:
+            latencies = [sample[1] for sample in self._window(name, method) if not sample[4]]
+        if len(latencies) < min_samples:
+            return None
+        return _percentile(latencies, percentile)
+
+    def cost(self, name: str, method: str) -> float:
+        """
+        Expected seconds until a usable result from the provider: its median latency divided by the share of
+        calls that return items without errors. Censored calls count as calls without a usable result.
+        None until the provider has MIN_SAMPLES samples.
+        """
+        summary = self.summary(name, method)
+        if summary["samples"] < MIN_SAMPLES:
+            return None
+        finished = 1 - summary["error_rate"] - summary["censored_rate"]
+        usable = finished * (1 - summary["empty_rate"]) * (1 - summary["mapping_failure_rate"])
+        if summary["latency_p50"] is None or usable <= 0:
+            return float("inf")
+        return summary["latency_p50"] / usable
+
+    def rank(self, names: list, method: str, margin: float = 1.5) -> list:
+        """
+        Order providers for a call. The configured order is kept unless a provider with enough samples is
+        ``margin`` times cheaper than the first one, in which case the cheapest such provider goes first.
+        """
+        first_cost = self.cost(names[0], method)
+        if first_cost is None:
+            return list(names)
+        best, best_cost = None, first_cost / margin
+        for name in names[1:]:
+            cost = self.cost(name, method)
+            if cost is not None and cost < best_cost:
+                best, best_cost = name, cost
+        if best is None:
+            return list(names)
+        return [best] + [name for name in names if name != best]
+
+    def tune_timeout(
+        self,
+        name: str,
+        method: str,
+        min_timeout_secs: float,
+        max_timeout_secs: float,
+        headroom: float = 1.5,
+    ) -> float:
+        """
+        Timeout that lets almost all successful calls finish: the p99 latency with headroom, within the bounds.
+        None until the provider has MIN_SAMPLES calls that did not fail.
+        """
+        latency = self.latency_percentile(name, method, 0.99, min_samples=MIN_SAMPLES)
+        if latency is None:
+            return None
+        return min(max(latency * headroom, min_timeout_secs), max_timeout_secs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            keys = list(self._samples)
+        return {key: self.summary(*key.rsplit(".", 1)) for key in keys}
+
+    def save(self):
+        """
+        Write the samples to ``path`` atomically.
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = {key: list(samples) for key, samples in self._samples.items()}
+            self._saved_at = time.monotonic()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"window_secs": self.window_secs, "samples": data}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save provider health to {self.path}: {e}")
+
+    def load(self):
+        """
+        Read the samples saved at ``path``, if any.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load provider health from {self.path}: {e}")
+            return
+        with self._lock:
+            for key, samples in data.get("samples", {}).items():
+                # Samples saved before censored calls were recorded have no censored flag
+                self._samples[key].extend((*sample, False)[:6] for sample in samples)
+        logger.info(f"Loaded provider health for {len(data.get('samples', {}))} provider methods")
+
+
+_provider_health = None
+_provider_health_lock = threading.Lock()
+
+
+def get_provider_health() -> ProviderHealth:
+    """
+    Get the process-wide provider health tracker, configured from PROVIDER_HEALTH_PATH
+    and PROVIDER_HEALTH_WINDOW_SECS.
+    """
+    global _provider_health
+    with _provider_health_lock:
+        if _provider_health is None:
+            _provider_health = ProviderHealth(
+                path=os.getenv("PROVIDER_HEALTH_PATH", "provider_health.json") or None,
+                window_secs=int(os.getenv("PROVIDER_HEALTH_WINDOW_SECS", 3600)),
+            )
+            atexit.register(_provider_health.save)
+        return _provider_health
@@ -12,6 +12,8 @@ from neurons.apify.reddit.reddit_scraper_lite import RedditScraperLite
 from neurons.apify.reddit.reddit_scraper import RedditScraper
 from neurons.apify.reddit.epctex_reddit_scraper import EpctexRedditScraper
 from neurons.services.percipio_reddit_lookup import PercipioRedditLookup
+from neurons.provider_group import ProviderGroup
+from neurons.provider_health import get_provider_health
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -85,3 +87,29 @@ def get_query(query_type: QueryType, query_provider: QueryProvider):
         return query_class()
     else:
         raise Exception("Invalid query type or query provider")
+
+
+def get_query_group(query_type: QueryType, query_providers: list):
+    """
+    Retrieve a provider group that hedges and falls back across the given providers.
+
+    Parameters:
+    - query_type (QueryType): The type of the query (e.g. TWITTER).
+    - query_providers (list): The providers of the query, in order of preference.
+
+    Returns:
+    A ProviderGroup usable in place of a single query, recording its calls in the process-wide provider health
+    tracker. Hedging is tuned with PROVIDER_HEDGE_PERCENTILE, PROVIDER_HEDGE_MIN_DELAY_SECS and
+    PROVIDER_HEDGE_MAX_DELAY_SECS.
+
+    Raises:
+    Exception: If an invalid query type or provider is given.
+    """
+    return ProviderGroup(
+        [get_query(query_type, query_provider) for query_provider in query_providers],
+        names=[query_provider.value for query_provider in query_providers],
+        hedge_percentile=float(os.getenv("PROVIDER_HEDGE_PERCENTILE", 0.9)),
+        min_hedge_delay_secs=float(os.getenv("PROVIDER_HEDGE_MIN_DELAY_SECS", 5)),
+        max_hedge_delay_secs=float(os.getenv("PROVIDER_HEDGE_MAX_DELAY_SECS", 30)),
+        health=get_provider_health(),
+    )
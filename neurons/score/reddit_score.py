@@ -23,19 +23,58 @@ import torch
 from datetime import datetime
 import bittensor as bt
 from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.apify.lookup import NOT_FOUND
+from neurons.apify.mapping import same_timestamp
+from neurons.score.spot_check import plan_spot_checks, suspicion, verified_ratio
 import random
 from dateutil.parser import parse
 
 reddit_query = get_query(QueryType.REDDIT, QueryProvider.PERCIPIO_REDDIT_LOOKUP)
 
 
-def calculateScore(responses=[], tag="tao"):
+def spot_check_key(post: dict):
+    """
+    The id a post is looked up by for verification, None if it has none.
+    """
+    return post.get("id")
+
+
+def verify_post(sample_item: dict, searched_item) -> bool:
+    """
+    Compare a miner's post with the post looked up for it.
+    """
+    if searched_item is NOT_FOUND:
+        bt.logging.info(f"No result returned for {sample_item}")
+        return False
+    if searched_item["dataType"] == "post" and searched_item.get(
+        "title"
+    ) == sample_item.get("title"):
+        title_ok = True
+    elif searched_item["dataType"] == "comment" and not searched_item.get("title"):
+        title_ok = True
+    else:
+        title_ok = False
+    # Some posts have an empty body, but the apify actor is filling in img/thumbnail in the text
+    # Consider that a match
+    text_ok = (
+        len(searched_item["text"]) == 0 or searched_item["text"] == sample_item["text"]
+    )
+    if title_ok and text_ok and same_timestamp(searched_item["timestamp"], sample_item["timestamp"]):
+        return True
+    bt.logging.info(f"Tampered post! {sample_item}")
+    bt.logging.info(f"Original post: {searched_item}")
+    return False
+
+
+def calculateScore(responses=[], tag="tao", trust=None):
     """
     This function calculates the score of responses.
     The score is calculated by the degree of similarity between responses, accuracy and time difference.
     Args:
         responses (list): The list of responses.
         tag (str): The tag of responses.
+        trust (list, optional): Per response, how much its miner is trusted, from 0 to 1. Less trusted miners
+            get more of their posts verified.
     Returns:
         list: The list of scores for each response.
     """
@@ -57,6 +96,7 @@ def calculateScore(responses=[], tag="tao"):
     # Initialize length list. The length score list is the same as the length of responses.
     length_list = torch.zeros(len(responses))
     correct_list = torch.ones(len(responses))
+    spot_checked_list = torch.zeros(len(responses))
     total_length = 0
     max_length = 0
     relevant_ratio = torch.zeros(len(responses))
@@ -99,25 +139,30 @@ def calculateScore(responses=[], tag="tao"):
                 bt.logging.error(f"❌ Error while verifying post: {e}: {post}")
                 format_score[i] = 1
 
-    # Choose random responses from each miner to compare, and gather their urls
-    spot_check_idx = []
-    spot_check_ids = []
-    spot_check_posts = []
-    for i, response in enumerate(responses):
-        if len(response) > 0:
-            item_idx = random.randrange(len(response))
-            spot_check_idx.append(item_idx)
-            spot_check_id = response[item_idx].get("id")
-            if spot_check_id is not None:
-                spot_check_ids.append(spot_check_id)
-        else:
-            spot_check_idx.append(None)
+    # Plan which posts of each miner to verify within the round's lookup budget, favouring suspicious ones
+    now = datetime.utcnow()
+
+    def post_suspicion(i, post):
+        try:
+            timestamp = datetime.fromisoformat(post["timestamp"].rstrip("Z"))
+        except Exception:
+            timestamp = None
+        return suspicion(timestamp, id_counts.get(post.get("id"), 0), now)
+
+    spot_checks = plan_spot_checks(responses, post_suspicion, spot_check_key, trust)
+    spot_check_ids = {
+        spot_check_key(response[item_idx])
+        for i, response in enumerate(responses)
+        for item_idx in spot_checks[i]
+    }
+    spot_check_ids.discard(None)
 
-    # Fetch spot check urls
+    # Fetch all spot checked posts in batched lookups
+    spot_check_posts = {}
     if len(spot_check_ids) > 0:
         try:
             bt.logging.info(f"Validating {len(spot_check_ids)} posts.")
-            spot_check_posts = reddit_query.lookup(set(spot_check_ids))
+            spot_check_posts = reddit_query.lookupById(sorted(spot_check_ids))
         except Exception as e:
             bt.logging.error(f"❌ Error while verifying post: {e}")
 
@@ -132,42 +177,19 @@ def calculateScore(responses=[], tag="tao"):
         # update max_length
         max_length = max(len(response), max_length)
 
-        # Do spot check for this miner
-        correct_score = 0
-        if len(response) > 0:
-            sample_item = response[spot_check_idx[i]]
-            sample_id = sample_item.get("id", "")
-            searched_item = next(
-                (post for post in spot_check_posts if post["id"] == sample_id), None
-            )
-            if searched_item:
-                if searched_item["dataType"] == "post" and searched_item.get(
-                    "title"
-                ) == sample_item.get("title"):
-                    title_ok = True
-                elif searched_item["dataType"] == "comment" and not searched_item.get(
-                    "title"
-                ):
-                    title_ok = True
-                else:
-                    title_ok = False
-                # Some posts have an empty body, but the apify actor is filling in img/thumbnail in the text
-                # Consider that a match
-                text_ok = (
-                    len(searched_item["text"]) == 0
-                    or searched_item["text"] == sample_item["text"]
-                )
-                if (
-                    title_ok
-                    and text_ok
-                    and searched_item["timestamp"] == sample_item["timestamp"]
-                ):
-                    correct_score = 1
-                else:
-                    bt.logging.info(f"Tampered post! {sample_item}")
-                    bt.logging.info(f"Original post: {searched_item}")
+        # Verify the spot checks of this miner. Posts whose lookup failed do not count either way
+        spot_check_results = []
+        for item_idx in spot_checks[i]:
+            sample_item = response[item_idx]
+            key = spot_check_key(sample_item)
+            if key is not None and key not in spot_check_posts:
+                spot_check_results.append(None)
             else:
-                bt.logging.info(f"No result returned for {sample_item}")
+                spot_check_results.append(
+                    verify_post(sample_item, spot_check_posts.get(key, NOT_FOUND))
+                )
+        correct_score = verified_ratio(spot_check_results)
+        spot_checked_list[i] = len(spot_checks[i])
 
         try:
             # calculate scores
@@ -253,6 +275,7 @@ def calculateScore(responses=[], tag="tao"):
 
     scoring_metrics = {
         "correct": correct_list,
+        "spot_checked": spot_checked_list,
         "similarity": similarity_list,
         "average_age": average_age_list,
         "time_contrib": age_contribution,
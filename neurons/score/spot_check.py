@@ -0,0 +1,135 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+import heapq
+import random
+from datetime import datetime
+from typing import Callable, List, Optional
+
+# Items younger than this look suspicious, as fabricated items are usually dated just now
+FRESH_ITEM_SECS = 600
+
+# Priority lost by a response for every item already sampled from it, so the budget spreads out
+SAMPLE_PENALTY = 0.5
+
+
+def suspicion(timestamp: Optional[datetime], id_count: int, now: datetime) -> float:
+    """
+    How suspicious an item looks before verifying it.
+
+    Args:
+        timestamp (datetime, optional): The item's timestamp in naive UTC, None if it could not be parsed.
+        id_count (int): How many responses of the round contain the item's id.
+        now (datetime): The current time in naive UTC.
+
+    Returns:
+        float: 1 for an unparsable or near-future timestamp, plus 0.5 for an id no other miner returned.
+    """
+    score = 0.0
+    if timestamp is None or (now - timestamp).total_seconds() < FRESH_ITEM_SECS:
+        score += 1.0
+    if id_count <= 1:
+        score += 0.5
+    return score
+
+
+def plan_spot_checks(
+    responses: List[list],
+    suspicion_of: Callable[[int, dict], float],
+    key_of: Callable[[dict], Optional[str]],
+    trust: Optional[List[float]] = None,
+    budget: int = None,
+    max_per_miner: int = None,
+    rng: random.Random = random,
+) -> List[List[int]]:
+    """
+    Choose which items of each response to verify, within a lookup budget per round.
+
+    Every non-empty response gets its most suspicious item checked. The rest of the budget goes to further
+    items one at a time, each to the response ranking highest by the suspicion of its next item, plus how
+    little its miner is trusted, minus ``SAMPLE_PENALTY`` per item already sampled from it. The budget counts
+    distinct lookup keys, so items already being looked up for another miner are free.
+
+    Args:
+        responses (list): The responses of the round.
+        suspicion_of (callable): Suspicion of an item, given the index of its response and the item.
+        key_of (callable): The key an item is looked up by, None if it cannot be looked up.
+        trust (list, optional): Per response, how much its miner is trusted, from 0 to 1. Defaults to 1.
+        budget (int, optional): Distinct lookups per round, by default SPOT_CHECK_BUDGET or 64.
+        max_per_miner (int, optional): Most items checked per response, by default SPOT_CHECK_MAX_PER_MINER or 4.
+        rng (random.Random, optional): Breaks ties between equally suspicious items.
+
+    Returns:
+        list: Per response, the indices of the items to verify.
+    """
+    if budget is None:
+        budget = int(os.getenv("SPOT_CHECK_BUDGET", 64))
+    if max_per_miner is None:
+        max_per_miner = int(os.getenv("SPOT_CHECK_MAX_PER_MINER", 4))
+
+    # Per response, its items from most to least suspicious
+    candidates = []
+    for i, response in enumerate(responses):
+        ranked = sorted(
+            ((suspicion_of(i, item), rng.random(), idx) for idx, item in enumerate(response or [])),
+            reverse=True,
+        )
+        candidates.append(ranked)
+
+    plan = [[] for _ in responses]
+    keys = set()
+
+    def take(i: int):
+        _, _, idx = candidates[i].pop(0)
+        plan[i].append(idx)
+        key = key_of(responses[i][idx])
+        if key is not None:
+            keys.add(key)
+
+    def priority(i: int) -> float:
+        distrust = 1.0 - trust[i] if trust else 0.0
+        return candidates[i][0][0] + distrust - SAMPLE_PENALTY * len(plan[i])
+
+    for i in range(len(responses)):
+        if candidates[i]:
+            take(i)
+
+    heap = [(-priority(i), i) for i in range(len(responses)) if candidates[i] and max_per_miner > 1]
+    heapq.heapify(heap)
+    while heap and len(keys) < budget:
+        _, i = heapq.heappop(heap)
+        take(i)
+        if candidates[i] and len(plan[i]) < max_per_miner:
+            heapq.heappush(heap, (-priority(i), i))
+    return plan
+
+
+def verified_ratio(results: List[Optional[bool]]) -> float:
+    """
+    Share of a miner's spot checks that verified, over the checks that came to a verdict.
+
+    Args:
+        results (list): Per checked item, True if it verified, False if it did not, None if the lookup failed.
+
+    Returns:
+        float: The verified ratio, 0 when no check came to a verdict.
+    """
+    verdicts = [result for result in results if result is not None]
+    return sum(verdicts) / len(verdicts) if verdicts else 0.0
@@ -29,22 +29,75 @@ from urllib.parse import urlparse
 import os
 import re
 import html
-from neurons.queries import get_query, QueryType, QueryProvider
+from neurons.queries import get_query_group, QueryType, QueryProvider
+from neurons.apify.lookup import NOT_FOUND, found_items, tweet_id as url_tweet_id
+from neurons.apify.mapping import parse_timestamp, same_timestamp
+from neurons.score.spot_check import plan_spot_checks, suspicion, verified_ratio
 
-twitter_query = get_query(QueryType.TWITTER, QueryProvider.APIDOJO_TWEET_SCRAPER)
+# Verification falls back to a second provider so a slow actor does not time out the scoring
+twitter_query = get_query_group(
+    QueryType.TWITTER,
+    [QueryProvider.APIDOJO_TWEET_SCRAPER, QueryProvider.MICROWORLDS_TWITTER_SCRAPER],
+)
 
 
 def parse_date(dateStr: str):
-    return datetime.strptime(dateStr, "%Y-%m-%d %H:%M:%S+00:00")
+    # Naive UTC, from any of the timestamp formats miners have sent, with or without microseconds
+    return parse_timestamp(dateStr).replace(tzinfo=None)
 
 
-def calculateScore(responses: Optional[list] = None, tag="tao"):
+def spot_check_key(tweet: dict) -> Optional[str]:
+    """
+    The id a tweet is looked up by for verification, None if its url is not a status url.
+    """
+    url = tweet.get("url")
+    return url_tweet_id(url) if isinstance(url, str) else None
+
+
+def verify_tweet(miner_idx: int, sample_item: dict, searched_item) -> bool:
+    """
+    Compare a miner's tweet with the tweet looked up for it.
+    """
+    if searched_item is NOT_FOUND or searched_item["id"] != sample_item["id"]:
+        bt.logging.info(
+            f"No result returned for {sample_item} (miner_idx={miner_idx})"
+        )
+        return False
+    # Normalize text to account for variations in scraped data.
+    miner_text = sample_item["text"]
+    verify_text = searched_item["text"]
+
+    if verify_text != miner_text:
+        bt.logging.info(
+            f"Text does not match! (miner_idx = {miner_idx}) {sample_item}"
+        )
+        bt.logging.info(f"Original tweet: {searched_item}")
+    elif not same_timestamp(searched_item["timestamp"], sample_item["timestamp"]):
+        bt.logging.info(
+            f"Timestamp does not match! (miner_idx = {miner_idx}) {sample_item}"
+        )
+        bt.logging.info(f"Original tweet: {searched_item}")
+    elif searched_item["username"] != sample_item["username"]:
+        bt.logging.info(
+            f"Username does not match! (miner_idx = {miner_idx}) {sample_item}"
+        )
+        bt.logging.info(f"Original tweet: {searched_item}")
+    else:
+        return True
+    return False
+
+
+def calculateScore(
+    responses: Optional[list] = None, tag="tao", trust: Optional[list] = None
+):
     """
     This function calculates the score of responses.
     The score is calculated by the degree of similarity between responses, accuracy and time difference.
     Args:
         responses (list): The list of responses.
         tag (str): The tag of responses.
+        trust (list, optional): Per response, how much its miner is trusted, from 0 to 1. Less trusted miners
+            get more of their tweets verified.
     Returns:
         list: The list of scores for each response.
     """
@@ -67,6 +120,7 @@ def calculateScore(responses: Optional[list] = None, tag="tao"):
     # Initialize length list. The length score list is the same as the length of responses.
     length_list = torch.zeros(len(responses))
     correct_list = torch.ones(len(responses))
+    spot_checked_list = torch.zeros(len(responses))
     total_length = 0
     max_length = 0
     relevant_ratio = torch.zeros(len(responses))
@@ -124,44 +178,45 @@ def calculateScore(responses: Optional[list] = None, tag="tao"):
                 bt.logging.warning(f"❌ Bad format for tweet: {e}, {tweet}")
                 format_score[i] = 1
 
-    # Choose random responses from each miner to compare, and gather their urls
-    spot_check_idx = []
-    spot_check_urls = []
-    spot_check_tweets = []
+    # Plan which tweets of each miner to verify within the round's lookup budget, favouring suspicious ones
+    now = datetime.utcnow()
+
+    def tweet_suspicion(i, tweet):
+        try:
+            timestamp = parse_date(tweet["timestamp"])
+        except Exception:
+            timestamp = None
+        return suspicion(timestamp, id_counts.get(tweet.get("id"), 0), now)
+
+    spot_checks = plan_spot_checks(responses, tweet_suspicion, spot_check_key, trust)
+    spot_check_urls = {}
     for i, response in enumerate(responses):
-        if len(response) > 0:
-            item_idx = random.randrange(len(response))
-            spot_check_idx.append(item_idx)
-            url = response[item_idx].get("url")
-            if url and re.search("(twitter.com|x.com)\/\w+\/status\/\d+", url):
-                spot_check_urls.append(url)
-        else:
-            spot_check_idx.append(None)
+        for item_idx in spot_checks[i]:
+            key = spot_check_key(response[item_idx])
+            if key is not None:
+                spot_check_urls.setdefault(key, response[item_idx]["url"])
 
-    # Fetch spot check urls
+    # Fetch all spot checked tweets in batched lookups, retrying the ones that were not found once
+    spot_check_tweets = {}
     if len(spot_check_urls) > 0:
         try:
-            spot_check_tweets = []
-            found_urls = set()
             tries = 0
-            remaining_urls = set(spot_check_urls)
+            remaining_urls = dict(spot_check_urls)
             while tries < 2 and len(remaining_urls) > 0:
-                urls = random.sample(
-                    sorted(remaining_urls), k=min(20, len(remaining_urls))
-                )
-                bt.logging.info(
-                    f"Fetching {len(urls)} tweets out of {len(remaining_urls)} remaining to validate."
-                )
-                batch_tweets = twitter_query.searchByUrl(urls)
-                batch_urls = set([tweet["url"] for tweet in batch_tweets])
-                bt.logging.info(f"Fetched {len(batch_urls)}.")
-                remaining_urls = remaining_urls - set(batch_urls)
-                spot_check_tweets += batch_tweets
+                bt.logging.info(f"Fetching {len(remaining_urls)} tweets to validate.")
+                batch_tweets = twitter_query.lookupByUrl(list(remaining_urls.values()))
+                for id, tweet in batch_tweets.items():
+                    if tweet is not NOT_FOUND or id not in spot_check_tweets:
+                        spot_check_tweets[id] = tweet
+                bt.logging.info(f"Fetched {len(found_items(batch_tweets))}.")
+                remaining_urls = {
+                    id: url
+                    for id, url in remaining_urls.items()
+                    if not spot_check_tweets.get(id)
+                }
                 tries += 1
-            found_urls = [tweet["url"] for tweet in spot_check_tweets]
-            missing_urls = set(spot_check_urls) - set(found_urls)
             bt.logging.info(
-                f"Missing {len(missing_urls)}/{len(spot_check_urls)} tweets."
+                f"Missing {len(remaining_urls)}/{len(spot_check_urls)} tweets."
             )
         except Exception as e:
             print(traceback.format_exc())
@@ -178,42 +233,19 @@ def calculateScore(responses: Optional[list] = None, tag="tao"):
         if len(response) > max_length:
             max_length = len(response)
 
-        # Do spot check for this miner
-        correct_score = 0
-        if len(response) > 0:
-            sample_item = response[spot_check_idx[i]]
-            searched_item = next(
-                (
-                    tweet
-                    for tweet in spot_check_tweets
-                    if tweet["id"] == sample_item["id"]
-                ),
-                None,
-            )
-            if searched_item:
-                # Normalize text to account for variations in scraped data.
-                miner_text = sample_item["text"]
-                verify_text = searched_item["text"]
-
-                if verify_text != miner_text:
-                    bt.logging.info(
-                        f"Text does not match! (miner_idx = {i}) {sample_item}"
-                    )
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                elif searched_item["timestamp"] != sample_item["timestamp"]:
-                    bt.logging.info(
-                        f"Timestamp does not match! (miner_idx = {i}) {sample_item}"
-                    )
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                elif searched_item["username"] != sample_item["username"]:
-                    bt.logging.info(
-                        f"Username does not match! (miner_idx = {i}) {sample_item}"
-                    )
-                    bt.logging.info(f"Original tweet: {searched_item}")
-                else:
-                    correct_score = 1
+        # Verify the spot checks of this miner. Tweets whose lookup failed do not count either way
+        spot_check_results = []
+        for item_idx in spot_checks[i]:
+            sample_item = response[item_idx]
+            key = spot_check_key(sample_item)
+            if key is not None and key not in spot_check_tweets:
+                spot_check_results.append(None)
             else:
-                bt.logging.info(f"No result returned for {sample_item} (miner_idx={i})")
+                spot_check_results.append(
+                    verify_tweet(i, sample_item, spot_check_tweets.get(key, NOT_FOUND))
+                )
+        correct_score = verified_ratio(spot_check_results)
+        spot_checked_list[i] = len(spot_checks[i])
 
         # calculate scores
         for item in response:
@@ -299,6 +331,7 @@ def calculateScore(responses: Optional[list] = None, tag="tao"):
 
     scoring_metrics = {
         "correct": correct_list,
+        "spot_checked": spot_checked_list,
         "similarity": similarity_list,
         "average_age": average_age_list,
         "time_contrib": age_contribution,
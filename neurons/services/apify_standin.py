@@ -0,0 +1,309 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import uuid
+import base64
+import random
+import asyncio
+import argparse
+import logging
+import orjson
+from aiohttp import ClientSession, ClientTimeout, web
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Webhook event type per terminal run status
+RUN_EVENT_TYPES = {
+    "SUCCEEDED": "ACTOR.RUN.SUCCEEDED",
+    "FAILED": "ACTOR.RUN.FAILED",
+    "TIMED-OUT": "ACTOR.RUN.TIMED_OUT",
+    "ABORTED": "ACTOR.RUN.ABORTED",
+}
+
+
+def _data(data) -> web.Response:
+    return web.Response(body=orjson.dumps({"data": data}), content_type="application/json")
+
+
+def _not_found(what: str) -> web.Response:
+    error = {"error": {"type": "record-not-found", "message": f"{what} was not found"}}
+    return web.Response(status=404, body=orjson.dumps(error), content_type="application/json")
+
+
+class ApifyStandIn:
+    """
+    Local stand-in for the parts of the Apify API the actor runtime uses, for exercising runs, streaming,
+    webhooks and status polling without spending compute units. Point the runtime at it with ``api_url`` or
+    APIFY_API_URL.
+
+    Every started run pushes ``items_per_run`` items drawn from ``items`` to its dataset over ``run_secs``,
+    then succeeds, or fails with ``failure_rate``, unless it is aborted or reaches its timeout first. The
+    webhooks passed when starting the run are called when it finishes; ``webhook_loss_rate`` of the calls are
+    dropped to exercise the polling fallback. Run stats report compute units from the run memory and time,
+    and are only final once the run has finished; aborted runs stay ABORTING for ``abort_secs`` first.
+    """
+
+    def __init__(
+        self,
+        items: list = None,
+        items_per_run: int = 20,
+        run_secs: float = 5.0,
+        failure_rate: float = 0.0,
+        webhook_loss_rate: float = 0.0,
+        abort_secs: float = 0.0,
+        seed: int = None,
+    ):
+        """
+        Args:
+            items (list, optional): Dataset items to serve. Defaults to numbered placeholder items.
+            items_per_run (int): Items each run pushes to its dataset.
+            run_secs (float): Time each run takes to push its items.
+            failure_rate (float): Share of runs ending FAILED instead of SUCCEEDED.
+            webhook_loss_rate (float): Share of webhook calls dropped.
+            abort_secs (float): Time aborted runs take to finish aborting.
+            seed (int, optional): Seed for item sampling and failure injection.
+        """
+        self.items = items or [{"id": str(i), "text": f"item {i}"} for i in range(1000)]
+        self.items_per_run = items_per_run
+        self.run_secs = run_secs
+        self.failure_rate = failure_rate
+        self.webhook_loss_rate = webhook_loss_rate
+        self.abort_secs = abort_secs
+        self.random = random.Random(seed)
+        self.runs = {}
+        self.datasets = {}
+        self.requests = 0
+        self._tasks = set()
+        self._runner = None
+        self.app = web.Application(middlewares=[self._count])
+        self.app.router.add_post("/v2/acts/{actor_id}/runs", self._start_run)
+        self.app.router.add_get("/v2/actor-runs", self._list_runs)
+        self.app.router.add_get("/v2/actor-runs/{run_id}", self._get_run)
+        self.app.router.add_post("/v2/actor-runs/{run_id}/abort", self._abort_run)
+        self.app.router.add_get("/v2/datasets/{dataset_id}", self._get_dataset)
+        self.app.router.add_get("/v2/datasets/{dataset_id}/items", self._list_items)
+
+    @web.middleware
+    async def _count(self, request: web.Request, handler):
+        self.requests += 1
+        return await handler(request)
+
+    def _finish(self, run: dict, status: str):
+        if run["status"] not in ("READY", "RUNNING", "ABORTING"):
+            return
+        run["status"] = status
+        run["finishedAt"] = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        run_secs = time.time() - run["_started"]
+        run["stats"]["runTimeSecs"] = run_secs
+        run["stats"]["durationMillis"] = int(run_secs * 1000)
+        run["stats"]["computeUnits"] = run["options"]["memoryMbytes"] / 1024 * run_secs / 3600
+        run["usageTotalUsd"] = run["stats"]["computeUnits"] * 0.4
+        self._spawn(self._call_webhooks(run))
+
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _call_webhooks(self, run: dict):
+        payload = {
+            "eventType": RUN_EVENT_TYPES[run["status"]],
+            "eventData": {"actorId": run["actId"], "actorRunId": run["id"]},
+            "resource": self._public(run),
+        }
+        async with ClientSession(timeout=ClientTimeout(total=10)) as session:
+            for webhook in run["_webhooks"]:
+                if payload["eventType"] not in webhook.get("eventTypes", []):
+                    continue
+                if self.webhook_loss_rate and self.random.random() < self.webhook_loss_rate:
+                    logger.info(f"Dropping webhook of run {run['id']}")
+                    continue
+                try:
+                    async with session.post(webhook["requestUrl"], json=payload) as response:
+                        logger.info(f"Webhook of run {run['id']} answered {response.status}")
+                except Exception as e:
+                    logger.warning(f"Webhook of run {run['id']} failed: {e}")
+
+    async def _execute(self, run: dict):
+        dataset = self.datasets[run["defaultDatasetId"]]
+        interval = self.run_secs / max(1, self.items_per_run)
+        deadline = run["_started"] + run["options"]["timeoutSecs"]
+        for _ in range(self.items_per_run):
+            await asyncio.sleep(interval)
+            if run["status"] != "RUNNING":
+                return
+            if time.time() >= deadline:
+                self._finish(run, "TIMED-OUT")
+                return
+            dataset.append(self.random.choice(self.items))
+        failed = self.failure_rate and self.random.random() < self.failure_rate
+        self._finish(run, "FAILED" if failed else "SUCCEEDED")
+
+    def _public(self, run: dict) -> dict:
+        return {key: value for key, value in run.items() if not key.startswith("_")}
+
+    async def _start_run(self, request: web.Request) -> web.Response:
+        run_id = uuid.uuid4().hex[:17]
+        dataset_id = uuid.uuid4().hex[:17]
+        webhooks = []
+        if "webhooks" in request.query:
+            webhooks = orjson.loads(base64.b64decode(request.query["webhooks"]))
+        run = {
+            "id": run_id,
+            "actId": request.match_info["actor_id"],
+            "status": "RUNNING",
+            "startedAt": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "finishedAt": None,
+            "defaultDatasetId": dataset_id,
+            "options": {
+                "timeoutSecs": int(request.query.get("timeout", 300)),
+                "memoryMbytes": int(request.query.get("memory", 1024)),
+            },
+            "stats": {"computeUnits": 0.0, "runTimeSecs": 0.0, "durationMillis": 0},
+            "usageTotalUsd": 0.0,
+            "_started": time.time(),
+            "_webhooks": webhooks,
+            "_input": await request.read(),
+        }
+        self.runs[run_id] = run
+        self.datasets[dataset_id] = []
+        self._spawn(self._execute(run))
+        return _data(self._public(run))
+
+    async def _list_runs(self, request: web.Request) -> web.Response:
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 1000))
+        runs = list(self.runs.values())
+        if request.query.get("desc") in ("1", "true"):
+            runs.reverse()
+        fields = ("id", "actId", "status", "startedAt", "finishedAt", "defaultDatasetId", "usageTotalUsd")
+        items = [{key: run[key] for key in fields} for run in runs[offset : offset + limit]]
+        return _data({"items": items, "total": len(runs), "offset": offset, "limit": limit, "count": len(items)})
+
+    async def _get_run(self, request: web.Request) -> web.Response:
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            return _not_found("Actor run")
+        wait_secs = float(request.query.get("waitForFinish", 0))
+        deadline = time.time() + wait_secs
+        while run["status"] in ("RUNNING", "ABORTING") and time.time() < deadline:
+            await asyncio.sleep(0.1)
+        return _data(self._public(run))
+
+    async def _abort_run(self, request: web.Request) -> web.Response:
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            return _not_found("Actor run")
+        if self.abort_secs and run["status"] == "RUNNING":
+            run["status"] = "ABORTING"
+            self._spawn(self._finish_later(run, "ABORTED", self.abort_secs))
+        else:
+            self._finish(run, "ABORTED")
+        return _data(self._public(run))
+
+    async def _finish_later(self, run: dict, status: str, delay_secs: float):
+        await asyncio.sleep(delay_secs)
+        self._finish(run, status)
+
+    async def _get_dataset(self, request: web.Request) -> web.Response:
+        dataset_id = request.match_info["dataset_id"]
+        if dataset_id not in self.datasets:
+            return _not_found("Dataset")
+        return _data({"id": dataset_id, "itemCount": len(self.datasets[dataset_id])})
+
+    async def _list_items(self, request: web.Request) -> web.Response:
+        dataset = self.datasets.get(request.match_info["dataset_id"])
+        if dataset is None:
+            return _not_found("Dataset")
+        offset = int(request.query.get("offset", 0))
+        limit = int(request.query.get("limit", 1000))
+        items = dataset[offset : offset + limit]
+        if request.query.get("fields"):
+            fields = request.query["fields"].split(",")
+            items = [{key: item[key] for key in fields if key in item} for item in items]
+        if request.query.get("omit"):
+            omit = set(request.query["omit"].split(","))
+            items = [{key: value for key, value in item.items() if key not in omit} for item in items]
+        headers = {
+            "x-apify-pagination-total": str(len(dataset)),
+            "x-apify-pagination-offset": str(offset),
+            "x-apify-pagination-limit": str(limit),
+            "x-apify-pagination-count": str(len(items)),
+            "x-apify-pagination-desc": "false",
+        }
+        return web.Response(body=orjson.dumps(items), content_type="application/json", headers=headers)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start serving on the current event loop.
+
+        Returns:
+            str: The api url to point the Apify clients at.
+        """
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the Apify API")
+    parser.add_argument("--items", help="JSON lines file of the dataset items runs return")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8098)
+    parser.add_argument("--items-per-run", type=int, default=20)
+    parser.add_argument("--run-secs", type=float, default=5.0, help="Seconds each run takes")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of runs that fail")
+    parser.add_argument("--webhook-loss-rate", type=float, default=0.0, help="Share of webhook calls dropped")
+    parser.add_argument("--abort-secs", type=float, default=0.0, help="Seconds aborted runs take to finish")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    items = None
+    if args.items:
+        with open(args.items, "rb") as f:
+            items = [orjson.loads(line) for line in f if line.strip()]
+
+    async def serve():
+        stand_in = ApifyStandIn(
+            items, args.items_per_run, args.run_secs, args.failure_rate, args.webhook_loss_rate, args.abort_secs
+        )
+        url = await stand_in.start(args.host, args.port)
+        logger.info(f"Serving a stand-in Apify API at {url}, set APIFY_API_URL={url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await stand_in.stop()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
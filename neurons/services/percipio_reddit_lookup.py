@@ -1,15 +1,182 @@
-import requests
+import os
+import time
+import asyncio
+import logging
+import aiohttp
+from collections import OrderedDict
+from urllib.parse import quote
+from neurons.apify.actors import get_runtime
+from neurons.apify.lookup import NOT_FOUND, batched_lookup, found_items
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+# Response statuses worth retrying, as the next attempt may succeed
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class _IdCache:
+    """
+    Size-bounded LRU cache of looked up ids, with separate TTLs for found and not found ids.
+
+    Only used from the actor runtime loop, so it needs no locking.
+    """
+
+    def __init__(self, ttl_secs: float, negative_ttl_secs: float, max_entries: int):
+        self.ttl_secs = ttl_secs
+        self.negative_ttl_secs = negative_ttl_secs
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, ids: list) -> dict:
+        now = time.monotonic()
+        cached = {}
+        for id in ids:
+            entry = self._entries.get(id)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                continue
+            self._entries.move_to_end(id)
+            cached[id] = entry[1]
+            self.hits += 1
+        return cached
+
+    def put_many(self, results: dict):
+        now = time.monotonic()
+        for id, item in results.items():
+            ttl = self.negative_ttl_secs if item is NOT_FOUND else self.ttl_secs
+            if ttl <= 0:
+                continue
+            self._entries[id] = (now + ttl, item)
+            self._entries.move_to_end(id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
 
 
 class PercipioRedditLookup:
     """
     A class for verifing reddit ids from the percip.io service
+
+    Lookups share one pooled session, split the ids into requests whose url stays below ``max_url_length``,
+    fetch those requests concurrently with retries, and cache found and not found ids for a while.
     """
 
-    def __init__(self):
-        pass
+    def __init__(
+        self,
+        timeout_secs: int = 30,
+        base_url: str = None,
+        max_url_length: int = None,
+        max_connections: int = None,
+        max_retries: int = None,
+        cache_ttl_secs: float = None,
+        negative_cache_ttl_secs: float = None,
+        cache_max_entries: int = None,
+    ):
+        """
+        Args:
+            timeout_secs (int): Timeout of each request.
+            base_url (str, optional): The lookup API, by default PERCIPIO_API_URL or https://api.percip.io.
+            max_url_length (int, optional): Longest request url, by default PERCIPIO_MAX_URL_LENGTH or 2000.
+            max_connections (int, optional): Connection pool size, by default PERCIPIO_MAX_CONNECTIONS or 8.
+            max_retries (int, optional): Retries of failed requests, by default PERCIPIO_MAX_RETRIES or 2.
+            cache_ttl_secs (float, optional): How long found ids are cached, by default PERCIPIO_CACHE_TTL_SECS
+                or 600. 0 disables caching.
+            negative_cache_ttl_secs (float, optional): How long ids that were not found are cached, by default
+                PERCIPIO_NEGATIVE_CACHE_TTL_SECS or 60.
+            cache_max_entries (int, optional): Most ids cached, by default PERCIPIO_CACHE_MAX_ENTRIES or 100000.
+        """
+        self.timeout_secs = timeout_secs
+        self.base_url = (base_url or os.getenv("PERCIPIO_API_URL", "https://api.percip.io")).rstrip("/")
+        self.max_url_length = max_url_length or int(os.getenv("PERCIPIO_MAX_URL_LENGTH", 2000))
+        self.max_connections = max_connections or int(os.getenv("PERCIPIO_MAX_CONNECTIONS", 8))
+        self.max_retries = (
+            max_retries if max_retries is not None else int(os.getenv("PERCIPIO_MAX_RETRIES", 2))
+        )
+        self.cache = _IdCache(
+            cache_ttl_secs
+            if cache_ttl_secs is not None
+            else float(os.getenv("PERCIPIO_CACHE_TTL_SECS", 600)),
+            negative_cache_ttl_secs
+            if negative_cache_ttl_secs is not None
+            else float(os.getenv("PERCIPIO_NEGATIVE_CACHE_TTL_SECS", 60)),
+            cache_max_entries or int(os.getenv("PERCIPIO_CACHE_MAX_ENTRIES", 100000)),
+        )
+        self._session = None
 
-    def lookup(self, ids: [int] = ["bittensor"]) -> list:
+    def _get_session(self) -> aiohttp.ClientSession:
+        # The session keeps connections to percip.io open between lookups. It is bound to the loop it was
+        # created on, so it is only used from the actor runtime loop
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout_secs),
+                connector=aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300),
+            )
+        return self._session
+
+    def _url(self, ids: list) -> str:
+        return f"{self.base_url}/reddit_ids/" + ",".join(quote(id, safe="") for id in ids)
+
+    def _chunk(self, ids: list) -> list:
+        """
+        Split ids into requests whose url stays within ``max_url_length``.
+        """
+        base_length = len(self._url([]))
+        chunks = []
+        chunk = []
+        length = base_length
+        for id in ids:
+            id_length = len(quote(id, safe="")) + (1 if chunk else 0)
+            if chunk and length + id_length > self.max_url_length:
+                chunks.append(chunk)
+                chunk = []
+                length = base_length
+                id_length -= 1
+            chunk.append(id)
+            length += id_length
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    async def _fetch(self, ids: list) -> list:
+        url = self._url(ids)
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._get_session().get(url) as response:
+                    response.raise_for_status()
+                    return await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                retryable = not isinstance(e, aiohttp.ClientResponseError) or e.status in RETRYABLE_STATUSES
+                if not retryable or attempt == self.max_retries:
+                    raise
+                logger.info(f"Retrying percip.io lookup of {len(ids)} ids after: {e!r}")
+                await asyncio.sleep(0.5 * 2**attempt)
+
+    async def _lookup_by_id(self, ids: list) -> dict:
+        ids = list(dict.fromkeys(ids))
+        results = self.cache.get_many(ids)
+        missing = [id for id in ids if id not in results]
+        if missing:
+            fetched = await batched_lookup(
+                missing,
+                self._fetch,
+                len(missing),
+                lambda id: id,
+                lambda item: item["id"],
+                chunk=self._chunk,
+            )
+            self.cache.put_many(fetched)
+            results.update(fetched)
+        return results
+
+    async def _lookup(self, ids: list) -> list:
+        return found_items(await self._lookup_by_id(ids))
+
+    async def lookup_async(self, ids: [int] = ["bittensor"]) -> list:
         """
         Find reddit posts/comments by id. Id should be full name form, with prefix, for example: t3_17mhoqv
 
@@ -19,18 +186,38 @@ class PercipioRedditLookup:
         Returns:
             list: A list of reddit posts/comments/etc.
         """
+        return await get_runtime().run_async(self._lookup(ids))
+
+    def lookup(self, ids: [int] = ["bittensor"]) -> list:
+        """
+        Blocking wrapper of ``lookup_async``, for callers without an event loop.
+        """
+        return get_runtime().run_coroutine(self._lookup(ids))
 
-        ids_str = ",".join(ids)
-        url = "https://api.percip.io/reddit_ids/" + ids_str
-        response = requests.get(url)
+    async def lookup_by_id_async(self, ids: list) -> dict:
+        """
+        Find reddit posts/comments by id, with as few requests as the url length allows.
+
+        Args:
+            ids (list, required): A list of reddit ids in full name form.
+
+        Returns:
+            dict: The post/comment or NOT_FOUND per id. Ids of failed requests are left out.
+        """
+        return await get_runtime().run_async(self._lookup_by_id(ids))
+
+    def lookupById(self, ids: list) -> dict:
+        """
+        Blocking wrapper of ``lookup_by_id_async``, for callers without an event loop.
+        """
+        return get_runtime().run_coroutine(self._lookup_by_id(ids))
 
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Parse JSON data
-            return response.json()
-        else:
-            print("Failed to retrieve data")
-            return []
+    def stats(self) -> dict:
+        return {
+            "cache_entries": len(self.cache),
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+        }
 
 
 if __name__ == "__main__":
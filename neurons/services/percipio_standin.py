@@ -0,0 +1,126 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import random
+import asyncio
+import argparse
+import logging
+import orjson
+from aiohttp import web
+
+# Set up logger for the script
+logger = logging.getLogger(__name__)
+
+
+class PercipioStandIn:
+    """
+    Local stand-in for the percip.io reddit id lookup API, for exercising PercipioRedditLookup without the
+    real service. Point the lookup at it with ``base_url`` or PERCIPIO_API_URL.
+
+    Serves ``GET /reddit_ids/<id>,<id>,...`` with the known items among the requested ids, and answers urls
+    longer than ``max_url_length`` with 414 like a real front end would.
+    """
+
+    def __init__(
+        self,
+        items: list = None,
+        latency_secs: float = 0.0,
+        failure_rate: float = 0.0,
+        max_url_length: int = 4096,
+        seed: int = None,
+    ):
+        """
+        Args:
+            items (list, optional): The reddit posts/comments to serve, keyed by their "id".
+            latency_secs (float): Delay added to every response.
+            failure_rate (float): Share of requests answered with 503.
+            max_url_length (int): Longest accepted request url.
+            seed (int, optional): Seed for the failure injection.
+        """
+        self.items = {item["id"]: item for item in items or []}
+        self.latency_secs = latency_secs
+        self.failure_rate = failure_rate
+        self.max_url_length = max_url_length
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.app = web.Application()
+        self.app.router.add_get("/reddit_ids/{ids}", self._handle)
+        self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if len(str(request.url)) > self.max_url_length:
+            return web.Response(status=414)
+        if self.latency_secs:
+            await asyncio.sleep(self.latency_secs)
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            return web.Response(status=503)
+        ids = request.match_info["ids"].split(",")
+        found = [self.items[id] for id in ids if id in self.items]
+        return web.Response(body=orjson.dumps(found), content_type="application/json")
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Start serving on the current event loop.
+
+        Returns:
+            str: The base url to look up against.
+        """
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the percip.io reddit id lookup")
+    parser.add_argument("--items", help="JSON lines file of the reddit posts/comments to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests failing with 503")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    items = []
+    if args.items:
+        with open(args.items, "rb") as f:
+            items = [orjson.loads(line) for line in f if line.strip()]
+
+    async def serve():
+        stand_in = PercipioStandIn(items, args.latency, args.failure_rate)
+        url = await stand_in.start(args.host, args.port)
+        logger.info(f"Serving {len(items)} reddit items at {url}, set PERCIPIO_API_URL={url}")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await stand_in.stop()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -17,4 +17,8 @@ OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE S
 DEALINGS IN THE SOFTWARE.
 """
 
-from . import store
+from . import dedup
+from . import indexing
+from . import metrics_log
+from . import records
+from . import spool
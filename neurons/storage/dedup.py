@@ -0,0 +1,302 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import json
+import math
+import os
+import pickle
+import time
+from collections import OrderedDict, deque
+from hashlib import blake2b
+from logging import getLogger
+from typing import Any, Dict, Iterable, Iterator, List
+
+logger = getLogger(__name__)
+
+
+class BloomFilter:
+    """
+    A fixed-size Bloom filter over string keys, using double hashing of a single blake2b digest.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key to the filter.
+
+        Returns:
+            bool: True if the key was not (probably) present before.
+        """
+        added = False
+        for pos in self._positions(key):
+            mask = 1 << (pos & 7)
+            if not self.bits[pos >> 3] & mask:
+                self.bits[pos >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+
+class ScalableBloomFilter:
+    """
+    A Bloom filter that grows by chaining larger filters with tighter error rates once the current one is full,
+    so the overall false positive rate stays bounded by roughly twice the initial error rate.
+    """
+
+    def __init__(self, initial_capacity: int = 100_000, error_rate: float = 0.001, growth: int = 2, tightening: float = 0.5):
+        self.growth = growth
+        self.tightening = tightening
+        self.created_at = time.time()
+        self.filters = [BloomFilter(initial_capacity, error_rate * (1 - tightening))]
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in f for f in reversed(self.filters))
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def add(self, key: str) -> bool:
+        if key in self:
+            return False
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(
+                current.capacity * self.growth, current.error_rate * self.tightening
+            )
+            self.filters.append(current)
+        return current.add(key)
+
+
+class DedupIndex:
+    """
+    Persistent, bounded index of item ids that were already stored, consulted before anything is written.
+
+    Recent ids are kept exactly in a fixed-size window; older ids live in scalable Bloom filters that are
+    rotated periodically, so an id is remembered for between one and two rotation periods and memory stays
+    bounded. Ids are namespaced by source type, e.g. "twitter" or "reddit".
+
+    Saving appends the ids added since the last save to a log next to the snapshot at ``path``, so its cost
+    follows the new ids rather than the whole history. The snapshot is only rewritten, and the log emptied,
+    once the log holds ``snapshot_every`` ids or a generation has rotated.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        recent_size: int = 50_000,
+        rotation_secs: int = 7 * 24 * 3600,
+        max_generation_items: int = 2_000_000,
+        initial_capacity: int = 100_000,
+        error_rate: float = 0.001,
+        snapshot_every: int = 200_000,
+    ):
+        self.path = path
+        self.snapshot_every = snapshot_every
+        self.recent_size = recent_size
+        self.rotation_secs = rotation_secs
+        self.max_generation_items = max_generation_items
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.recent: "OrderedDict[str, None]" = OrderedDict()
+        self.generations = deque([self._new_generation()], maxlen=2)
+        self.lookups = 0
+        self.exact_hits = 0
+        self.bloom_hits = 0
+        # Keys added since the last save, and keys in the log since the last snapshot
+        self._unsaved: List[str] = []
+        self._logged = 0
+        self._snapshot_due = False
+
+    @property
+    def log_path(self) -> str:
+        return f"{self.path}.log"
+
+    def _new_generation(self) -> ScalableBloomFilter:
+        return ScalableBloomFilter(self.initial_capacity, self.error_rate)
+
+    @staticmethod
+    def _key(namespace: str, item_id: Any) -> str:
+        return f"{namespace}:{item_id}"
+
+    def _maybe_rotate(self):
+        current = self.generations[-1]
+        if (
+            time.time() - current.created_at >= self.rotation_secs
+            or len(current) >= self.max_generation_items
+        ):
+            logger.info(f"Rotating dedup index generation holding {len(current)} ids")
+            self.generations.append(self._new_generation())
+            self._snapshot_due = True
+
+    def contains(self, namespace: str, item_id: Any) -> bool:
+        """
+        Check whether an id was already stored, updating hit statistics.
+        """
+        key = self._key(namespace, item_id)
+        self.lookups += 1
+        if key in self.recent:
+            self.exact_hits += 1
+            return True
+        if any(key in generation for generation in self.generations):
+            self.bloom_hits += 1
+            return True
+        return False
+
+    def add(self, namespace: str, item_id: Any):
+        """
+        Record an id as stored.
+        """
+        key = self._key(namespace, item_id)
+        self._add_key(key)
+        self._unsaved.append(key)
+
+    def _add_key(self, key: str):
+        self._maybe_rotate()
+        self.generations[-1].add(key)
+        self.recent[key] = None
+        self.recent.move_to_end(key)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def add_many(self, namespace: str, item_ids: Iterable[Any]):
+        for item_id in item_ids:
+            self.add(namespace, item_id)
+
+    def unseen(
+        self, namespace: str, records: Iterable[Dict[str, Any]], new_ids: List[Any]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream only the records whose ids were not stored before.
+
+        The ids of yielded records are appended to ``new_ids`` but not added to the index, so callers can
+        commit them with ``add_many`` once the write actually succeeded.
+        """
+        for record in records:
+            if self.contains(namespace, record["id"]):
+                continue
+            new_ids.append(record["id"])
+            yield record
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.bloom_hits
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "bloom_hits": self.bloom_hits,
+            "hit_rate": hits / self.lookups if self.lookups else 0.0,
+            "recent_ids": len(self.recent),
+            "generation_ids": [len(generation) for generation in self.generations],
+        }
+
+    def save(self):
+        """
+        Durably persist the ids added since the last save, if a path was given.
+        """
+        if not self.path:
+            return
+        if self._snapshot_due or self._logged + len(self._unsaved) >= self.snapshot_every:
+            self._save_snapshot()
+        elif self._unsaved:
+            with open(self.log_path, "ab") as f:
+                f.write("".join(json.dumps(key) + "\n" for key in self._unsaved).encode())
+                f.flush()
+                os.fsync(f.fileno())
+            self._logged += len(self._unsaved)
+        self._unsaved.clear()
+
+    def _save_snapshot(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {
+                    "recent": self.recent,
+                    "generations": list(self.generations),
+                    "lookups": self.lookups,
+                    "exact_hits": self.exact_hits,
+                    "bloom_hits": self.bloom_hits,
+                },
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.path)
+        # Ids logged before the snapshot are in it; a crash before the log is removed only replays them again
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self._logged = 0
+        self._snapshot_due = False
+
+    def _replay_log(self):
+        if not os.path.exists(self.log_path):
+            return
+        offset = 0
+        with open(self.log_path, "rb+") as f:
+            for line in f:
+                try:
+                    key = json.loads(line)
+                except ValueError:
+                    key = None
+                if key is None or not line.endswith(b"\n"):
+                    # Torn write from a crash; cut it off so later saves append after the last good id
+                    logger.error(f"Truncated entry in dedup index log {self.log_path}")
+                    f.truncate(offset)
+                    break
+                offset += len(line)
+                self._add_key(key)
+                self._logged += 1
+        # Replayed ids that rotated a generation are only safe once they are in a snapshot
+        if self._snapshot_due:
+            self._save_snapshot()
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "DedupIndex":
+        """
+        Load an index from its snapshot and log on disk, or create an empty one if they are missing or
+        unreadable.
+        """
+        index = cls(path, **kwargs)
+        if os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    state = pickle.load(f)
+                index.recent = state["recent"]
+                index.generations = deque(state["generations"], maxlen=2)
+                index.lookups = state["lookups"]
+                index.exact_hits = state["exact_hits"]
+                index.bloom_hits = state["bloom_hits"]
+            except Exception as e:
+                logger.error(f"Could not load dedup index snapshot from {path}, starting empty: {e}")
+        index._replay_log()
+        return index
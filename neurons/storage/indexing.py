@@ -0,0 +1,224 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import gzip
+import random
+import aiohttp
+import orjson as json
+from logging import getLogger
+from typing import Any, Dict, List, Optional, Tuple
+from neurons.structures.token_bucket import AsyncTokenBucket
+
+logger = getLogger(__name__)
+
+
+class IndexingRejected(Exception):
+    """
+    The indexing API refused a row with a 4xx response other than 429. Sending it again cannot succeed.
+    """
+
+    def __init__(self, status: int, body: Any):
+        super().__init__(f"Indexing API rejected the row with HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+
+class IndexingClient:
+    """
+    Client for the indexing API that coalesces rows into batched requests.
+
+    Rows submitted together are sent in one request, up to ``max_batch_rows`` per request, as a gzip
+    compressed ``{"api_key", "rows"}`` body to ``batch_url``. A lone row is sent right away; once more rows
+    are queued the batch waits up to ``linger_secs`` to fill. Without a batch url every row is posted on its
+    own to ``url``, as the single-row API expects. Requests share one session, are rate limited per process
+    and retried with jittered exponential backoff on connection errors, timeouts, 5xx and 429. Each submitted
+    row gets a future that resolves to its indexing result or to the final error, which is IndexingRejected
+    for rows the API refuses; the rows of a refused batch are sent again one by one to find the bad ones.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        api_key: str,
+        batch_url: Optional[str] = None,
+        max_batch_rows: int = 50,
+        linger_secs: float = 0.2,
+        max_retries: int = 4,
+        backoff_base_secs: float = 0.5,
+        backoff_max_secs: float = 10.0,
+        rate_per_sec: float = 5.0,
+        timeout_secs: float = 30.0,
+        gzip_body: bool = True,
+    ):
+        self.url = url
+        self.api_key = api_key
+        self.batch_url = batch_url
+        self.max_batch_rows = max_batch_rows
+        self.linger_secs = linger_secs
+        self.max_retries = max_retries
+        self.backoff_base_secs = backoff_base_secs
+        self.backoff_max_secs = backoff_max_secs
+        self.timeout_secs = timeout_secs
+        self.gzip_body = gzip_body
+        if not batch_url:
+            logger.warning(f"No batch url for the indexing API, posting every row on its own to {url}")
+        self.rate_limiter = AsyncTokenBucket(rate_per_sec)
+        self.requests_sent = 0
+        self._loop = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Started lazily on the loop of the first caller; after close() a new loop starts it afresh
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._session = None
+            self._worker = loop.create_task(self._run())
+
+    def submit(self, row: Dict[str, Any]) -> asyncio.Future:
+        """
+        Queue a row for indexing.
+
+        Returns:
+            asyncio.Future: Resolves to the indexing API result for this row.
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((row, future))
+        return future
+
+    async def index(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.submit(row)
+
+    async def index_many(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Index several rows at once; failed rows come back as exceptions in the result list.
+        """
+        return await asyncio.gather(*(self.submit(row) for row in rows), return_exceptions=True)
+
+    async def flush(self):
+        """
+        Wait until every submitted row has been delivered or has failed.
+        """
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+        if self._session is not None:
+            await self._session.close()
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._session = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            # Let rows submitted in the same tick join; a lone row does not wait out the linger
+            await asyncio.sleep(0)
+            deadline = loop.time() + self.linger_secs if not self._queue.empty() else loop.time()
+            while len(batch) < self.max_batch_rows:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                if self.batch_url:
+                    await self._deliver(batch)
+                else:
+                    await asyncio.gather(*(self._deliver([entry]) for entry in batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        rows = [row for row, _ in batch]
+        try:
+            result = await self._post_with_retries(rows)
+        except IndexingRejected as e:
+            if len(batch) > 1:
+                logger.warning(f"{e}, sending its {len(batch)} rows one by one")
+                await asyncio.gather(*(self._deliver([entry]) for entry in batch))
+                return
+            _, future = batch[0]
+            if not future.done():
+                future.set_exception(e)
+            return
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = result.get("results") if isinstance(result, dict) else None
+        if not isinstance(results, list) or len(results) != len(rows):
+            results = [result] * len(rows)
+        for (_, future), row_result in zip(batch, results):
+            if not future.done():
+                future.set_result(row_result)
+
+    async def _post_with_retries(self, rows: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            try:
+                return await self._post(rows)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.backoff_max_secs, self.backoff_base_secs * 2 ** attempt))
+                logger.warning(f"Indexing API request failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def _post(self, rows: List[Dict[str, Any]]):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout_secs)
+            )
+        headers = {"Content-Type": "application/json"}
+        if self.batch_url:
+            url = self.batch_url
+            body = json.dumps({"api_key": self.api_key, "rows": rows})
+            if self.gzip_body:
+                body = gzip.compress(body)
+                headers["Content-Encoding"] = "gzip"
+        else:
+            url = self.url
+            body = json.dumps({**rows[0], "api_key": self.api_key})
+
+        self.requests_sent += 1
+        async with self._session.post(url, data=body, headers=headers) as response:
+            if 400 <= response.status < 500 and response.status != 429:
+                try:
+                    error = await response.json(content_type=None)
+                except ValueError:
+                    error = await response.text()
+                raise IndexingRejected(response.status, error)
+            response.raise_for_status()
+            return await response.json(content_type=None)
@@ -0,0 +1,160 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from aiohttp import web
+from logging import getLogger
+from typing import Any, Dict, List
+
+logger = getLogger(__name__)
+
+
+class IndexingStubServer:
+    """
+    Local stand-in for the indexing API, for tests and benchmarks.
+
+    Accepts single rows on ``/index`` and gzip or plain batches on ``/index/batch``, optionally adding
+    latency and failing the first ``fail_first`` requests and a fraction of the rest with HTTP 503.
+    Requests with a row whose file name is in ``reject_file_names`` are refused with HTTP 400.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_secs: float = 0.0,
+        failure_rate: float = 0.0,
+        fail_first: int = 0,
+        reject_file_names: set = (),
+    ):
+        self.host = host
+        self.port = port
+        self.latency_secs = latency_secs
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.reject_file_names = set(reject_file_names)
+        self.rows: List[Dict[str, Any]] = []
+        self.requests = 0
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/index"
+
+    @property
+    def batch_url(self) -> str:
+        return f"{self.url}/batch"
+
+    async def _respond(self, rows: List[Dict[str, Any]]):
+        self.requests += 1
+        if self.latency_secs:
+            await asyncio.sleep(self.latency_secs)
+        if self.requests <= self.fail_first or random.random() < self.failure_rate:
+            raise web.HTTPServiceUnavailable()
+        rejected = [row.get("file_name") for row in rows if row.get("file_name") in self.reject_file_names]
+        if rejected:
+            raise web.HTTPBadRequest(
+                text=json.dumps({"error": f"invalid rows {rejected}"}), content_type="application/json"
+            )
+        self.rows.extend(rows)
+        return [{"file_name": row.get("file_name"), "status": "indexed"} for row in rows]
+
+    async def _handle_single(self, request: web.Request) -> web.Response:
+        row = await request.json()
+        row.pop("api_key", None)
+        results = await self._respond([row])
+        return web.json_response(results[0])
+
+    async def _handle_batch(self, request: web.Request) -> web.Response:
+        # aiohttp transparently decompresses gzip request bodies
+        payload = await request.json()
+        results = await self._respond(payload["rows"])
+        return web.json_response({"results": results})
+
+    async def start(self) -> "IndexingStubServer":
+        app = web.Application()
+        app.router.add_post("/index", self._handle_single)
+        app.router.add_post("/index/batch", self._handle_batch)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+async def benchmark(rows: int = 500, latency_secs: float = 0.02) -> Dict[str, Dict[str, Any]]:
+    """
+    Compare one request per row with coalesced batches against the stand-in server.
+
+    Returns:
+        dict: Per mode, the elapsed seconds, requests sent and rows that failed.
+    """
+    from neurons.storage.indexing import IndexingClient
+
+    server = await IndexingStubServer(latency_secs=latency_secs).start()
+    stats = {}
+    try:
+        sample = [
+            {"file_name": f"twitter_{i}.csv", "source_type": "twitter", "row_count": 15, "search_keys": ["bittensor"]}
+            for i in range(rows)
+        ]
+        for name, client in (
+            ("single", IndexingClient(server.url, "stub", rate_per_sec=0)),
+            ("batched", IndexingClient(server.url, "stub", batch_url=server.batch_url, rate_per_sec=0)),
+        ):
+            started = time.perf_counter()
+            results = await client.index_many(sample)
+            await client.close()
+            stats[name] = {
+                "elapsed_secs": time.perf_counter() - started,
+                "requests": client.requests_sent,
+                "failed": sum(isinstance(r, Exception) for r in results),
+            }
+    finally:
+        await server.stop()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the indexing client against a local indexing API stand-in")
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every response")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    for name, stats in asyncio.run(benchmark(args.rows, args.latency)).items():
+        logger.info(
+            f"{name}: {args.rows} rows in {stats['elapsed_secs']:.3f}s with {stats['requests']} requests, "
+            f"{stats['failed']} failed"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import gzip
+import os
+import time
+import orjson as json
+from logging import getLogger
+from typing import Any, Callable, Dict, List
+
+logger = getLogger(__name__)
+
+CURRENT_SEGMENT = "current.jsonl.gz"
+CURRENT_META = "current.json"
+INDEX_FILE = "index.json"
+ROLLED_DIR = "rolled"
+
+
+def segments_for_blocks(index: List[Dict[str, Any]], start_block: int, end_block: int) -> List[str]:
+    """
+    Select the segment keys from a metrics log index that may hold rounds within [start_block, end_block].
+
+    Args:
+        index: The parsed ``index.json`` of a metrics log.
+        start_block: First block of the range, inclusive.
+        end_block: Last block of the range, inclusive.
+
+    Returns:
+        list: The matching segment keys, in block order.
+    """
+    return [
+        segment["key"]
+        for segment in sorted(index, key=lambda s: s["min_block"])
+        if segment["min_block"] <= end_block and segment["max_block"] >= start_block
+    ]
+
+
+class MetricsLog:
+    """
+    Local append-only log of scoring metrics rounds that is uploaded in rolled segments.
+
+    Rounds are appended as gzip compressed JSON lines to the current segment. Once the segment exceeds
+    ``segment_max_bytes`` or ``segment_max_age_secs`` it is rolled, uploaded as
+    ``{prefix}/segments/{min_block:09}_{max_block:09}.jsonl.gz`` and recorded with its block range in
+    ``{prefix}/index.json``, so a block range can be fetched without listing keys. Rolled segments that
+    fail to upload stay on disk and are retried on the next append.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str,
+        upload: Callable[[str, bytes], Any],
+        segment_max_bytes: int = 4 * 1024 * 1024,
+        segment_max_age_secs: int = 3600,
+    ):
+        self.directory = directory
+        self.prefix = prefix
+        self.upload = upload
+        self.segment_max_bytes = segment_max_bytes
+        self.segment_max_age_secs = segment_max_age_secs
+        os.makedirs(os.path.join(directory, ROLLED_DIR), exist_ok=True)
+        self.meta = self._read_json(CURRENT_META, None)
+        self.index: List[Dict[str, Any]] = self._read_json(INDEX_FILE, [])
+
+    def _path(self, *names: str) -> str:
+        return os.path.join(self.directory, *names)
+
+    def _read_json(self, name: str, default):
+        try:
+            with open(self._path(name), "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name: str, value):
+        path = self._path(name)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(json.dumps(value))
+        os.replace(f"{path}.tmp", path)
+
+    def append(self, metrics: Dict[str, Any]):
+        """
+        Append one round of metrics, rolling and uploading the segment when a threshold is reached.
+        """
+        block = metrics["block"]
+        with gzip.open(self._path(CURRENT_SEGMENT), "ab") as f:
+            f.write(json.dumps(metrics) + b"\n")
+
+        if self.meta is None:
+            self.meta = {"min_block": block, "max_block": block, "rounds": 0, "created_at": time.time()}
+        self.meta["min_block"] = min(self.meta["min_block"], block)
+        self.meta["max_block"] = max(self.meta["max_block"], block)
+        self.meta["rounds"] += 1
+        self._write_json(CURRENT_META, self.meta)
+
+        if (
+            os.path.getsize(self._path(CURRENT_SEGMENT)) >= self.segment_max_bytes
+            or time.time() - self.meta["created_at"] >= self.segment_max_age_secs
+        ):
+            self.roll()
+        self.flush()
+
+    def roll(self):
+        """
+        Close the current segment and queue it for upload.
+        """
+        if self.meta is None:
+            return
+        name = f"{self.meta['min_block']:09}_{self.meta['max_block']:09}.jsonl.gz"
+        os.replace(self._path(CURRENT_SEGMENT), self._path(ROLLED_DIR, name))
+        self._write_json(f"{ROLLED_DIR}/{name}.json", self.meta)
+        os.remove(self._path(CURRENT_META))
+        self.meta = None
+        logger.info(f"Rolled scoring metrics segment {self.prefix}/{name}")
+
+    def flush(self):
+        """
+        Upload rolled segments and the updated index, keeping whatever fails for the next attempt.
+        """
+        rolled = sorted(
+            name for name in os.listdir(self._path(ROLLED_DIR)) if name.endswith(".jsonl.gz")
+        )
+        if not rolled:
+            return
+        uploaded = 0
+        for name in rolled:
+            key = f"{self.prefix}/segments/{name}"
+            try:
+                with open(self._path(ROLLED_DIR, name), "rb") as f:
+                    body = f.read()
+                self.upload(key, body)
+            except Exception as e:
+                logger.error(f"Could not upload scoring metrics segment {key}, will retry: {e}")
+                break
+            meta = self._read_json(f"{ROLLED_DIR}/{name}.json", {})
+            self.index.append(
+                {
+                    "key": key,
+                    "min_block": meta.get("min_block"),
+                    "max_block": meta.get("max_block"),
+                    "rounds": meta.get("rounds"),
+                    "bytes": len(body),
+                }
+            )
+            self._write_json(INDEX_FILE, self.index)
+            os.remove(self._path(ROLLED_DIR, name))
+            os.remove(self._path(ROLLED_DIR, f"{name}.json"))
+            uploaded += 1
+
+        if uploaded:
+            try:
+                self.upload(f"{self.prefix}/{INDEX_FILE}", json.dumps(self.index))
+                logger.info(f"Stored {uploaded} scoring metrics segments to {self.prefix}")
+            except Exception as e:
+                # The local index is the source of truth, it is re-uploaded with the next segment
+                logger.error(f"Could not upload scoring metrics index for {self.prefix}: {e}")
@@ -0,0 +1,89 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import csv
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, TextIO
+
+
+def _is_missing(value: Any) -> bool:
+    """
+    Mirrors the notion of a missing value used by ``DataFrame.dropna``: ``None`` and float NaN.
+    """
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def iter_records(
+    data: Iterable[Optional[List[Dict[str, Any]]]],
+    required_fields: List[str],
+    fieldnames: List[str],
+    seen: Optional[Set[Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the items of every miner response, keeping only valid and unique records.
+
+    Items missing any of the required fields are skipped, the first occurrence of each id wins,
+    and every yielded record is projected to exactly the given fieldnames (absent fields become None).
+
+    Args:
+        data: A list of responses, where each response is a list of item dictionaries (or None).
+        required_fields: Fields that must be present and not None for an item to be kept.
+        fieldnames: The fields to keep, in output order.
+        seen: Optional set of ids already emitted; it is updated in place.
+
+    Yields:
+        dict: The projected record.
+    """
+    if seen is None:
+        seen = set()
+
+    for response in data:
+        if not response:
+            continue
+        for item in response:
+            if not isinstance(item, dict):
+                continue
+            if any(_is_missing(item.get(field)) for field in required_fields):
+                continue
+            item_id = item["id"]
+            if item_id in seen:
+                continue
+            seen.add(item_id)
+            yield {field: item.get(field) for field in fieldnames}
+
+
+def write_csv(records: Iterable[Dict[str, Any]], fieldnames: List[str], output: TextIO) -> int:
+    """
+    Write records as CSV to a text stream, one row at a time.
+
+    Args:
+        records: The records to write, typically produced by ``iter_records``.
+        fieldnames: The CSV columns, in order.
+        output: Any writable text stream.
+
+    Returns:
+        int: The number of rows written, excluding the header.
+    """
+    writer = csv.DictWriter(output, fieldnames=fieldnames, lineterminator="\n")
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
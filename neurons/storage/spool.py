@@ -0,0 +1,232 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import os
+import time
+import orjson as json
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+DEAD_LETTER_FILE = "dead_letter.jsonl"
+
+
+class PoisonEntry(Exception):
+    """
+    Raised by a replay handler for an entry that can never be handled, so it is dead-lettered instead of retried.
+    """
+
+
+class Spool:
+    """
+    Durable local spool of pending storage batches.
+
+    Entries are appended as JSON lines to append-only segment files. A manifest records, per segment,
+    how many bytes have already been replayed, so draining resumes where it stopped after a restart.
+    When the spool grows beyond its disk quota the oldest segments are evicted first. Segments that are being
+    replayed are sealed, so entries spooled again while draining land in a fresh segment and are not replayed
+    twice in the same pass. Entries that can never be handled are moved to a dead-letter segment, which rolls
+    over to a single previous file once it reaches ``segment_max_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_bytes: int = 16 * 1024 * 1024,
+        quota_bytes: int = 1024 * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.quota_bytes = quota_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.segments: List[Dict[str, Any]] = self._load_manifest()
+        self._sealed = set()
+        self.dead_lettered = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_manifest(self) -> List[Dict[str, Any]]:
+        path = self._path(MANIFEST_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            segments = json.loads(f.read())["segments"]
+        # Trust the files on disk for sizes, a crash may have happened between append and manifest write
+        return [
+            {**segment, "bytes": os.path.getsize(self._path(segment["name"]))}
+            for segment in segments
+            if os.path.exists(self._path(segment["name"]))
+        ]
+
+    def _save_manifest(self):
+        path = self._path(MANIFEST_FILE)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(json.dumps({"segments": self.segments}))
+        os.replace(f"{path}.tmp", path)
+
+    def _remove_segment(self, segment: Dict[str, Any]):
+        if segment not in self.segments:
+            # Already evicted, e.g. over quota while it was being replayed
+            return
+        self.segments.remove(segment)
+        try:
+            os.remove(self._path(segment["name"]))
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        return sum(segment["entries"] - segment["acked_entries"] for segment in self.segments)
+
+    def total_bytes(self) -> int:
+        return sum(segment["bytes"] for segment in self.segments)
+
+    def append(self, entry: Dict[str, Any]):
+        """
+        Durably append an entry to the newest segment, rolling over to a new segment when it is full, sealed
+        for replay, or when the entry would take the spool over its quota, so the older segments can be evicted.
+        """
+        line = json.dumps({**entry, "spooled_at": time.time()}) + b"\n"
+
+        if (
+            not self.segments
+            or self.segments[-1]["bytes"] >= self.segment_max_bytes
+            or self.segments[-1]["name"] in self._sealed
+            or self.total_bytes() + len(line) > self.quota_bytes
+        ):
+            self.segments.append(
+                {
+                    "name": f"segment_{time.time_ns()}.jsonl",
+                    "bytes": 0,
+                    "entries": 0,
+                    "acked_bytes": 0,
+                    "acked_entries": 0,
+                }
+            )
+        segment = self.segments[-1]
+        with open(self._path(segment["name"]), "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        segment["bytes"] += len(line)
+        segment["entries"] += 1
+
+        self._enforce_quota()
+        self._save_manifest()
+        logger.info(f"Spooled {entry.get('kind')} entry, {len(self)} pending")
+
+    def _enforce_quota(self):
+        while len(self.segments) > 1 and self.total_bytes() > self.quota_bytes:
+            oldest = self.segments[0]
+            logger.error(
+                f"Spool over quota, evicting {oldest['name']} with "
+                f"{oldest['entries'] - oldest['acked_entries']} pending entries"
+            )
+            self._remove_segment(oldest)
+
+    @staticmethod
+    def _decode(line: bytes) -> Dict[str, Any]:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise PoisonEntry(f"Undecodable entry: {e}") from e
+        if not isinstance(entry, dict):
+            raise PoisonEntry(f"Entry is not an object: {entry!r}")
+        return entry
+
+    def _dead_letter(self, segment: Dict[str, Any], line: bytes, error: Exception):
+        logger.error(f"Dead-lettering entry of spool segment {segment['name']}: {error}")
+        path = self._path(DEAD_LETTER_FILE)
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_max_bytes:
+            os.replace(path, f"{path}.1")
+        record = {
+            "segment": segment["name"],
+            "line": line.decode(errors="replace").rstrip("\n"),
+            "error": str(error),
+            "dead_lettered_at": time.time(),
+        }
+        with open(path, "ab") as f:
+            f.write(json.dumps(record) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.dead_lettered += 1
+
+    async def replay(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        rate_per_sec: float = 2.0,
+        max_entries: Optional[int] = None,
+    ) -> int:
+        """
+        Drain pending entries oldest-first through the handler, at most ``rate_per_sec`` entries per second.
+
+        Draining stops at the first entry whose handler raises; it will be retried on the next replay. Lines
+        that are not valid JSON and entries whose handler raises PoisonEntry are dead-lettered and skipped.
+        Entries the handler spools again are appended to a new segment and left for the next replay.
+
+        Returns:
+            int: The number of entries successfully handled.
+        """
+        interval = 1 / rate_per_sec if rate_per_sec else 0
+        handled = 0
+        segments = list(self.segments)
+        self._sealed.update(segment["name"] for segment in segments)
+        try:
+            for segment in segments:
+                if segment not in self.segments:
+                    continue
+                with open(self._path(segment["name"]), "rb") as f:
+                    f.seek(segment["acked_bytes"])
+                    for line in f:
+                        if max_entries is not None and handled >= max_entries:
+                            return handled
+                        if not line.endswith(b"\n"):
+                            # Torn write from a crash, nothing after it can be trusted
+                            logger.error(f"Truncated entry in spool segment {segment['name']}")
+                            break
+                        started = time.monotonic()
+                        try:
+                            await handler(self._decode(line))
+                            handled += 1
+                        except PoisonEntry as e:
+                            self._dead_letter(segment, line, e)
+                        except Exception as e:
+                            logger.warning(f"Spool replay stopped, will retry later: {e}")
+                            return handled
+                        if segment not in self.segments:
+                            # Evicted over quota by an entry the handler spooled again
+                            break
+                        segment["acked_bytes"] += len(line)
+                        segment["acked_entries"] += 1
+                        self._save_manifest()
+                        await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+                if segment not in self.segments:
+                    continue
+                if segment["acked_entries"] < segment["entries"]:
+                    return handled
+                self._remove_segment(segment)
+            return handled
+        finally:
+            self._sealed.clear()
+            self._save_manifest()
+            if handled:
+                logger.info(f"Replayed {handled} spooled entries, {len(self)} pending")
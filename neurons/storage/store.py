@@ -1,17 +1,23 @@
+import asyncio
 import random
 import string
+import threading
 from aiohttp import ClientError
 import os
 import bittensor as bt
 import orjson as json
-import pandas as pd
 from io import StringIO
 import boto3
+from botocore.exceptions import BotoCoreError, ClientError as S3ClientError
 from typing import List, Dict, Any
-import aiohttp
 from environs import Env
 from logging import getLogger
 from hashlib import md5
+from .records import iter_records, write_csv
+from .dedup import DedupIndex
+from .spool import PoisonEntry, Spool
+from .metrics_log import MetricsLog
+from .indexing import IndexingClient, IndexingRejected
 
 logger = getLogger(__name__)
 
@@ -26,66 +32,208 @@ s3 = boto3.resource(
     aws_secret_access_key=env.str("WASABI_ACCESS_KEY"),
 )
 
+# Ids already stored in previous rounds, so popular items are not uploaded again and again
+dedup_index = DedupIndex.load(env.str("DEDUP_INDEX_PATH", "dedup_index.pkl"))
+
+# Used from the storage loop only, so its session, queue and batches live as long as the validator
+indexing_client = IndexingClient(
+    env.str("INDEXING_API_URL"),
+    indexing_api_key,
+    batch_url=env.str("INDEXING_API_BATCH_URL", None),
+    max_batch_rows=env.int("INDEXING_MAX_BATCH_ROWS", 50),
+    rate_per_sec=env.float("INDEXING_RATE_PER_SEC", 5.0),
+    max_retries=env.int("INDEXING_MAX_RETRIES", 4),
+)
+
+# Batches that could not be uploaded or indexed yet, replayed once Wasabi and the indexing API are reachable
+spool = Spool(
+    env.str("SPOOL_DIR", "spool"),
+    segment_max_bytes=env.int("SPOOL_SEGMENT_MAX_BYTES", 16 * 1024 * 1024),
+    quota_bytes=env.int("SPOOL_QUOTA_BYTES", 1024 * 1024 * 1024),
+)
+
 
 def scoring_bucket():
     return s3.Bucket("scoring")
 
 
+metrics_logs = {}
+
+
+def _upload_scoring_object(key, body):
+    scoring_bucket().put_object(Key=key, Body=body)
+
+
+def get_metrics_log(type: str) -> MetricsLog:
+    if type not in metrics_logs:
+        metrics_logs[type] = MetricsLog(
+            os.path.join(env.str("SCORING_LOG_DIR", "scoring_log"), type),
+            type,
+            _upload_scoring_object,
+            segment_max_bytes=env.int("SCORING_SEGMENT_MAX_BYTES", 4 * 1024 * 1024),
+            segment_max_age_secs=env.int("SCORING_SEGMENT_MAX_AGE_SECS", 3600),
+        )
+    return metrics_logs[type]
+
+
 async def store_scoring_metrics(metrics: dict, type: str):
-    block = metrics["block"]
-    filename = f"{block:09}_{md5(str(metrics).encode()).hexdigest()}.json"
-    data = json.dumps(metrics)
-    key = f"{type}/{filename}"
-    s3.Bucket("scoring").put_object(Key=key, Body=data)
-    logger.info(f"Stored scoring metrics to {key}")
+    """
+    Append a round of scoring metrics to the local log, which uploads it in rolled segments
+    under {type}/segments/ with a block range index at {type}/index.json.
+    """
+    get_metrics_log(type).append(metrics)
+    logger.info(f"Logged scoring metrics for block {metrics['block']} to {type}")
 
 
 async def save_indexing_row(file_name, source_type, row_count, search_keys: list):
+    try:
+        return await indexing_client.index(
+            {
+                "file_name": file_name,
+                "source_type": source_type,
+                "row_count": row_count,
+                "search_keys": search_keys,
+            }
+        )
+    except IndexingRejected as e:
+        # Sending the row again cannot succeed, so it is dropped rather than spooled
+        logger.error(f"Dropping index row for {file_name}: {e}")
+        return e.body
+    except (ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Could not reach indexing API, spooling index row for {file_name}: {e}")
+        spool.append(
+            {
+                "kind": "index",
+                "file_name": file_name,
+                "source_type": source_type,
+                "row_count": row_count,
+                "search_keys": search_keys,
+            }
+        )
+        return {"msg": "spooled"}
+
+
+def _put_object(source_type, filename, body):
+    sss = boto3.resource('s3')
+    result = sss.meta.client.put_object(
+        Bucket=f'{source_type}scrapingbucket', Key=f"{source_type}/{filename}", Body=body
+    )
+    status_code = result.get('ResponseMetadata').get('HTTPStatusCode')
+    if status_code > 210:
+        raise RuntimeError(f"Error committing {source_type} file to S3. HTTP status code: {status_code}")
+
 
-    async with aiohttp.ClientSession() as session:
+async def _replay_entry(entry):
+    try:
+        row = {key: entry[key] for key in ("file_name", "source_type", "row_count", "search_keys")}
+        body = entry["body"] if entry["kind"] == "object" else None
+    except KeyError as e:
+        raise PoisonEntry(f"Spooled {entry.get('kind')} entry without {e}") from e
+
+    if entry["kind"] == "object":
         try:
-            async with session.post(
-                    env.str("INDEXING_API_URL"),
-                    headers={"Content-Type": "application/json"},
-                    json={
-                        "file_name": file_name,
-                        "source_type": source_type,
-                        "row_count": row_count,
-                        "search_keys": search_keys,
-                        "api_key": indexing_api_key,
-                    }
-            ) as response:
-                return await response.json()
-        except aiohttp.client_exceptions.ClientConnectorError:
-            logger.error(f"Could not connect to indexing API")
-            return {}
-
-
-async def write_file_and_index(df_final, filename, search_keys, source_type):
-    total_count = df_final.shape[0]
-    if total_count == 0:
-        return {"msg": "data length is 0"}
+            _put_object(row["source_type"], row["file_name"], body)
+        except S3ClientError as e:
+            status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode", 500)
+            # Refused uploads, e.g. to a bucket that does not exist, cannot succeed later. Access errors
+            # may be fixed with new credentials and are retried like outages
+            if 400 <= status < 500 and status not in (403, 429):
+                raise PoisonEntry(f"Upload of {row['file_name']} refused: {e}") from e
+            raise
+        # The object is safe now; if indexing fails again the row is spooled on its own
+        await save_indexing_row(**row)
+    else:
+        try:
+            await indexing_client.index(row)
+        except IndexingRejected as e:
+            raise PoisonEntry(str(e)) from e
+
 
+async def drain_spool(max_entries=None):
+    """
+    Replay spooled uploads and index rows, rate limited, stopping at the first failure that may pass on a
+    later drain. Entries that can never succeed are dead-lettered.
+    """
+    if len(spool) == 0:
+        return 0
+    return await spool.replay(
+        _replay_entry,
+        rate_per_sec=env.float("SPOOL_REPLAY_RATE", 2.0),
+        max_entries=max_entries,
+    )
+
+
+async def _drain_spool_forever():
+    interval = env.float("SPOOL_DRAIN_INTERVAL_SECS", 60.0)
+    while True:
+        try:
+            await drain_spool()
+        except Exception as e:
+            logger.error(f"Spool drain failed: {e}")
+        await asyncio.sleep(interval)
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    The storage event loop. It runs on a daemon thread for the life of the process and drains the spool
+    in the background, so storage calls never wait for replays.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="storage", daemon=True).start()
+            asyncio.run_coroutine_threadsafe(_drain_spool_forever(), _loop)
+        return _loop
+
+
+def run(coro, timeout: float = None):
+    """
+    Run a storage coroutine on the storage loop and block until it finishes.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+async def write_file_and_index(records, fieldnames, filename, search_keys, source_type):
+    new_ids = []
     csv_buffer = StringIO()
-    df_final.to_csv(csv_buffer, index=False)
+    total_count = write_csv(
+        dedup_index.unseen(source_type, records, new_ids), fieldnames, csv_buffer
+    )
+    logger.info(f"Dedup index stats: {dedup_index.stats()}")
+    if total_count == 0:
+        return {"msg": "data length is 0"}
 
-    sss = boto3.resource('s3')
     try:
         logger.info(
             f"Storing {total_count} results as {source_type}scrapingbucket/{source_type}/{filename}"
         )
-        result = sss.Bucket(f'{source_type}scrapingbucket').put_object(
-            Key=f"{source_type}/{filename}", Body=csv_buffer.getvalue()
+        _put_object(source_type, filename, csv_buffer.getvalue())
+    except (S3ClientError, BotoCoreError, RuntimeError) as e:
+        bt.logging.error(f"{e}, spooling {filename}")
+        spool.append(
+            {
+                "kind": "object",
+                "file_name": filename,
+                "source_type": source_type,
+                "row_count": total_count,
+                "search_keys": search_keys,
+                "body": csv_buffer.getvalue(),
+            }
         )
-    except ClientError as e:
-        bt.logging.error(str(e))
-        return {}
-    else:
-        if result.get('ResponseMetadata').get('HTTPStatusCode') > 210:
-            bt.logging.error(f"Error committing {source_type} file to S3. HTTP status c0de: {result.get('ResponseMetadata').get('HTTPStatusCode')}")
-            return {}
+        # The batch is durable in the spool, so its ids count as stored
+        dedup_index.add_many(source_type, new_ids)
+        dedup_index.save()
+        return {"msg": "spooled"}
 
-    return save_indexing_row(
+    dedup_index.add_many(source_type, new_ids)
+    dedup_index.save()
+
+    return await save_indexing_row(
         filename,
         source_type,
         total_count,
@@ -111,17 +259,10 @@ async def twitter_store(data: List[List[Dict[str, Any]]], search_keys: List[str]
         "id", "url", "text", "likes", "images", "timestamp", "username", "hashtags"
     ]
 
-    # Flatten the list of lists and filter out None or empty responses
-    flattened_data = [item for sublist in data if sublist for item in sublist]
-    df = pd.DataFrame(flattened_data)
-
-    # Filter rows based on required fields and unique IDs
-    df_filtered = df.dropna(subset=required_fields).drop_duplicates(subset=['id'])
+    # Stream items across responses, skipping incomplete and duplicate ones and keeping only the fieldnames
+    records = iter_records(data, required_fields, fieldnames)
 
-    # Keep only the columns that match the specified fieldnames
-    df_final = df_filtered[fieldnames]
-
-    return await write_file_and_index(df_final, filename, search_keys, "twitter")
+    return await write_file_and_index(records, fieldnames, filename, search_keys, "twitter")
 
 
 async def reddit_store(data: List[List[Dict[str, Any]]], search_keys: List[str]) -> Dict[str, Any]:
@@ -143,14 +284,7 @@ async def reddit_store(data: List[List[Dict[str, Any]]], search_keys: List[str])
         "community", "title", "num_comments", "user_id"
     ]
 
-    # Flatten the list of lists and filter out None or empty responses
-    flattened_data = [item for sublist in data if sublist for item in sublist]
-    df = pd.DataFrame(flattened_data)
-
-    # Filter rows based on required fields and unique IDs
-    df_filtered = df.dropna(subset=required_fields).drop_duplicates(subset=['id'])
-
-    # Keep only the columns that match the specified fieldnames
-    df_final = df_filtered[fieldnames]
+    # Stream items across responses, skipping incomplete and duplicate ones and keeping only the fieldnames
+    records = iter_records(data, required_fields, fieldnames)
 
-    return await write_file_and_index(df_final, filename, search_keys, "reddit")
+    return await write_file_and_index(records, fieldnames, filename, search_keys, "reddit")
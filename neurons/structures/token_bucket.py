@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        A token bucket rate limiter for asyncio code.
+
+        Args:
+            rate (float): Tokens added per second. A rate of 0 or less disables limiting.
+            capacity (float, optional): Maximum burst size. Defaults to max(1, rate).
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = None
+        self._lock_loop = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Locks are bound to one event loop, so keep one per loop the bucket is used from
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Wait until the requested tokens are available and take them.
+        Waiters are served in arrival order.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        if self.rate <= 0:
+            return 0.0
+        started = time.monotonic()
+        async with self._get_lock():
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+        return time.monotonic() - started
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take tokens without waiting.
+
+        Returns:
+            True if the tokens were available, False otherwise.
+        """
+        if self.rate <= 0:
+            return True
+        self._refill()
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
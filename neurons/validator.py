@@ -23,6 +23,7 @@ DEALINGS IN THE SOFTWARE.
 # Importing necessary libraries and modules
 import os
 import time
+import asyncio
 import torch
 import csv
 import argparse
@@ -34,7 +35,8 @@ import sys
 import score.reddit_score
 import score.twitter_score
 import storage.store
-from apify_client import ApifyClient
+from neurons.apify.actors import get_runtime
+from neurons.apify.usage import usage_context
 from neurons.queries import get_query, QueryType, QueryProvider
 
 
@@ -107,8 +109,7 @@ def main(config):
 
     # Check access to Apify
     try:
-        client = ApifyClient(os.getenv("APIFY_API_KEY"))
-        client.actors().list()
+        get_runtime().client.actors().list()
     except Exception as e:
         bt.logging.error(f"{e}")
         bt.logging.error(
@@ -240,6 +241,13 @@ def main(config):
             filtered_uids, min(dendrites_per_query, len(filtered_uids))
         )
         bt.logging.info(f"dendrites_to_query:{dendrites_to_query}")
+        # Miners scored low relative to the best miner get more of their items spot checked
+        max_score = torch.max(scores).item() if len(scores) > 0 else 0
+        trust = (
+            [scores[uid].item() / max_score for uid in dendrites_to_query]
+            if max_score > 0
+            else None
+        )
 
         # every 2 minutes, query the miners
         try:
@@ -269,9 +277,11 @@ def main(config):
                 new_scores = []
                 try:
                     if len(responses) > 0 and responses is not None:
-                        scoring_metrics = score.twitter_score.calculateScore(
-                            responses=responses, tag=search_key
-                        )
+                        # Verification runs are accounted to the keyword
+                        with usage_context(keyword=search_key):
+                            scoring_metrics = score.twitter_score.calculateScore(
+                                responses=responses, tag=search_key, trust=trust
+                            )
                         for metric in scoring_metrics:
                             bt.logging.info(f"{metric} = {scoring_metrics[metric]}")
 
@@ -296,7 +306,9 @@ def main(config):
                                 with open(filename, "w") as write:
                                     json.dump(responses[idx], write)
 
-                        storage.store.store_scoring_metrics(scoring_metrics, "twitter")
+                        storage.store.run(
+                            storage.store.store_scoring_metrics(scoring_metrics, "twitter")
+                        )
 
                 except Exception as e:
                     bt.logging.error(f"❌ Error in twitterScore: {e}")
@@ -309,8 +321,10 @@ def main(config):
 
                 try:
                     if len(responses) > 0:
-                        indexing_result = storage.store.twitter_store(
-                            data=responses, search_keys=[search_key]
+                        indexing_result = storage.store.run(
+                            storage.store.twitter_store(
+                                data=responses, search_keys=[search_key]
+                            )
                         )
                         bt.logging.info(
                             f"\033[92m saving index info: {indexing_result} \033[0m"
@@ -370,9 +384,11 @@ def main(config):
                 new_scores = []
                 try:
                     if len(responses) > 0 and responses is not None:
-                        scoring_metrics = score.reddit_score.calculateScore(
-                            responses=responses, tag=search_key
-                        )
+                        # Verification runs are accounted to the keyword
+                        with usage_context(keyword=search_key):
+                            scoring_metrics = score.reddit_score.calculateScore(
+                                responses=responses, tag=search_key, trust=trust
+                            )
                         for metric in scoring_metrics:
                             bt.logging.info(f"{metric} = {scoring_metrics[metric]}")
 
@@ -397,7 +413,9 @@ def main(config):
                                 with open(filename, "w") as write:
                                     json.dump(responses[idx], write)
 
-                        storage.store.store_scoring_metrics(scoring_metrics, "reddit")
+                        storage.store.run(
+                            storage.store.store_scoring_metrics(scoring_metrics, "reddit")
+                        )
 
                 except Exception as e:
                     bt.logging.error(f"❌ Error in redditScore: {e}")
@@ -411,8 +429,10 @@ def main(config):
                 bt.logging.info(f"\033[92m ✓ Updated Scores: {scores} \033[0m")
                 try:
                     if len(responses) > 0:
-                        indexing_result = storage.store.reddit_store(
-                            data=responses, search_keys=[search_key]
+                        indexing_result = storage.store.run(
+                            storage.store.reddit_store(
+                                data=responses, search_keys=[search_key]
+                            )
                         )
                         bt.logging.info(
                             f"\033[92m saving index info: {indexing_result} \033[0m"
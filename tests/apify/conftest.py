@@ -0,0 +1,45 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import pytest
+from neurons.apify.actors import ActorConfig
+from neurons.services.apify_standin import ApifyStandIn
+
+
+@pytest.fixture
+def stand_in_options():
+    return {"items_per_run": 20, "run_secs": 1.0, "seed": 1}
+
+
+@pytest.fixture
+def stand_in(runtime, stand_in_options):
+    """
+    An Apify stand-in served from the loop of the test's actor runtime, which the runtime's clients use.
+    """
+    stand_in = ApifyStandIn(**stand_in_options)
+    runtime.api_url = runtime.run_coroutine(stand_in.start())
+    try:
+        yield stand_in
+    finally:
+        runtime.run_coroutine(stand_in.stop())
+
+
+@pytest.fixture
+def actor_config():
+    return ActorConfig("stand-in~actor")
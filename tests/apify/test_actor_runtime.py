@@ -0,0 +1,41 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import logging
+from types import SimpleNamespace
+from neurons.apify.actors import ActorRuntime
+
+
+def test_clients_are_rebuilt_with_the_pool_limits():
+    runtime = ActorRuntime("key", max_connections=3)
+    try:
+        transport = runtime.client.http_client.httpx_client._transport
+        assert transport._pool._max_connections == 3
+        assert runtime.async_client.http_client.httpx_async_client._transport._pool._max_connections == 3
+    finally:
+        runtime.shutdown()
+
+
+def test_unknown_http_client_layout_keeps_the_default_pool(caplog):
+    runtime = ActorRuntime("key")
+    http_client = SimpleNamespace(httpx_client_v2=object())
+    with caplog.at_level(logging.WARNING):
+        runtime._pooled_http_client(http_client, use_async=False)
+    assert "keeping its default connection pool" in caplog.text
+    assert vars(http_client) == {"httpx_client_v2": http_client.httpx_client_v2}
@@ -0,0 +1,51 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+from neurons.apify.actors import run_actor, run_actor_async, stream_actor, stream_actor_async
+
+
+def test_run_actor_downloads_the_whole_dataset(stand_in, actor_config):
+    items = run_actor(actor_config, {"queries": ["bittensor"]})
+    assert len(items) == 20
+    assert [run["status"] for run in stand_in.runs.values()] == ["SUCCEEDED"]
+
+
+def test_sync_and_async_runs_share_one_implementation(stand_in, actor_config):
+    sync_items = run_actor(actor_config, {"queries": ["sync"]})
+    async_items = asyncio.run(run_actor_async(actor_config, {"queries": ["async"]}))
+    assert len(sync_items) == len(async_items) == 20
+
+
+def test_stream_actor_aborts_once_the_limit_is_reached(stand_in, actor_config):
+    items = stream_actor(
+        actor_config, {"queries": ["bittensor"]}, map_item=lambda item: item["text"], limit=5, poll_interval_secs=0.1
+    )
+    assert len(items) == 5
+    assert all(item.startswith("item ") for item in items)
+    assert [run["status"] for run in stand_in.runs.values()] == ["ABORTED"]
+
+
+def test_stream_actor_async_skips_items_that_do_not_map(stand_in, actor_config):
+    def map_item(item):
+        return item["id"] if int(item["id"]) % 2 == 0 else None
+
+    items = asyncio.run(stream_actor_async(actor_config, {"queries": ["even"]}, map_item=map_item))
+    assert items and all(int(item) % 2 == 0 for item in items)
+    assert [run["status"] for run in stand_in.runs.values()] == ["SUCCEEDED"]
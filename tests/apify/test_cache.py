@@ -0,0 +1,105 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import gc
+import os
+import time
+from neurons.apify.cache import ResultCache
+
+
+def test_empty_results_are_not_cached():
+    cache = ResultCache()
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        return []
+
+    async def main():
+        for _ in range(3):
+            assert await cache.get_or_fetch_async("key", fetch, ttl_secs=600, stale_secs=600) == []
+
+    asyncio.run(main())
+    assert len(fetches) == 3
+    assert cache.stats()["entries"] == 0
+
+
+def test_an_empty_refresh_keeps_the_stale_result():
+    cache = ResultCache()
+    cache.put("key", [{"id": "1"}])
+    refreshed = []
+
+    async def fetch():
+        refreshed.append(1)
+        return []
+
+    async def main():
+        # Past the TTL but within the stale window, refreshed in the background
+        value = await cache.get_or_fetch_async("key", fetch, ttl_secs=0, stale_secs=600)
+        await asyncio.sleep(0.05)
+        return value
+
+    assert asyncio.run(main()) == [{"id": "1"}]
+    assert refreshed == [1]
+    assert cache.peek("key") == [{"id": "1"}]
+
+
+def test_background_refreshes_are_kept_until_done():
+    cache = ResultCache()
+    cache.put("key", [{"id": "1"}])
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        gc.collect()
+        await asyncio.sleep(0.1)
+        return [{"id": "2"}]
+
+    async def main():
+        await cache.get_or_fetch_async("key", fetch, ttl_secs=0, stale_secs=600)
+        assert len(cache._refresh_tasks) == 1
+        await asyncio.sleep(0.3)
+        assert not cache._refresh_tasks
+
+    asyncio.run(main())
+    assert cache.peek("key") == [{"id": "2"}]
+
+
+def test_saves_are_debounced_and_off_the_calling_thread(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.pkl")
+    cache = ResultCache(path=path, save_interval_secs=60)
+    saves = []
+    monkeypatch.setattr(cache, "save", lambda: saves.append(time.monotonic()))
+    for i in range(50):
+        cache.put(f"key {i}", [{"id": str(i)}])
+    assert saves == []
+
+    cache._saved_at -= 60
+    cache.put("key", [{"id": "1"}])
+    cache._save_executor.shutdown(wait=True)
+    assert len(saves) == 1
+
+
+def test_saved_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.pkl")
+    cache = ResultCache(path=path)
+    cache.put("key", [{"id": "1"}])
+    cache.save()
+    assert os.path.exists(path)
+    assert ResultCache(path=path).peek("key") == [{"id": "1"}]
@@ -0,0 +1,113 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import pytest
+import neurons.apify.tweeter.microworlds_twitter_scraper as microworlds
+from neurons.apify.lookup import NOT_FOUND, TweetUrlLookup, UrlLookup, tweet_id
+
+
+def status_url(id):
+    return f"https://x.com/user/status/{id}"
+
+
+class CappedTweetLookup(TweetUrlLookup):
+    """
+    A lookup whose actor caps a whole run at one tweet per url, and returns the conversation of the first
+    url before anything else, like twitter actors do for status urls with replies.
+    """
+
+    lookup_batch_size = 5
+
+    def __init__(self, tweets, replies_of=None):
+        self.tweets = tweets
+        self.replies_of = replies_of or {}
+        self.runs = []
+
+    async def search_by_url_async(self, urls: list) -> list:
+        self.runs.append(list(urls))
+        results = []
+        for url in urls:
+            id = tweet_id(url)
+            if id in self.tweets:
+                results.append({"id": id, "url": url})
+            results.extend({"id": reply, "url": status_url(reply)} for reply in self.replies_of.get(id, []))
+        return results[: len(urls)]
+
+
+def test_lookups_must_implement_their_keys():
+    class MissingItemKey(UrlLookup):
+        @staticmethod
+        def lookup_key(url: str) -> str:
+            return url
+
+        async def search_by_url_async(self, urls: list) -> list:
+            return []
+
+    with pytest.raises(TypeError):
+        MissingItemKey()
+
+
+def test_urls_crowded_out_of_a_run_are_looked_up_on_their_own():
+    lookup = CappedTweetLookup(tweets={"1", "2", "3"}, replies_of={"1": ["10", "11"]})
+    urls = [status_url(id) for id in ("1", "2", "3")]
+
+    result = asyncio.run(lookup.lookup_by_url_async(urls))
+
+    assert {id: item["url"] for id, item in result.items()} == {id: status_url(id) for id in ("1", "2", "3")}
+    assert lookup.runs == [urls, [urls[1]], [urls[2]]]
+
+
+def test_urls_missing_on_their_own_are_not_found():
+    lookup = CappedTweetLookup(tweets={"1", "2"})
+    urls = [status_url(id) for id in ("1", "2", "4")]
+
+    result = asyncio.run(lookup.lookup_by_url_async(urls))
+
+    assert result["1"]["url"] == urls[0]
+    assert result["2"]["url"] == urls[1]
+    assert result["4"] is NOT_FOUND
+    assert lookup.runs == [urls, [urls[2]]]
+
+
+def test_a_single_url_batch_is_not_looked_up_twice():
+    lookup = CappedTweetLookup(tweets=set())
+    lookup.lookup_batch_size = 1
+
+    result = asyncio.run(lookup.lookup_by_url_async([status_url("5")]))
+
+    assert result == {"5": NOT_FOUND}
+    assert len(lookup.runs) == 1
+
+
+def test_microworlds_caps_tweets_per_url(monkeypatch):
+    run_inputs = []
+
+    async def run_actor_async(actor_config, run_input):
+        run_inputs.append(run_input)
+        return []
+
+    monkeypatch.setattr(microworlds, "run_actor_async", run_actor_async)
+    urls = [status_url(id) for id in ("1", "2", "3")]
+
+    asyncio.run(microworlds.MicroworldsTwitterScraper().search_by_url_async(urls, max_tweets_per_url=2))
+
+    assert sorted((run_input["urls"], run_input["maxTweets"]) for run_input in run_inputs) == [
+        ([url], 2) for url in urls
+    ]
@@ -0,0 +1,47 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from datetime import datetime
+from neurons.apify.mapping import parse_timestamp, reddit_timestamp, same_timestamp, tweet_timestamp
+
+CREATED_AT = "2023-11-20T12:34:56.789Z"
+
+
+def test_tweet_timestamps_of_earlier_miners_match():
+    # WebHarvester used to send microseconds, the other twitter providers whole seconds
+    earlier = str(datetime.fromisoformat(CREATED_AT.replace("Z", "+00:00")))
+    assert earlier == "2023-11-20 12:34:56.789000+00:00"
+    assert tweet_timestamp(CREATED_AT) == "2023-11-20 12:34:56+00:00"
+    assert same_timestamp(earlier, tweet_timestamp(CREATED_AT))
+    assert same_timestamp(tweet_timestamp("Mon Nov 20 12:34:56 +0000 2023"), earlier)
+    assert parse_timestamp(earlier).replace(microsecond=0) == parse_timestamp(tweet_timestamp(CREATED_AT))
+
+
+def test_reddit_timestamps_of_earlier_miners_match():
+    # RedditScraperLite used to send createdAt as scraped
+    assert reddit_timestamp(CREATED_AT) == "2023-11-20T12:34:56.789Z"
+    assert same_timestamp(CREATED_AT, reddit_timestamp(CREATED_AT))
+    assert same_timestamp("2023-11-20T12:34:56+00:00", reddit_timestamp(CREATED_AT))
+    assert same_timestamp(1700483696, reddit_timestamp(CREATED_AT))
+
+
+def test_different_or_malformed_timestamps_do_not_match():
+    assert not same_timestamp("2023-11-20 12:34:57+00:00", tweet_timestamp(CREATED_AT))
+    assert not same_timestamp("not a date", tweet_timestamp(CREATED_AT))
+    assert not same_timestamp(None, tweet_timestamp(CREATED_AT))
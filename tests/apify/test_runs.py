@@ -0,0 +1,73 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import asyncio
+import socket
+import pytest
+from neurons.apify.actors import run_actor, run_actor_async
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def runtime_options():
+    # Webhooks are received, and the fallback status check only runs once a second
+    port = free_port()
+    return {"webhook_url": f"http://127.0.0.1:{port}", "webhook_port": port, "webhook_poll_interval_secs": 1.0}
+
+
+def test_runs_finish_on_their_webhook(stand_in, actor_config, runtime):
+    items = run_actor(actor_config, {"queries": ["webhook"]})
+    assert len(items) == 20
+    stats = runtime.runs.stats()
+    assert stats["webhook_events"] == 1
+    assert stats["lookups"] == 0
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.parametrize("stand_in_options", [{"items_per_run": 20, "run_secs": 1.0, "webhook_loss_rate": 1.0}])
+def test_runs_finish_by_polling_when_their_webhook_is_lost(stand_in, actor_config, runtime):
+    items = run_actor(actor_config, {"queries": ["lost"]})
+    assert len(items) == 20
+    stats = runtime.runs.stats()
+    assert stats["webhook_events"] == 0
+    assert stats["polls"] >= 1
+    assert stats["lookups"] == 1
+    assert [run["status"] for run in stand_in.runs.values()] == ["SUCCEEDED"]
+
+
+@pytest.mark.parametrize("runtime_options", [{"run_poll_interval_secs": 0.2}])
+def test_concurrent_runs_share_their_status_checks(stand_in, actor_config, runtime):
+    async def run_all():
+        return await asyncio.gather(*(run_actor_async(actor_config, {"queries": [f"poll {i}"]}) for i in range(4)))
+
+    started = time.monotonic()
+    results = asyncio.run(run_all())
+    elapsed = time.monotonic() - started
+    assert [len(items) for items in results] == [20] * 4
+    stats = runtime.runs.stats()
+    assert stats["webhook_events"] == 0
+    # One run list request per check covers every in-flight run; only the finished runs are fetched on their own
+    assert stats["lookups"] == 4
+    assert stats["polls"] <= elapsed / 0.2 + 1
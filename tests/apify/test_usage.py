@@ -0,0 +1,66 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from neurons.apify.actors import run_actor_async, stream_actor
+from neurons.apify.cancellation import RunCancelled, call_cancellable_async
+
+
+@pytest.fixture
+def stand_in_options():
+    # Aborted runs are ABORTING for a while, and have their final stats only once they are ABORTED
+    return {"items_per_run": 20, "run_secs": 2.0, "abort_secs": 0.5, "seed": 1}
+
+
+def recorded(ledger, runs: int, timeout_secs: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout_secs
+    while time.monotonic() < deadline:
+        report = ledger.report("actor", hours=1)
+        if sum(usage["runs"] for usage in report.values()) >= runs:
+            return report
+        time.sleep(0.05)
+    raise AssertionError(f"{runs} runs were not recorded in time")
+
+
+def test_usage_of_runs_aborted_at_the_limit_is_final(stand_in, actor_config, usage_ledger):
+    items = stream_actor(actor_config, {"queries": ["limit"]}, limit=3, poll_interval_secs=0.1)
+    assert len(items) == 3
+
+    usage = recorded(usage_ledger, runs=1)[actor_config.actor_id]
+    (run,) = stand_in.runs.values()
+    assert run["status"] == "ABORTED"
+    assert usage["compute_units"] == pytest.approx(run["stats"]["computeUnits"])
+    assert usage["compute_units"] > 0
+    assert usage["items"] >= 3
+
+
+def test_usage_of_cancelled_runs_is_recorded(stand_in, actor_config, usage_ledger):
+    cancel_event = threading.Event()
+    threading.Timer(0.3, cancel_event.set).start()
+
+    with pytest.raises(RunCancelled):
+        asyncio.run(call_cancellable_async(cancel_event, run_actor_async, actor_config, {"queries": ["cancel"]}))
+
+    usage = recorded(usage_ledger, runs=1)[actor_config.actor_id]
+    (run,) = stand_in.runs.values()
+    assert run["status"] == "ABORTED"
+    assert usage["compute_units"] == pytest.approx(run["stats"]["computeUnits"])
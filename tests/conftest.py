@@ -0,0 +1,71 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import importlib
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# The Apify plugins live in neurons/plugins/apify but are imported as neurons.apify
+sys.modules.setdefault("neurons.apify", importlib.import_module("neurons.plugins.apify"))
+
+
+@pytest.fixture
+def usage_ledger(monkeypatch):
+    """
+    A fresh, unsaved usage ledger without budgets, which the actor runs of the test are accounted to.
+    Actor runs are neither recorded nor replayed.
+    """
+    import neurons.apify.usage as usage
+    from neurons.apify.replay import configure_replay
+
+    ledger = usage.UsageLedger(path=None, hourly_budget_cu=0, daily_budget_cu=0)
+    monkeypatch.setattr(usage, "_usage_ledger", ledger)
+    configure_replay(None)
+    return ledger
+
+
+@pytest.fixture
+def runtime_options():
+    return {"run_poll_interval_secs": 0.1}
+
+
+@pytest.fixture
+def runtime(usage_ledger, runtime_options):
+    """
+    A fresh actor runtime, returned by get_runtime() for the configured API key during the test.
+    """
+    import neurons.apify.actors as actors
+
+    api_key = os.getenv("APIFY_API_KEY")
+    runtime = actors.ActorRuntime(api_key, **runtime_options)
+    previous = actors._runtimes.get(api_key)
+    actors._runtimes[api_key] = runtime
+    try:
+        yield runtime
+    finally:
+        if previous is None:
+            actors._runtimes.pop(api_key, None)
+        else:
+            actors._runtimes[api_key] = previous
+        runtime.shutdown()
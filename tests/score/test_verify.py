@@ -0,0 +1,55 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("bittensor")
+
+from neurons.score.reddit_score import verify_post
+from neurons.score.twitter_score import parse_date, verify_tweet
+
+TWEET = {
+    "id": "1726587340000000000",
+    "url": "https://x.com/opentensor/status/1726587340000000000",
+    "text": "bittensor",
+    "username": "opentensor",
+    "timestamp": "2023-11-20 12:34:56+00:00",
+}
+POST = {
+    "id": "t3_17zq0x1",
+    "url": "https://www.reddit.com/r/bittensor_/comments/17zq0x1/subnet_3/",
+    "text": "scraping",
+    "title": "subnet 3",
+    "dataType": "post",
+    "timestamp": "2023-11-20T12:34:56.000Z",
+}
+
+
+def test_tweets_of_miners_sending_microseconds_verify():
+    earlier = {**TWEET, "timestamp": "2023-11-20 12:34:56.789000+00:00"}
+    assert parse_date(earlier["timestamp"]) == parse_date(TWEET["timestamp"]).replace(microsecond=789000)
+    assert verify_tweet(0, earlier, TWEET)
+    assert not verify_tweet(0, {**TWEET, "timestamp": "2023-11-20 12:34:57+00:00"}, TWEET)
+
+
+def test_posts_of_miners_sending_raw_created_at_verify():
+    assert verify_post({**POST, "timestamp": "2023-11-20T12:34:56Z"}, POST)
+    assert verify_post({**POST, "timestamp": "2023-11-20T12:34:56.000+00:00"}, POST)
+    assert not verify_post({**POST, "timestamp": "2023-11-20T12:35:56.000Z"}, POST)
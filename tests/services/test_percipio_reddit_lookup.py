@@ -0,0 +1,90 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import pytest
+from neurons.apify.lookup import NOT_FOUND
+from neurons.services.percipio_reddit_lookup import PercipioRedditLookup
+from neurons.services.percipio_standin import PercipioStandIn
+
+POSTS = [{"id": f"t3_{i:06x}", "text": f"post {i}"} for i in range(60)]
+
+
+@pytest.fixture
+def stand_in_options():
+    return {"items": POSTS, "max_url_length": 200}
+
+
+@pytest.fixture
+def serve(runtime, stand_in_options):
+    """
+    Serve a percip.io stand-in from the actor runtime loop and return lookups against it.
+    """
+    stand_in = PercipioStandIn(**stand_in_options)
+    base_url = runtime.run_coroutine(stand_in.start())
+    lookups = []
+
+    def lookup(**options):
+        lookups.append(PercipioRedditLookup(base_url=base_url, **options))
+        return lookups[-1]
+
+    try:
+        yield stand_in, lookup
+    finally:
+        for created in lookups:
+            if created._session is not None:
+                runtime.run_coroutine(created._session.close())
+        runtime.run_coroutine(stand_in.stop())
+
+
+def test_ids_are_chunked_below_the_url_length(serve):
+    stand_in, lookup = serve
+    ids = [post["id"] for post in POSTS]
+
+    result = lookup(max_url_length=200).lookupById(ids)
+
+    assert result == {post["id"]: post for post in POSTS}
+    # The stand-in answers longer urls with 414, which would leave their ids out
+    assert 1 < stand_in.requests < len(ids)
+
+
+def test_found_and_missing_ids_are_cached(serve):
+    stand_in, lookup = serve
+    percipio = lookup(max_url_length=200, cache_ttl_secs=60, negative_cache_ttl_secs=0.3)
+    ids = [POSTS[0]["id"], "t3_missing"]
+
+    assert percipio.lookupById(ids) == {POSTS[0]["id"]: POSTS[0], "t3_missing": NOT_FOUND}
+    assert percipio.lookupById(ids) == {POSTS[0]["id"]: POSTS[0], "t3_missing": NOT_FOUND}
+    assert stand_in.requests == 1
+    assert percipio.stats()["cache_hits"] == 2
+
+    # Ids that were not found are looked up again once their shorter TTL has passed
+    time.sleep(0.4)
+    assert percipio.lookupById(ids)["t3_missing"] is NOT_FOUND
+    assert stand_in.requests == 2
+
+
+@pytest.mark.parametrize("stand_in_options", [{"items": POSTS, "failure_rate": 1.0}])
+def test_ids_of_failed_requests_are_left_out_and_not_cached(serve):
+    stand_in, lookup = serve
+    percipio = lookup(max_retries=1)
+
+    assert percipio.lookupById([POSTS[0]["id"]]) == {}
+    assert stand_in.requests == 2
+    assert len(percipio.cache) == 0
@@ -0,0 +1,110 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import os
+from neurons.storage.dedup import DedupIndex, ScalableBloomFilter
+
+
+def records(*ids):
+    return [{"id": item_id, "text": f"item {item_id}"} for item_id in ids]
+
+
+def test_unseen_skips_stored_ids_until_they_are_added():
+    index = DedupIndex()
+    index.add_many("twitter", ["1", "2"])
+
+    new_ids = []
+    assert [record["id"] for record in index.unseen("twitter", records("1", "3", "4"), new_ids)] == ["3", "4"]
+    assert new_ids == ["3", "4"]
+    # Yielded ids only count as stored once they are added
+    assert not index.contains("twitter", "3")
+    index.add_many("twitter", new_ids)
+    assert list(index.unseen("twitter", records("3", "4"), [])) == []
+    # Ids are namespaced by source
+    assert len(list(index.unseen("reddit", records("1"), []))) == 1
+
+
+def test_ids_are_remembered_in_the_bloom_filters_after_leaving_the_recent_window():
+    index = DedupIndex(recent_size=10)
+    index.add_many("twitter", [str(i) for i in range(100)])
+    assert len(index.recent) == 10
+    assert index.contains("twitter", "0")
+    assert index.stats()["bloom_hits"] == 1
+
+
+def test_scalable_bloom_filter_grows_once_full():
+    bloom = ScalableBloomFilter(initial_capacity=100, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(str(i))
+    assert len(bloom.filters) > 1
+    assert [f.capacity for f in bloom.filters[:3]] == [100, 200, 400]
+    assert all(str(i) in bloom for i in range(1000))
+    false_positives = sum(str(i) in bloom for i in range(1000, 11000))
+    assert false_positives / 10000 < 0.02
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "dedup_index.pkl")
+    index = DedupIndex(path, recent_size=10)
+    index.add_many("twitter", [str(i) for i in range(50)])
+    index.save()
+
+    loaded = DedupIndex.load(path, recent_size=10)
+    assert all(loaded.contains("twitter", str(i)) for i in range(50))
+    assert not loaded.contains("twitter", "50")
+    assert list(loaded.recent) == list(index.recent)
+
+
+def test_saves_append_only_the_new_ids(tmp_path):
+    path = str(tmp_path / "dedup_index.pkl")
+    index = DedupIndex(path, snapshot_every=100)
+    index.add_many("twitter", ["1", "2"])
+    index.save()
+    assert not os.path.exists(path)
+    with open(index.log_path) as f:
+        assert f.read().splitlines() == ['"twitter:1"', '"twitter:2"']
+
+    index.add_many("twitter", ["3"])
+    index.save()
+    with open(index.log_path) as f:
+        assert len(f.read().splitlines()) == 3
+    assert DedupIndex.load(path).contains("twitter", "3")
+
+    # Once the log is full the snapshot is rewritten and the log emptied
+    index.add_many("twitter", [str(i) for i in range(4, 104)])
+    index.save()
+    assert os.path.exists(path)
+    assert not os.path.exists(index.log_path)
+    loaded = DedupIndex.load(path)
+    assert all(loaded.contains("twitter", str(i)) for i in range(1, 104))
+
+
+def test_a_torn_log_line_is_skipped(tmp_path):
+    path = str(tmp_path / "dedup_index.pkl")
+    index = DedupIndex(path)
+    index.add_many("twitter", ["1"])
+    index.save()
+    with open(index.log_path, "ab") as f:
+        f.write(b'"twitter:')
+    loaded = DedupIndex.load(path)
+    assert loaded.contains("twitter", "1")
+    # Later saves append after the last good id
+    loaded.add_many("twitter", ["2"])
+    loaded.save()
+    assert DedupIndex.load(path).contains("twitter", "2")
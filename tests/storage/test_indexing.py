@@ -0,0 +1,149 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import time
+import aiohttp
+import asyncio
+import logging
+from neurons.storage.indexing import IndexingClient, IndexingRejected
+from neurons.storage.indexing_stub import IndexingStubServer, benchmark
+
+
+def rows(n):
+    return [
+        {"file_name": f"twitter_{i}.csv", "source_type": "twitter", "row_count": 15, "search_keys": ["bittensor"]}
+        for i in range(n)
+    ]
+
+
+def run_against_stub(test, **server_options):
+    async def main():
+        server = await IndexingStubServer(**server_options).start()
+        try:
+            return await test(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_rows_are_coalesced_into_batches():
+    async def test(server):
+        client = IndexingClient(server.url, "stub", batch_url=server.batch_url, max_batch_rows=10, rate_per_sec=0)
+        results = await client.index_many(rows(40))
+        await client.close()
+        return client, results
+
+    client, results = run_against_stub(test)
+    assert client.requests_sent == 4
+    assert [result["file_name"] for result in results] == [row["file_name"] for row in rows(40)]
+    assert all(result["status"] == "indexed" for result in results)
+
+
+def test_rows_submitted_separately_share_a_batch():
+    async def test(server):
+        client = IndexingClient(server.url, "stub", batch_url=server.batch_url, rate_per_sec=0)
+        # Like storage calls of one round, each awaiting its own row
+        results = await asyncio.gather(*(client.index(row) for row in rows(5)))
+        await client.close()
+        return client, results, len(server.rows)
+
+    client, results, indexed = run_against_stub(test)
+    assert client.requests_sent == 1
+    assert indexed == 5
+    assert len(results) == 5
+
+
+def test_without_batch_url_rows_are_posted_one_by_one(caplog):
+    async def test(server):
+        with caplog.at_level(logging.WARNING):
+            client = IndexingClient(server.url, "stub", rate_per_sec=0)
+        results = await client.index_many(rows(6))
+        await client.close()
+        return client, results
+
+    client, results = run_against_stub(test)
+    assert client.requests_sent == 6
+    assert all(result["status"] == "indexed" for result in results)
+    assert "posting every row on its own" in caplog.text
+
+
+def test_failed_requests_are_retried():
+    async def test(server):
+        client = IndexingClient(
+            server.url, "stub", batch_url=server.batch_url, rate_per_sec=0, backoff_base_secs=0.01
+        )
+        results = await client.index_many(rows(3))
+        await client.close()
+        return client, results, server.requests
+
+    client, results, requests = run_against_stub(test, fail_first=2)
+    assert requests == 3
+    assert all(result["status"] == "indexed" for result in results)
+
+
+def test_rows_fail_once_retries_are_exhausted():
+    async def test(server):
+        client = IndexingClient(
+            server.url, "stub", batch_url=server.batch_url, rate_per_sec=0, max_retries=1, backoff_base_secs=0.01
+        )
+        results = await client.index_many(rows(3))
+        await client.close()
+        return results, server.requests
+
+    results, requests = run_against_stub(test, fail_first=5)
+    assert requests == 2
+    assert all(isinstance(result, aiohttp.ClientResponseError) and result.status == 503 for result in results)
+
+
+def test_benchmark_batches_send_fewer_requests():
+    stats = asyncio.run(benchmark(rows=120, latency_secs=0))
+    assert stats["single"]["requests"] == 120
+    assert stats["batched"]["requests"] < 120
+    assert stats["single"]["failed"] == stats["batched"]["failed"] == 0
+
+
+def test_rejected_rows_are_not_retried_and_do_not_fail_their_batch():
+    async def test(server):
+        client = IndexingClient(server.url, "stub", batch_url=server.batch_url, rate_per_sec=0)
+        results = await client.index_many(rows(4))
+        await client.close()
+        return results, server.requests
+
+    results, requests = run_against_stub(test, reject_file_names={"twitter_2.csv"})
+    # The refused batch, then each of its rows on its own
+    assert requests == 5
+    assert [result["status"] for i, result in enumerate(results) if i != 2] == ["indexed"] * 3
+    assert isinstance(results[2], IndexingRejected)
+    assert results[2].status == 400
+    assert results[2].body == {"error": "invalid rows ['twitter_2.csv']"}
+
+
+def test_a_lone_row_does_not_wait_for_a_batch():
+    async def test(server):
+        client = IndexingClient(server.url, "stub", batch_url=server.batch_url, linger_secs=5, rate_per_sec=0)
+        started = time.monotonic()
+        result = await client.index(rows(1)[0])
+        elapsed = time.monotonic() - started
+        await client.close()
+        return result, elapsed
+
+    result, elapsed = run_against_stub(test)
+    assert result["status"] == "indexed"
+    assert elapsed < 1
@@ -0,0 +1,110 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import gzip
+import os
+import orjson as json
+from neurons.storage.metrics_log import INDEX_FILE, ROLLED_DIR, MetricsLog, segments_for_blocks
+
+
+class Bucket:
+    """
+    In-memory upload target that fails while ``failing`` is set.
+    """
+
+    def __init__(self):
+        self.objects = {}
+        self.failing = False
+
+    def upload(self, key, body):
+        if self.failing:
+            raise ConnectionError("bucket unreachable")
+        self.objects[key] = body if isinstance(body, bytes) else body.encode()
+
+
+def rounds(body: bytes) -> list:
+    return [json.loads(line) for line in gzip.decompress(body).splitlines()]
+
+
+def test_rounds_stay_local_until_the_segment_is_full(tmp_path):
+    bucket = Bucket()
+    log = MetricsLog(str(tmp_path), "twitter", bucket.upload)
+    log.append({"block": 10, "scores": [1]})
+    log.append({"block": 12, "scores": [2]})
+    assert bucket.objects == {}
+    assert log.meta["min_block"] == 10 and log.meta["max_block"] == 12 and log.meta["rounds"] == 2
+
+    # A restart picks up the current segment where it stopped
+    reopened = MetricsLog(str(tmp_path), "twitter", bucket.upload)
+    assert reopened.meta == log.meta
+
+
+def test_full_segments_are_rolled_uploaded_and_indexed(tmp_path):
+    bucket = Bucket()
+    log = MetricsLog(str(tmp_path), "twitter", bucket.upload, segment_max_bytes=1)
+    log.append({"block": 10})
+    log.append({"block": 20})
+
+    segments = ["twitter/segments/000000010_000000010.jsonl.gz", "twitter/segments/000000020_000000020.jsonl.gz"]
+    assert sorted(key for key in bucket.objects if "/segments/" in key) == segments
+    assert rounds(bucket.objects[segments[1]]) == [{"block": 20}]
+    index = json.loads(bucket.objects[f"twitter/{INDEX_FILE}"])
+    assert [(entry["key"], entry["min_block"], entry["rounds"]) for entry in index] == [
+        (segments[0], 10, 1),
+        (segments[1], 20, 1),
+    ]
+    assert index == log.index
+    assert os.listdir(tmp_path / ROLLED_DIR) == []
+
+
+def test_old_segments_are_rolled(tmp_path):
+    bucket = Bucket()
+    log = MetricsLog(str(tmp_path), "reddit", bucket.upload, segment_max_age_secs=0)
+    log.append({"block": 5})
+    assert "reddit/segments/000000005_000000005.jsonl.gz" in bucket.objects
+    assert log.meta is None
+
+
+def test_failed_uploads_are_retried_on_the_next_append(tmp_path):
+    bucket = Bucket()
+    log = MetricsLog(str(tmp_path), "twitter", bucket.upload, segment_max_bytes=1)
+    bucket.failing = True
+    log.append({"block": 1})
+    log.append({"block": 2})
+    assert bucket.objects == {}
+    assert len([name for name in os.listdir(tmp_path / ROLLED_DIR) if name.endswith(".jsonl.gz")]) == 2
+
+    bucket.failing = False
+    log.flush()
+    assert [entry["min_block"] for entry in log.index] == [1, 2]
+    assert [entry["min_block"] for entry in json.loads(bucket.objects[f"twitter/{INDEX_FILE}"])] == [1, 2]
+    # The local index survives a restart
+    assert MetricsLog(str(tmp_path), "twitter", bucket.upload).index == log.index
+
+
+def test_segments_for_blocks_selects_overlapping_segments_in_block_order():
+    index = [
+        {"key": "c", "min_block": 200, "max_block": 299},
+        {"key": "a", "min_block": 0, "max_block": 99},
+        {"key": "b", "min_block": 100, "max_block": 199},
+    ]
+    assert segments_for_blocks(index, 50, 150) == ["a", "b"]
+    assert segments_for_blocks(index, 199, 200) == ["b", "c"]
+    assert segments_for_blocks(index, 300, 400) == []
+    assert segments_for_blocks(index, 0, 1000) == ["a", "b", "c"]
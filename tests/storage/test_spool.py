@@ -0,0 +1,142 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import orjson as json
+import pytest
+from neurons.storage.spool import DEAD_LETTER_FILE, PoisonEntry, Spool
+
+
+def entry(i, size=0):
+    return {"kind": "index", "file_name": f"twitter_{i}.csv", "pad": "x" * size}
+
+
+def test_replay_respools_into_a_fresh_segment(tmp_path):
+    spool = Spool(str(tmp_path))
+    for i in range(3):
+        spool.append(entry(i))
+    handled = []
+
+    async def handler(item):
+        handled.append(item["file_name"])
+        if item["file_name"] == "twitter_1.csv":
+            # Indexing failed again, the row is spooled on its own
+            spool.append(entry(f"{1}_again"))
+
+    assert asyncio.run(spool.replay(handler, rate_per_sec=0)) == 3
+    assert handled == ["twitter_0.csv", "twitter_1.csv", "twitter_2.csv"]
+    assert len(spool.segments) == 1
+    assert len(spool) == 1
+
+    handled.clear()
+    assert asyncio.run(spool.replay(handler, rate_per_sec=0)) == 1
+    assert handled == ["twitter_1_again.csv"]
+    assert len(spool) == 0
+
+
+def test_replay_survives_eviction_of_the_segment_being_replayed(tmp_path):
+    spool = Spool(str(tmp_path), quota_bytes=1500)
+    for i in range(3):
+        spool.append(entry(i, size=300))
+    handled = []
+
+    async def handler(item):
+        handled.append(item["file_name"])
+        # Spooling again takes the spool over its quota, which evicts the segment being replayed
+        spool.append(entry(f"{len(handled)}_again", size=700))
+
+    assert asyncio.run(spool.replay(handler, rate_per_sec=0)) == 1
+    assert handled == ["twitter_0.csv"]
+    assert len(spool.segments) == 1
+    assert spool.total_bytes() <= spool.quota_bytes
+    with open(tmp_path / spool.segments[0]["name"], "rb") as f:
+        assert [json.loads(line)["file_name"] for line in f] == ["twitter_1_again.csv"]
+
+
+def test_a_single_segment_does_not_grow_past_the_quota(tmp_path):
+    spool = Spool(str(tmp_path), quota_bytes=1000)
+    for i in range(20):
+        spool.append(entry(i, size=100))
+        assert spool.total_bytes() <= spool.quota_bytes
+    assert len(spool.segments) == 1
+    assert 0 < len(spool) < 20
+
+    reopened = Spool(str(tmp_path), quota_bytes=1000)
+    assert len(reopened) == len(spool)
+
+
+def dead_letters(tmp_path):
+    with open(tmp_path / DEAD_LETTER_FILE, "rb") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_poison_entries_are_dead_lettered_and_replay_carries_on(tmp_path):
+    spool = Spool(str(tmp_path))
+    for i in range(3):
+        spool.append(entry(i))
+    handled = []
+
+    async def handler(item):
+        if item["file_name"] == "twitter_1.csv":
+            # E.g. a row the indexing API refuses with HTTP 400
+            raise PoisonEntry("rejected")
+        handled.append(item["file_name"])
+
+    assert asyncio.run(spool.replay(handler, rate_per_sec=0)) == 2
+    assert handled == ["twitter_0.csv", "twitter_2.csv"]
+    assert len(spool) == 0
+    assert spool.dead_lettered == 1
+    (dead,) = dead_letters(tmp_path)
+    assert json.loads(dead["line"])["file_name"] == "twitter_1.csv"
+    assert dead["error"] == "rejected"
+
+
+def test_undecodable_lines_are_dead_lettered(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.append(entry(0))
+    # A line corrupted on disk, followed by a good entry
+    segment = spool.segments[-1]
+    with open(tmp_path / segment["name"], "ab") as f:
+        f.write(b"{not json\n")
+    segment["bytes"] += len(b"{not json\n")
+    segment["entries"] += 1
+    spool.append(entry(1))
+    handled = []
+
+    async def handler(item):
+        handled.append(item["file_name"])
+
+    assert asyncio.run(spool.replay(handler, rate_per_sec=0)) == 2
+    assert handled == ["twitter_0.csv", "twitter_1.csv"]
+    assert len(spool) == 0
+    assert [dead["line"] for dead in dead_letters(tmp_path)] == ["{not json"]
+
+
+@pytest.mark.parametrize("error", [ConnectionError("unreachable"), TimeoutError()])
+def test_transient_failures_stop_replay_for_a_retry(tmp_path, error):
+    spool = Spool(str(tmp_path))
+    for i in range(2):
+        spool.append(entry(i))
+
+    async def failing(item):
+        raise error
+
+    assert asyncio.run(spool.replay(failing, rate_per_sec=0)) == 0
+    assert len(spool) == 2
+    assert not (tmp_path / DEAD_LETTER_FILE).exists()
@@ -0,0 +1,148 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import threading
+from datetime import datetime, timezone
+from neurons.incremental import CursorStore, IncrementalSearch
+
+
+def item(item_id: str, timestamp: str) -> dict:
+    return {"id": item_id, "timestamp": timestamp, "text": f"item {item_id}"}
+
+
+class SinceQuery:
+    """
+    Query provider returning fixed items newer than ``since``, and recording the ``since`` of every search.
+    """
+
+    supports_since = True
+
+    def __init__(self, items: list):
+        self.items = list(items)
+        self.since = []
+
+    async def execute_async(
+        self, search_queries, limit_number, validator_key, validator_version, miner_uid, since=None
+    ):
+        self.since.append(since)
+        items = [i for i in self.items if since is None or datetime.fromisoformat(i["timestamp"]) >= since]
+        return sorted(items, key=lambda i: i["timestamp"], reverse=True)[:limit_number]
+
+
+def search(incremental: IncrementalSearch, keyword: str = "bittensor", limit_number: int = 2) -> list:
+    return asyncio.run(incremental.execute_async([keyword], limit_number))
+
+
+ITEMS = [
+    item("1", "2024-03-01T12:00:00+00:00"),
+    item("2", "2024-03-01T12:30:00+00:00"),
+    item("3", "2024-03-01T12:34:56+00:00"),
+]
+
+
+def test_incremental_searches_start_at_the_cursor_less_the_overlap_in_whole_minutes():
+    query = SinceQuery(ITEMS)
+    incremental = IncrementalSearch(query, "twitter", refresh_secs=0)
+    assert [i["id"] for i in search(incremental)] == ["3", "2"]
+    assert incremental.cursors.get("twitter", "bittensor")[1] == "3"
+
+    query.items.append(item("4", "2024-03-01T12:40:00+00:00"))
+    assert [i["id"] for i in search(incremental)] == ["4", "3"]
+    # 12:34:56 less the 120 s overlap is 12:32:56, floored to the minute
+    assert query.since == [None, datetime(2024, 3, 1, 12, 32, tzinfo=timezone.utc)]
+    assert incremental.stats()["incremental_searches"] == 1
+    # Items from the overlap are not added again
+    assert incremental.stats()["items_added"] == 3
+
+
+def test_items_published_late_within_the_overlap_are_picked_up():
+    query = SinceQuery(ITEMS)
+    incremental = IncrementalSearch(query, "twitter", refresh_secs=0)
+    search(incremental)
+    # Indexed after the last search, but published before the newest item seen
+    query.items.append(item("late", "2024-03-01T12:33:30+00:00"))
+    search(incremental)
+    ring = incremental.cursors.ring("twitter", "bittensor", 100)
+    assert "late" in [i["id"] for i in ring.latest(10)]
+
+
+def test_searches_without_since_support_are_full():
+    query = SinceQuery(ITEMS)
+    query.supports_since = False
+    incremental = IncrementalSearch(query, "twitter", refresh_secs=0)
+    search(incremental)
+    search(incremental)
+    assert query.since == [None, None]
+
+
+def test_cursors_and_rings_survive_a_restart(tmp_path):
+    path = str(tmp_path / "incremental_cursors.json")
+    cursors = CursorStore(path=path)
+    search(IncrementalSearch(SinceQuery(ITEMS), "twitter", refresh_secs=0, cursors=cursors))
+    cursors.save()
+
+    restarted = CursorStore(path=path)
+    assert restarted.get("twitter", "bittensor") == cursors.get("twitter", "bittensor")
+    query = SinceQuery(ITEMS)
+    incremental = IncrementalSearch(query, "twitter", refresh_secs=0, cursors=restarted)
+    assert [i["id"] for i in search(incremental)] == ["3", "2"]
+    # The first search after the restart is already incremental
+    assert query.since == [datetime(2024, 3, 1, 12, 32, tzinfo=timezone.utc)]
+    assert incremental.stats()["keywords"] == 1
+
+
+def test_due_saves_run_off_the_event_loop_thread(tmp_path, monkeypatch):
+    cursors = CursorStore(path=str(tmp_path / "incremental_cursors.json"), save_interval_secs=0)
+    threads = []
+    monkeypatch.setattr(cursors, "save", lambda: threads.append(threading.current_thread()))
+    search(IncrementalSearch(SinceQuery(ITEMS), "twitter", refresh_secs=0, cursors=cursors))
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+
+
+def test_saves_are_debounced(tmp_path, monkeypatch):
+    cursors = CursorStore(path=str(tmp_path / "incremental_cursors.json"), save_interval_secs=60)
+    saves = []
+    monkeypatch.setattr(cursors, "save", lambda: saves.append(1))
+    incremental = IncrementalSearch(SinceQuery(ITEMS), "twitter", refresh_secs=0, cursors=cursors)
+    for keyword in ("bittensor", "subnet", "miner"):
+        search(incremental, keyword)
+    assert saves == []
+
+
+def test_rings_can_be_saved_while_items_are_merged(tmp_path):
+    cursors = CursorStore(path=str(tmp_path / "incremental_cursors.json"))
+    ring = cursors.ring("twitter", "bittensor", 1000)
+    stop = threading.Event()
+
+    def save_repeatedly():
+        while not stop.is_set():
+            cursors.save()
+
+    saver = threading.Thread(target=save_repeatedly)
+    saver.start()
+    try:
+        for i in range(2000):
+            ring.merge([item(str(i), f"2024-03-01T12:{i % 60:02}:00+00:00")])
+    finally:
+        stop.set()
+        saver.join()
+    cursors.save()
+    assert len(CursorStore(path=cursors.path).ring("twitter", "bittensor", 1000)) == 1000
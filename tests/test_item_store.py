@@ -0,0 +1,88 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+import pytest
+import neurons.item_store as item_store
+from neurons.item_store import ItemStore, get_item_store
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ItemStore(f"sqlite:///{tmp_path / 'items.db'}", fresh_secs=300)
+
+
+def tweet(item_id: str, minutes_ago: int, text: str) -> dict:
+    # Recent items, as older ones than the retention are evicted
+    timestamp = datetime.fromtimestamp(time.time() - minutes_ago * 60, timezone.utc).isoformat()
+    return {"id": item_id, "timestamp": timestamp, "text": text}
+
+
+def test_the_item_store_is_off_unless_configured(monkeypatch, tmp_path):
+    monkeypatch.setattr(item_store, "_item_store", None)
+    monkeypatch.delenv("ITEM_STORE_URL", raising=False)
+    assert get_item_store() is None
+
+    monkeypatch.setenv("ITEM_STORE_URL", f"sqlite:///{tmp_path / 'items.db'}")
+    assert isinstance(get_item_store(), ItemStore)
+
+
+def test_latest_serves_keyword_items_topped_up_with_matching_ones(store):
+    store.add("twitter", "bittensor", [tweet("1", 60, "about bittensor")])
+    store.add("twitter", "subnet", [tweet("2", 30, "a bittensor subnet")])
+    assert [item["id"] for item in store.latest("twitter", "bittensor", 2)] == ["1", "2"]
+    assert store.latest("twitter", "bittensor", 3) is None
+
+
+def test_latest_only_serves_items_stored_within_fresh_secs(store, monkeypatch):
+    store.add("reddit", "bittensor", [tweet("1", 60, "bittensor")])
+    now = time.time() + store.fresh_secs
+    monkeypatch.setattr(time, "time", lambda: now)
+    assert store.latest("reddit", "bittensor", 1) is None
+    assert [item["id"] for item in store.latest("reddit", "bittensor", 1, stale_ok=True)] == ["1"]
+
+
+def test_store_calls_from_worker_threads_do_not_block_the_loop(store):
+    items = [tweet(str(i), i, f"bittensor {i}") for i in range(200)]
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.gather(
+            *(asyncio.to_thread(store.add, "twitter", f"keyword {i}", items) for i in range(4)),
+            asyncio.to_thread(store.latest, "twitter", "bittensor", 15),
+        )
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 1
+
+
+def test_items_without_ids_are_not_stored(store):
+    assert store.add("twitter", "bittensor", [{"text": "no id"}]) == 0
+    assert store.stats()["items"]["twitter"] == 0
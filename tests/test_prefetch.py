@@ -0,0 +1,66 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from neurons.apify.actors import ActorConfig
+from neurons.prefetch import KeywordPrefetcher
+from neurons.queries import QueryType
+
+
+class FakeQuery:
+    def __init__(self, results: list):
+        self.actor_config = ActorConfig("fake~actor")
+        self.results = results
+        self.calls = 0
+
+    def execute(self, search_queries, limit_number=15):
+        self.calls += 1
+        return list(self.results)
+
+
+def prefetcher(query: FakeQuery) -> KeywordPrefetcher:
+    return KeywordPrefetcher({QueryType.TWITTER: query}, ["bittensor"], cu_per_hour=100, refresh_secs=600)
+
+
+def test_prefetched_results_are_served(usage_ledger):
+    query = FakeQuery([{"id": "1"}])
+    keyword_prefetcher = prefetcher(query)
+    assert keyword_prefetcher.run_once()
+    assert keyword_prefetcher.get(QueryType.TWITTER, "bittensor") == [{"id": "1"}]
+
+
+def test_empty_results_are_not_served_and_retried_later(usage_ledger):
+    query = FakeQuery([])
+    keyword_prefetcher = prefetcher(query)
+    assert not keyword_prefetcher.run_once()
+    assert keyword_prefetcher.get(QueryType.TWITTER, "bittensor") is None
+    assert keyword_prefetcher.get(QueryType.TWITTER, "bittensor", stale_ok=True) is None
+    # Backed off like a failed refresh
+    assert not keyword_prefetcher.run_once()
+    assert query.calls == 1
+
+
+def test_an_empty_refresh_keeps_the_previous_results(usage_ledger):
+    query = FakeQuery([{"id": "1"}])
+    keyword_prefetcher = prefetcher(query)
+    assert keyword_prefetcher.run_once()
+    query.results = []
+    # Age the results so they are due again
+    keyword_prefetcher._index[(QueryType.TWITTER, "bittensor")] = ([{"id": "1"}], 0.0)
+    assert not keyword_prefetcher.run_once()
+    assert keyword_prefetcher.get(QueryType.TWITTER, "bittensor", stale_ok=True) == [{"id": "1"}]
@@ -0,0 +1,128 @@
+"""
+The MIT License (MIT)
+Copyright © 2023 Chris Wilson
+
+Permission is hereby granted, free of charge, to any person obtaining a copy of this software and associated
+documentation files (the “Software”), to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense, and/or sell copies of the Software,
+and to permit persons to whom the Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all copies or substantial portions of
+the Software.
+
+THE SOFTWARE IS PROVIDED “AS IS”, WITHOUT WARRANTY OF ANY KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO
+THE WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+import asyncio
+import pytest
+from neurons.apify.cancellation import RunCancelled, cancel_requested
+from neurons.provider_group import ProviderGroup
+from neurons.provider_health import MIN_SAMPLES, ProviderHealth
+
+
+class FakeProvider:
+    """
+    Provider answering ``execute_async`` after ``latency_secs``, and giving up like an aborted actor run once
+    its call is cancelled.
+    """
+
+    def __init__(self, latency_secs: float, items: int = 3):
+        self.latency_secs = latency_secs
+        self.items = items
+        self.calls = 0
+
+    async def execute_async(self, search_queries, limit_number=15, *args):
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.latency_secs
+        while loop.time() < deadline:
+            if cancel_requested():
+                raise RunCancelled("cancelled")
+            await asyncio.sleep(0.01)
+        return [{"id": str(i)} for i in range(self.items)]
+
+
+def samples(health: ProviderHealth, name: str) -> list:
+    return list(health._samples[f"{name}.execute"])
+
+
+@pytest.fixture
+def health():
+    return ProviderHealth()
+
+
+def group(providers: dict, health: ProviderHealth, usage_ledger, hedge_delay_secs: float = 0.05) -> ProviderGroup:
+    return ProviderGroup(
+        list(providers.values()),
+        names=list(providers),
+        min_hedge_delay_secs=hedge_delay_secs,
+        max_hedge_delay_secs=hedge_delay_secs,
+        health=health,
+        usage=usage_ledger,
+    )
+
+
+def test_hedged_away_providers_are_recorded_as_censored(health, usage_ledger):
+    providers = {"primary": FakeProvider(1.0), "backup": FakeProvider(0.05)}
+    result = asyncio.run(group(providers, health, usage_ledger).execute_async(["bittensor"]))
+    assert len(result) == 3
+
+    (primary,) = samples(health, "primary")
+    (backup,) = samples(health, "backup")
+    assert primary[5] and not backup[5]
+    # The primary had run for the hedge delay and the backup's whole call when it was abandoned
+    assert primary[1] >= 0.1
+    assert primary[1] > backup[1]
+
+
+def test_cancelled_calls_are_recorded_as_censored(health, usage_ledger):
+    providers = {"primary": FakeProvider(1.0), "backup": FakeProvider(1.0)}
+
+    async def main():
+        task = asyncio.ensure_future(group(providers, health, usage_ledger).execute_async(["bittensor"]))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert [sample[5] for sample in samples(health, "primary") + samples(health, "backup")] == [True, True]
+
+
+def test_a_primary_that_keeps_being_hedged_away_is_ranked_down(health, usage_ledger):
+    # The primary used to be fast, then became slower than its hedge delay
+    for _ in range(MIN_SAMPLES):
+        health.record("primary", "execute", 0.01, items=3)
+    providers = {"primary": FakeProvider(1.0), "backup": FakeProvider(0.02)}
+    hedged = group(providers, health, usage_ledger)
+
+    async def main():
+        for _ in range(MIN_SAMPLES):
+            await hedged.execute_async(["bittensor"])
+
+    asyncio.run(main())
+    assert hedged.hedges == MIN_SAMPLES
+    assert health.summary("primary", "execute")["censored_rate"] == 0.5
+    assert health.rank(["primary", "backup"], "execute") == ["backup", "primary"]
+
+    # The backup is now asked first, without waiting for the primary
+    calls = providers["primary"].calls
+    asyncio.run(hedged.execute_async(["bittensor"]))
+    assert providers["primary"].calls == calls
+    assert hedged.hedges == MIN_SAMPLES
+
+
+def test_censored_calls_count_as_at_least_their_elapsed_time(health):
+    for _ in range(MIN_SAMPLES):
+        health.record("provider", "execute", 1.0, items=3)
+    for _ in range(MIN_SAMPLES):
+        health.record("provider", "execute", 5.0, censored=True)
+    assert health.latency_percentile("provider", "execute", 0.9) == 5.0
+    assert health.tune_timeout("provider", "execute", 1, 60) == 7.5
+    summary = health.summary("provider", "execute")
+    assert summary["error_rate"] == 0.0
+    assert summary["yield"] == 3